@@ -0,0 +1,208 @@
+import io
+import itertools
+import timeit
+from collections.abc import Callable, Iterable, Iterator, Sequence
+
+import numpy as np
+
+from nutcracker.codex import bomp
+from nutcracker.codex.base import wrap_uint16le
+from nutcracker.codex.codex1 import PARAMS
+from nutcracker.kernel.buffer import BufferLike, UnexpectedBufferSize
+
+# decoding and encoding as done before run arrays
+
+
+def list_decode_line(
+    src: BufferLike,
+    decoded_size: int | None = None,
+    fill_value: bytes | None = None,
+) -> bytes:
+    buffer = bytearray()
+    with io.BytesIO(src) as stream:
+        while stream.tell() < len(src):
+            if decoded_size and len(buffer) >= decoded_size:
+                rest = stream.read()
+                if rest not in {
+                    b'',
+                    b'\x00',
+                    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00',
+                }:
+                    print(f'WARNING: {rest!r}', decoded_size)
+                    decoded_rest = list_decode_line(rest)
+                    print('WARNING:', decoded_rest, len(decoded_rest))
+
+                break
+
+            code = stream.read(1)[0]
+            run_len = (code // 2) + 1
+            run_line = stream.read(1) * run_len if code & 1 else stream.read(run_len)
+            buffer += run_line
+
+    if decoded_size and len(buffer) != decoded_size:
+        if len(buffer) < decoded_size and fill_value is not None:
+            buffer += fill_value * (decoded_size - len(buffer))
+        else:
+            raise UnexpectedBufferSize(decoded_size, len(buffer), buffer)
+
+    return bytes(buffer)
+
+
+def list_encode_groups(
+    groups: Iterable[Sequence[int]],
+    buf: Sequence[int] = (),
+    *,
+    limit: int = 4,
+    carry: bool = True,
+    end_limit: int = 1,
+    seps: bytes | None = None,
+) -> Iterator[tuple[int, Sequence[int]]]:
+    buf = list(buf)
+    groups = iter(groups)
+    for group in groups:
+        if len(set(buf)) == 1 and len(buf) > 1:
+            yield bomp.compressed_group(buf)
+            buf = []
+
+        if seps and bytes(buf) == seps:
+            yield bomp.compressed_group(buf)
+            if len(group) <= limit:
+                yield bomp.raw_group(group)
+            else:
+                yield bomp.raw_group(group[:1])
+                yield bomp.compressed_group(group[1:])
+            buf = []
+            continue
+
+        assert isinstance(buf, list)
+        if len(group) < limit or len(buf) + limit > bomp.BUFFER_LIMIT:
+            if seps and bytes(group) == seps:
+                if buf:
+                    yield bomp.raw_group(buf)
+                buf = group
+                continue
+
+            buf += group
+
+            if len(buf) > bomp.BUFFER_LIMIT:
+                yield bomp.raw_group(buf[: bomp.BUFFER_LIMIT])
+                buf = buf[bomp.BUFFER_LIMIT :]
+
+            continue
+
+        if buf:
+            if carry:
+                buf += group[:1]
+                group = group[1:]
+            yield bomp.raw_group(buf)
+            buf = []
+
+        if len(group) > bomp.BUFFER_LIMIT:
+            yield bomp.compressed_group(group[: bomp.BUFFER_LIMIT])
+            group = group[bomp.BUFFER_LIMIT :]
+            assert not buf
+            yield from list_encode_groups(
+                [group, *groups],
+                buf=(),
+                limit=limit,
+                carry=carry,
+                end_limit=end_limit,
+                seps=seps,
+            )
+        else:
+            if len(group) > 1 or set(group) == {0}:
+                yield bomp.compressed_group(group)
+            else:
+                yield bomp.raw_group(group)
+    if buf:
+        if len(set(buf)) == 1 and len(buf) > end_limit:
+            yield bomp.compressed_group(buf)
+        elif seps and bytes(buf) == seps:
+            yield bomp.compressed_group(buf)
+        else:
+            yield bomp.raw_group(buf)
+
+
+def list_encode_image(
+    bmap: Sequence[Sequence[int]],
+    *,
+    limit: int = 4,
+    carry: bool = True,
+    end_limit: int = 1,
+    seps: bytes | None = None,
+) -> bytes:
+    buffer = bytearray()
+    for line in bmap:
+        grouped = [list(group) for c, group in itertools.groupby(line)]
+        eg = list(
+            list_encode_groups(
+                grouped,
+                buf=(),
+                limit=limit,
+                carry=carry,
+                end_limit=end_limit,
+                seps=seps,
+            ),
+        )
+        linedata = b''.join(bytes([ll, *g]) for ll, g in eg)
+        buffer += wrap_uint16le(linedata)
+    return bytes(buffer)
+
+
+def make_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Object image with transparent areas, flat runs and some noise."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.choice([1, 1, 2, 3, 4, 6, 10, 40], size=(height, width))
+    values = rng.choice([0, 0, 39, 39, 5, 9, 200, 201], size=(height, width))
+    return np.stack(
+        [
+            np.repeat(val, length)[:width]
+            for val, length in zip(values, lengths, strict=True)
+        ],
+    ).astype(np.uint8)
+
+
+def timed(stmt: Callable[[], object], number: int) -> float:
+    return timeit.timeit(stmt, number=number) / number
+
+
+def bench(width: int, height: int, number: int) -> None:
+    image = make_image(width, height)
+    for limit, carry, end_limit, seps in PARAMS:
+        params = {'limit': limit, 'carry': carry, 'end_limit': end_limit, 'seps': seps}
+        data = bomp.encode_image(image, **params)
+        assert list_encode_image(image.tolist(), **params) == data
+        before = timed(lambda: list_encode_image(image.tolist(), **params), number)  # noqa: B023
+        after = timed(lambda: bomp.encode_image(image, **params), number)  # noqa: B023
+        print(
+            f'  encode {limit} {carry!s:>5} {end_limit} {seps!r:>7}:'
+            f' lists {before * 1e3:8.2f} ms, runs {after * 1e3:8.2f} ms,'
+            f' {before / after:6.1f}x',
+        )
+
+    data = bomp.encode_image(image)
+    line = b''.join(
+        bomp.base.unwrap_uint16le(stream)
+        for stream in [io.BytesIO(data)]
+        for _ in range(height)
+    )
+    size = width * height
+    assert list_decode_line(line, size) == bomp.decode_line(line, size)
+    before = timed(lambda: list_decode_line(line, size), number)
+    after = timed(lambda: bomp.decode_line(line, size), number)
+    print(
+        f'  decode line: lists {before * 1e3:8.2f} ms,'
+        f' runs {after * 1e3:8.2f} ms, {before / after:6.1f}x',
+    )
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='benchmark BOMP encoding and decoding')
+    parser.add_argument('--number', type=int, default=10)
+    args = parser.parse_args()
+
+    for width, height in ((64, 96), (640, 480)):
+        print(f'{width}x{height}')
+        bench(width, height, args.number)
@@ -0,0 +1,104 @@
+import io
+import itertools
+import timeit
+
+import numpy as np
+
+from nutcracker.codex import bpp_cost
+
+
+def list_decode1(
+    width: int,
+    height: int,
+    num_colors: int,
+    stream: io.BytesIO,
+) -> np.ndarray:
+    # decoding as done before run arrays
+    shift, mask = bpp_cost.MASKS[num_colors]
+    out = bytearray()
+    decoded_size = width * height
+    while len(out) < decoded_size:
+        rep = stream.read(1)[0]
+        color = rep >> shift
+        rep &= mask
+        if rep == 0:
+            rep = stream.read(1)[0]
+        out += bytes([color]) * rep
+    return np.frombuffer(out[:decoded_size], dtype=np.uint8).reshape(
+        (height, width),
+        order='F',
+    )
+
+
+def list_encode1(image: np.ndarray, num_colors: int) -> bytes:
+    # encoding as done before run arrays
+    shift, mask = bpp_cost.MASKS[num_colors]
+    output = bytearray()
+    for value, group in itertools.groupby(image.T.tobytes()):
+        glen = len(list(group))
+        while glen > 255:
+            output += bytes([value << shift, 255])
+            glen -= 255
+        if glen > mask:
+            output += bytes([value << shift, glen])
+        else:
+            output += bytes([value << shift | glen])
+    return bytes(output)
+
+
+def make_image(width: int, height: int, num_colors: int, seed: int = 0) -> np.ndarray:
+    """Costume frame with transparent margins and runs of few colors."""
+    rng = np.random.default_rng(seed)
+    values = rng.integers(1, num_colors, size=(width, height))
+    runs = rng.integers(1, 6, size=(width, height)).cumsum(axis=1) // 6
+    image = np.take_along_axis(values, np.minimum(runs, height - 1), axis=1).T
+    image[:, : width // 6] = 0
+    image[:, -width // 6 :] = 0
+    return np.ascontiguousarray(image, dtype=np.uint8)
+
+
+def bench(width: int, height: int, num_colors: int, number: int) -> None:
+    image = make_image(width, height, num_colors)
+    data = bpp_cost.encode1(image, num_colors)
+    assert list_encode1(image, num_colors) == data
+    decoded = bpp_cost.decode1(width, height, num_colors, io.BytesIO(data))
+    assert np.array_equal(decoded, image)
+    assert np.array_equal(
+        list_decode1(width, height, num_colors, io.BytesIO(data)),
+        image,
+    )
+
+    def run(stmt: object) -> float:
+        return timeit.timeit(stmt, number=number) / number
+
+    def decode(func: object) -> np.ndarray:
+        return func(width, height, num_colors, io.BytesIO(data))
+
+    for name, before, after in (
+        (
+            'encode',
+            run(lambda: list_encode1(image, num_colors)),
+            run(lambda: bpp_cost.encode1(image, num_colors)),
+        ),
+        (
+            'decode',
+            run(lambda: decode(list_decode1)),
+            run(lambda: decode(bpp_cost.decode1)),
+        ),
+    ):
+        print(
+            f'{width}x{height} {num_colors} colors {name}:'
+            f' lists {before * 1e3:8.3f} ms/frame,'
+            f' runs {after * 1e3:8.3f} ms/frame, {before / after:6.1f}x',
+        )
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='benchmark costume codec 1')
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args()
+
+    for width, height, num_colors in ((16, 24, 16), (48, 72, 32), (160, 120, 64)):
+        bench(width, height, num_colors, args.number)
@@ -0,0 +1,80 @@
+import io
+import itertools
+import timeit
+
+import numpy as np
+
+from nutcracker.codex import rle
+from nutcracker.codex.base import unwrap_uint16le
+
+
+def list_decode_rle_group(line: bytes, width: int) -> list[int]:
+    # line decoding as done before run arrays
+    out = [0 for _ in range(width)]
+    currx = 0
+    with io.BytesIO(line) as stream:
+        while stream.tell() < len(line) and currx < width:
+            code = ord(stream.read(1))
+            if code & 1:  # skip count
+                currx += code >> 1
+            else:
+                count = (code >> 2) + 1
+                out[currx : currx + count] = (
+                    stream.read(1) * count if code & 2 else stream.read(count)
+                )
+                currx += count
+    return out
+
+
+def list_decode_lined_rle(data: bytes, width: int, height: int) -> list[list[int]]:
+    # regrouping was done for every frame, also without verify
+    with io.BytesIO(data) as stream:
+        lines = [unwrap_uint16le(stream) for _ in range(height)]
+    output = [list_decode_rle_group(line, width) for line in lines]
+    for line in lines:
+        groups = list(rle.decode_rle_group_gen(line, width))
+        regrouped = [
+            list(group)
+            for _, group in itertools.groupby(b''.join(bytes(g) for _, g in groups))
+        ]
+        list(rle.encode_rle_groups(regrouped))
+    return output
+
+
+def make_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Frame with transparent margins, flat areas and some noise."""
+    rng = np.random.default_rng(seed)
+    values = rng.choice([0, 0, 0, 7, 7, 7, 7, 12, 200, 201], size=(height, width))
+    runs = rng.integers(1, 12, size=(height, width)).cumsum(axis=1) // 12
+    image = np.take_along_axis(values, np.minimum(runs, width - 1), axis=1)
+    image[:, : width // 8] = 0
+    return image.astype(np.uint8)
+
+
+def bench(width: int, height: int, number: int) -> None:
+    data = rle.encode_lined_rle(make_image(width, height).tolist())
+    reference = list_decode_lined_rle(data, width, height)
+    current = rle.decode_lined_rle(data, width, height, verify=False)
+    assert np.array_equal(np.asarray(reference, dtype=np.uint8), current)
+
+    def run(func: object) -> float:
+        stmt = lambda: func(data, width, height)  # noqa: E731
+        return timeit.timeit(stmt, number=number) / number
+
+    before = run(list_decode_lined_rle)
+    after = run(lambda *args: rle.decode_lined_rle(*args, verify=False))
+    print(
+        f'{width}x{height}: lists {before * 1e3:8.2f} ms/frame,'
+        f' runs {after * 1e3:8.2f} ms/frame, {before / after:6.1f}x',
+    )
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='benchmark lined RLE decoding')
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    for width, height in ((8, 12), (64, 96), (320, 200)):
+        bench(width, height, args.number)
@@ -0,0 +1,264 @@
+import contextlib
+import io
+import itertools
+import timeit
+from collections.abc import Callable, Iterator
+from functools import partial
+
+import numpy as np
+
+from nutcracker.codex import smap
+from nutcracker.utils.funcutils import grouper
+
+STRIP_WIDTH = 8
+
+
+def string_bits(stream: io.BytesIO) -> Iterator[int]:
+    # bit expansion as done before table driven decoding
+    return (int(x) for x in ''.join(f'{x:08b}'[::-1] for x in stream.read()))
+
+
+def collect_bits(bits: Iterator[int], count: int) -> int:
+    return int(''.join(str(next(bits)) for _ in range(count))[::-1], 2)
+
+
+def string_decode_basic(stream: io.BytesIO, decoded_size: int, palen: int) -> bytes:
+    out = bytearray(stream.read(1))
+    color, sub = out[0], 1
+    bits = string_bits(stream)
+    while len(out) < decoded_size:
+        if next(bits):
+            if next(bits):
+                if next(bits):
+                    sub = -sub
+                color -= sub
+            else:
+                color = collect_bits(bits, palen)
+                sub = 1
+        out.append(color % 256)
+    return bytes(out)
+
+
+def string_decode_he(stream: io.BytesIO, decoded_size: int, palen: int) -> bytes:
+    out = bytearray(stream.read(1))
+    color = out[0]
+    bits = string_bits(stream)
+    while len(out) < decoded_size:
+        if next(bits):
+            if next(bits):
+                color += smap.HE_DELTA_COLOR[collect_bits(bits, 3)]
+            else:
+                color = collect_bits(bits, palen)
+        out.append(color % 256)
+    return bytes(out)
+
+
+def string_decode_run_majmin(
+    stream: io.BytesIO,
+    decoded_size: int,
+    palen: int,
+) -> bytes:
+    out = bytearray(stream.read(1))
+    color = out[0]
+    bits = string_bits(stream)
+    while len(out) < decoded_size:
+        if next(bits):
+            if next(bits):
+                shift = collect_bits(bits, 3) - 4
+                if shift:
+                    color += shift
+                else:
+                    out += bytes([color % 256]) * (collect_bits(bits, 8) - 1)
+            else:
+                color = collect_bits(bits, palen)
+        out.append(color % 256)
+    return bytes(out)
+
+
+def string_pack(bits: list[int]) -> bytes:
+    # bit packing as done before packbits encoding
+    gbits = grouper((str(x) for x in bits), 8, fillvalue='0')
+    return bytes(int(''.join(byte)[::-1], 2) for byte in gbits)
+
+
+def string_encode_basic(data: bytes, palen: int) -> bytes:
+    bits = []
+    color = data[0]
+    sub = 1
+    for curr in data[1:]:
+        if curr == color:
+            bits.append(0)
+        elif color - curr == sub:
+            bits.extend([1, 1, 0])
+        elif curr - color == sub:
+            bits.extend([1, 1, 1])
+            sub = -sub
+        else:
+            bits.extend([1, 0])
+            bits.extend(int(x) for x in f'{curr:0{palen}b}'[::-1])
+            sub = 1
+        color = curr
+    return data[:1] + string_pack(bits)
+
+
+def string_encode_he(data: bytes, palen: int) -> bytes:
+    delta_color = list(smap.HE_DELTA_COLOR)
+    bits = []
+    color = data[0]
+    for curr in data[1:]:
+        if curr == color:
+            bits.append(0)
+        elif curr - color in delta_color:
+            bits.extend([1, 1])
+            bits.extend(int(x) for x in f'{delta_color.index(curr - color):03b}'[::-1])
+        else:
+            bits.extend([1, 0])
+            bits.extend(int(x) for x in f'{curr:0{palen}b}'[::-1])
+        color = curr
+    return data[:1] + string_pack(bits)
+
+
+def string_encode_run_majmin(data: bytes, palen: int, limit: int = 255) -> bytes:
+    bits = []
+    color = None
+    for curr, group in itertools.groupby(data):
+        repeats = len(list(group)) - 1
+        if not bits:
+            bits.extend(int(x) for x in f'{curr:08b}'[::-1])
+        elif -4 <= curr - color < 4:
+            bits.extend([1, 1])
+            bits.extend(int(x) for x in f'{curr - color + 4:03b}'[::-1])
+        else:
+            bits.extend([1, 0])
+            bits.extend(int(x) for x in f'{curr:0{palen}b}'[::-1])
+        color = curr
+        while repeats:
+            count = min(repeats, 255)
+            repeats -= count
+            if count > limit:
+                bits.extend([1, 1, 0, 0, 1])
+                bits.extend(int(x) for x in f'{count:08b}'[::-1])
+            else:
+                bits.extend([0] * count)
+    return string_pack(bits)
+
+
+def make_strip(height: int, palen: int, seed: int = 0) -> bytes:
+    """Pixels of strip with runs, small steps and some new colors."""
+    rng = np.random.default_rng(seed)
+    steps = rng.choice(
+        [0, 0, 0, 0, 0, 0, 1, -1, 2, -3, 4, 37], size=height * STRIP_WIDTH
+    )
+    return bytes((np.cumsum(steps) % (1 << palen)).astype(np.uint8))
+
+
+DecodeFunc = Callable[[io.BytesIO, int, int], object]
+EncodeFunc = Callable[[bytes, int], bytes]
+
+
+def bench_encode(height: int, palen: int, number: int) -> None:
+    data = make_strip(height, palen)
+    for name, reference, current in (
+        ('basic', string_encode_basic, smap.encode_basic),
+        ('he', string_encode_he, smap.encode_he),
+        (
+            'majmin',
+            partial(string_encode_run_majmin, limit=12),
+            partial(smap.encode_run_majmin, limit=12),
+        ),
+    ):
+        assert reference(data, palen) == current(data, palen)
+
+        def run(func: EncodeFunc) -> float:
+            stmt = lambda: func(data, palen)  # noqa: E731
+            return timeit.timeit(stmt, number=number) / number
+
+        before, after = run(reference), run(current)
+        print(
+            f'{name:>8}: string {before * 1e3:8.2f} ms/strip,'
+            f' packbits {after * 1e3:8.2f} ms/strip, {before / after:6.1f}x',
+        )
+
+
+def bench(height: int, palen: int, number: int) -> None:
+    data = make_strip(height, palen)
+    size = len(data)
+    for name, encode, reference, current in (
+        ('basic', smap.encode_basic, string_decode_basic, smap.decode_basic),
+        ('he', smap.encode_he, string_decode_he, smap.decode_he),
+        (
+            'majmin',
+            partial(smap.encode_run_majmin, limit=255),
+            string_decode_run_majmin,
+            smap.decode_run_majmin,
+        ),
+    ):
+        encoded = encode(data, palen)
+        assert reference(io.BytesIO(encoded), size, palen) == data
+        assert current(io.BytesIO(encoded), size, palen).tobytes() == data
+
+        def run(func: DecodeFunc) -> float:
+            stmt = lambda: func(io.BytesIO(encoded), size, palen)  # noqa: B023, E731
+            return timeit.timeit(stmt, number=number) / number
+
+        before, after = run(reference), run(current)
+        print(
+            f'{name:>8}: string {before * 1e3:8.2f} ms/strip,'
+            f' table {after * 1e3:8.2f} ms/strip, {before / after:6.1f}x',
+        )
+
+
+def bench_jobs(height: int, width: int, jobs: int, number: int) -> None:
+    num_strips = width // STRIP_WIDTH
+    image = np.hstack(
+        [
+            np.frombuffer(make_strip(height, 8, seed), dtype=np.uint8).reshape(
+                height,
+                STRIP_WIDTH,
+            )
+            for seed in range(num_strips)
+        ],
+    )
+    codes = [(0x1C, 0x44, 0x6C, 0x8A)[idx % 4] for idx in range(num_strips)]
+
+    def run(func: Callable[[int], object]) -> tuple[float, float]:
+        # strips are printed while parsed, timing is without the output
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert func(1) == func(jobs)
+            serial = timeit.timeit(lambda: func(1), number=number) / number
+            parallel = timeit.timeit(lambda: func(jobs), number=number) / number
+        return serial, parallel
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = smap.encode_smap(image, codes=codes)
+    for name, func in (
+        ('encode', lambda jobs: smap.encode_smap(image, codes=codes, jobs=jobs)),
+        (
+            'decode',
+            lambda jobs: smap.decode_smap(height, width, data, jobs=jobs).tobytes(),
+        ),
+    ):
+        serial, parallel = run(func)
+        print(
+            f'{name:>8}: serial {serial * 1e3:8.2f} ms/image,'
+            f' {jobs} jobs {parallel * 1e3:8.2f} ms/image, {serial / parallel:6.1f}x',
+        )
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='benchmark SMAP strip codecs')
+    parser.add_argument('--height', type=int, default=480, help='strip height')
+    parser.add_argument('--palen', type=int, default=8, help='palette bit length')
+    parser.add_argument('--number', type=int, default=20)
+    parser.add_argument('--width', type=int, default=2048, help='room width')
+    parser.add_argument('--jobs', type=int, default=4, help='strip worker processes')
+    args = parser.parse_args()
+
+    print('decode')
+    bench(args.height, args.palen, args.number)
+    print('encode')
+    bench_encode(args.height, args.palen, args.number)
+    print('image')
+    bench_jobs(args.height, args.width, args.jobs, max(1, args.number // 10))
@@ -0,0 +1,66 @@
+import timeit
+from collections.abc import Iterable, Iterator
+
+from parse import parse  # type: ignore[import-untyped]
+
+from nutcracker.kernel2.element import Element
+from nutcracker.sputm.preset import sputm
+
+TAGS = ('RMHD', 'CYCL', 'TRNS', 'PALS', 'RMIM', 'OBIM', 'OBCD', 'EXCD', 'ENCD')
+SCHEMA: dict[str, set[str]] = {
+    'LECF': {'LFLF'},
+    'LFLF': {'ROOM'},
+    'ROOM': set(TAGS),
+    **{tag: set() for tag in TAGS},
+}
+
+
+def parse_findall(tag: str, root: Iterable[Element] | Element) -> Iterator[Element]:
+    # matching as done before patterns were compiled
+    if isinstance(root, Element):
+        root = root.children()
+    for elem in root:
+        if parse(tag, elem.tag, evaluate_result=False):
+            yield elem
+
+
+def make_game(rooms: int, objects: int) -> bytes:
+    chunks = [sputm.mktag(tag, b'\0' * 16) for tag in TAGS[:5]]
+    chunks += [sputm.mktag(tag, b'\0' * 16) for tag in TAGS[5:] for _ in range(objects)]
+    room = sputm.mktag('ROOM', sputm.write_chunks(chunks))
+    lflf = sputm.mktag('LFLF', bytes(room))
+    return bytes(sputm.mktag('LECF', sputm.write_chunks([lflf] * rooms)))
+
+
+def bench(rooms: int, objects: int, number: int) -> None:
+    cfg = sputm(schema=SCHEMA)
+    root = next(cfg.map_chunks(make_game(rooms, objects)))
+    rooms_elems = [
+        room for lflf in root.children() for room in sputm.findall('ROOM', lflf)
+    ]
+
+    def current(tag: str) -> None:
+        for room in rooms_elems:
+            sputm.find(tag, room)
+
+    def reference(tag: str) -> None:
+        for room in rooms_elems:
+            next(parse_findall(tag, room), None)
+
+    for name, func in (('parse', reference), ('compiled', current)):
+        for tag in ('RMHD', 'ENCD', 'IM{:02x}'):
+            elapsed = timeit.timeit(lambda: func(tag), number=number)  # noqa: B023
+            rate = number * len(rooms_elems) / elapsed
+            print(f'{name:>8} find({tag!r}): {rate:12.0f} lookups/s')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='benchmark tree tag queries')
+    parser.add_argument('--rooms', type=int, default=100)
+    parser.add_argument('--objects', type=int, default=50)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    bench(args.rooms, args.objects, args.number)
@@ -0,0 +1,51 @@
+import io
+import os
+import time
+from collections.abc import Callable
+from typing import IO
+
+from nutcracker.chiper import xor
+
+
+def generator_write(stream: IO[bytes], data: bytes, key: int = xor.CHIPER_KEY) -> int:
+    # encryption as done before block processing
+    return stream.write(bytes(b ^ key for b in data))
+
+
+def throughput(func: Callable[[], object], size: int, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return size * number / (time.perf_counter() - start) / (1 << 20)
+
+
+def bench(size: int, number: int) -> None:
+    data = os.urandom(size)
+    encrypted = io.BytesIO()
+    xor.write(encrypted, data)
+
+    def write(func: Callable[[IO[bytes], bytes], int]) -> Callable[[], int]:
+        return lambda: func(io.BytesIO(), data)
+
+    def read() -> bytes:
+        encrypted.seek(0)
+        return xor.read(encrypted)
+
+    assert read() == data
+    for name, func, repeat in (
+        ('generator write', write(generator_write), 1),
+        ('block write', write(xor.write), number),
+        ('read', read, number),
+    ):
+        print(f'{name:>16}: {throughput(func, size, repeat):10.1f} MB/s')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='benchmark xor encryption')
+    parser.add_argument('--size', type=int, default=16 << 20, help='bytes per run')
+    parser.add_argument('--number', type=int, default=10)
+    args = parser.parse_args()
+
+    bench(args.size, args.number)
@@ -1,23 +1,45 @@
+import functools
 from typing import IO
 
+import numpy as np
+
+from nutcracker.utils import copyio
+
 CHIPER_KEY = 0x69
 
 
-def read(stream: IO[bytes], size: int | None = None, key: int = CHIPER_KEY) -> bytes:
-    # None reads until EOF
-    return bytes(b ^ key for b in stream.read(size))  # type: ignore[arg-type]
+@functools.cache
+def _table(key: int) -> bytes:
+    return bytes(b ^ key for b in range(256))
 
 
-def write(stream: IO[bytes], data: bytes, key: int = CHIPER_KEY) -> int:
-    return stream.write(bytes(b ^ key for b in data))
+def read(stream: IO[bytes], size: int | None = None, key: int = CHIPER_KEY) -> bytes:
+    # None reads until EOF
+    return stream.read(size).translate(_table(key))  # type: ignore[arg-type]
+
+
+def write(
+    stream: IO[bytes],
+    data: bytes,
+    key: int = CHIPER_KEY,
+    block_size: int = copyio.BLOCK_SIZE,
+) -> int:
+    if not key:
+        return copyio.write_all(stream, data)
+    # encrypt block by block into reused buffer to keep memory bounded
+    scratch = np.empty(min(len(data), block_size), dtype=np.uint8)
+    written = 0
+    for block in copyio.blocks(data, block_size):
+        out = scratch[: len(block)]
+        np.bitwise_xor(np.frombuffer(block, dtype=np.uint8), key, out=out)
+        written += copyio.write_all(stream, out)
+    return written
 
 
 if __name__ == '__main__':
     import argparse
     from functools import partial
 
-    from nutcracker.utils import copyio
-
     parser = argparse.ArgumentParser(description='read smush file')
     parser.add_argument('filename', help='filename to read from')
     parser.add_argument('output', help='filename to read from')
@@ -2,6 +2,9 @@ import struct
 from functools import partial
 from typing import IO
 
+import numpy as np
+from numpy.typing import NDArray
+
 UINT16LE = struct.Struct('<H')
 
 
@@ -15,3 +18,72 @@ def unwrap(structure: struct.Struct, stream: IO[bytes]) -> bytes:
 
 wrap_uint16le = partial(wrap, UINT16LE)
 unwrap_uint16le = partial(unwrap, UINT16LE)
+
+
+def uint16le_line_bounds(
+    data: bytes,
+    count: int,
+) -> tuple[NDArray[np.intp], NDArray[np.intp]]:
+    """Data start and end of `count` lines each prefixed with uint16le size."""
+    starts, ends = [], []
+    pos = 0
+    for _ in range(count):
+        (size,) = UINT16LE.unpack_from(data, pos)
+        starts.append(pos + UINT16LE.size)
+        pos = min(pos + UINT16LE.size + size, len(data))
+        ends.append(pos)
+    return np.asarray(starts, dtype=np.intp), np.asarray(ends, dtype=np.intp)
+
+
+def code_positions(
+    steps: NDArray[np.intp],
+    starts: NDArray[np.intp],
+    ends: NDArray[np.intp],
+) -> NDArray[np.intp]:
+    """Positions of codes in lines of data, found by pointer doubling.
+
+    Code at position `p` is followed by code at `p + steps[p]`,
+    lines are consecutive [start, end) ranges.
+    """
+    size = len(steps)
+    if not len(starts):
+        return np.zeros(0, dtype=np.intp)
+    gaps = starts - np.concatenate([[0], ends[:-1]])
+    line_ends = np.zeros(size + 1, dtype=np.intp)
+    line_ends[: int(ends[-1])] = np.repeat(
+        np.stack([np.zeros_like(ends), ends], axis=1).ravel(),
+        np.stack([gaps, ends - starts], axis=1).ravel(),
+    )
+    # line end leads to position past data, path stays there
+    jump = np.append(np.arange(size) + steps, size)
+    jump[jump >= line_ends] = size
+
+    path = starts[starts < ends]
+    while True:
+        # jump leads as many steps further as codes are on path of each line
+        step = jump[path]
+        step = step[step < size]
+        if not len(step):
+            return np.sort(path)
+        path = np.concatenate([path, step])
+        jump = jump[jump]
+
+
+def expand_runs(
+    data: NDArray[np.uint8],
+    positions: NDArray[np.intp],
+    counts: NDArray[np.intp],
+    raw: NDArray[np.bool_],
+) -> NDArray[np.uint8]:
+    """Pixels of runs whose codes are at `positions` of data.
+
+    Raw runs copy `count` bytes after their code, others repeat the next byte.
+    """
+    padded = np.append(data, np.zeros(1, dtype=data.dtype))
+    out = np.repeat(padded[positions + 1], counts)
+    # raw bytes of data are in same order as raw runs of output
+    marks = np.zeros(len(padded) + 1, dtype=np.int8)
+    marks[positions[raw] + 1] = 1
+    marks[positions[raw] + 1 + counts[raw]] -= 1
+    out[np.repeat(raw, counts)] = padded[np.cumsum(marks[:-1], dtype=np.int8) > 0]
+    return out
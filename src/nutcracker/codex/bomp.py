@@ -3,6 +3,7 @@ import itertools
 from collections.abc import Iterable, Iterator, Sequence
 
 import numpy as np
+from numpy.typing import NDArray
 
 from nutcracker.codex import base
 from nutcracker.kernel.buffer import BufferLike, UnexpectedBufferSize
@@ -21,39 +22,86 @@ def iter_decode(src: BufferLike) -> Iterator[tuple[int, list[int]]]:
             yield code, list(run_line)
 
 
-def decode_line(
-    src: BufferLike,
+# trailing data of lines known to be padding
+_PADDING = {b'', b'\x00', bytes(26)}
+
+
+def _decode_lines(
+    data: BufferLike,
+    starts: NDArray[np.intp],
+    ends: NDArray[np.intp],
     decoded_size: int | None = None,
     fill_value: bytes | None = None,
-) -> bytes:
-    buffer = bytearray()
-    with io.BytesIO(src) as stream:
-        while stream.tell() < len(src):
-            if decoded_size and len(buffer) >= decoded_size:
-                rest = stream.read()
-                if rest not in {
-                    b'',
-                    b'\x00',
-                    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00',
-                }:
-                    print(f'WARNING: {rest!r}', decoded_size)
-                    decoded_rest = decode_line(rest)
-                    print('WARNING:', decoded_rest, len(decoded_rest))
-
-                break
+) -> list[NDArray[np.uint8]] | NDArray[np.uint8]:
+    """Decode run codes of each [start, end) line of data at once.
 
-            code = stream.read(1)[0]
-            run_len = (code // 2) + 1
-            run_line = stream.read(1) * run_len if code & 1 else stream.read(run_len)
-            buffer += run_line
+    With `decoded_size`, codes after line is filled are not decoded,
+    gives image of lines unless some line has different size.
+    """
+    view = np.frombuffer(data, dtype=np.uint8)
+    codes = view[: int(ends[-1]) if len(ends) else 0].astype(np.intp)
+    pos = base.code_positions(
+        np.where(codes & 1, 2, (codes >> 1) + 2),
+        starts,
+        ends,
+    )
+    code = codes[pos]
+    line = np.searchsorted(starts, pos, side='right') - 1
+    fill = code & 1 == 1
+    run_len = (code >> 1) + 1
+    line_ends = ends[line]
+    # runs are cut at end of line data
+    counts = np.where(
+        fill,
+        np.where(pos + 1 < line_ends, run_len, 0),
+        np.minimum(run_len, line_ends - pos - 1),
+    )
 
-    if decoded_size and len(buffer) != decoded_size:
-        if len(buffer) < decoded_size and fill_value is not None:
-            buffer += fill_value * (decoded_size - len(buffer))
-        else:
-            raise UnexpectedBufferSize(decoded_size, len(buffer), buffer)
+    if decoded_size:
+        before = np.cumsum(counts) - counts
+        first = np.flatnonzero(np.diff(line, prepend=-1))
+        before -= np.repeat(before[first], np.diff(first, append=len(pos)))
+        used = before < decoded_size
+        # first unused code of line starts rest of line
+        for idx in np.flatnonzero(np.diff(used.astype(np.int8)) < 0) + 1:
+            rest = bytes(view[pos[idx] : ends[line[idx]]])
+            if rest not in _PADDING:
+                print(f'WARNING: {rest!r}', decoded_size)
+                decoded_rest = decode_line(rest)
+                print('WARNING:', decoded_rest, len(decoded_rest))
+        pos, line, fill, counts = pos[used], line[used], fill[used], counts[used]
 
-    return bytes(buffer)
+    flat = base.expand_runs(view, pos, counts, ~fill)
+    sizes = np.bincount(line, weights=counts, minlength=len(starts)).astype(np.intp)
+    if decoded_size and (sizes == decoded_size).all():
+        return flat.reshape(len(starts), decoded_size)
+    lines = np.split(flat, np.cumsum(sizes)[:-1])
+    if not decoded_size:
+        return lines
+    for idx, size in enumerate(sizes):
+        if size > decoded_size or (size < decoded_size and fill_value is None):
+            raise UnexpectedBufferSize(decoded_size, size, lines[idx].tobytes())
+    image = np.full((len(starts), decoded_size), fill_value[0], dtype=np.uint8)
+    image[
+        np.repeat(np.arange(len(starts)), sizes),
+        np.arange(len(flat)) - np.repeat(np.cumsum(sizes) - sizes, sizes),
+    ] = flat
+    return image
+
+
+def decode_line(
+    src: BufferLike,
+    decoded_size: int | None = None,
+    fill_value: bytes | None = None,
+) -> bytes:
+    lines = _decode_lines(
+        src,
+        np.zeros(1, dtype=np.intp),
+        np.full(1, len(src), dtype=np.intp),
+        decoded_size,
+        fill_value,
+    )
+    return lines[0].tobytes()
 
 
 def decode_image(
@@ -62,14 +110,16 @@ def decode_image(
     height: int,
     fill_value: bytes | None = None,
 ) -> Sequence[Sequence[int]]:
-    with io.BytesIO(data) as stream:
-        lines = [base.unwrap_uint16le(stream) for _ in range(height)]
-        rest = stream.read()
-        # \xff appears in DIG at AKOS_0102, same also missing bytes on last line which have to be filled
-        assert rest in {b'', b'\0', b'\xff'}, rest
+    starts, ends = base.uint16le_line_bounds(data, height)
+    rest = bytes(data[int(ends[-1]) if height else 0 :])
+    # \xff appears in DIG at AKOS_0102,
+    # same also missing bytes on last line which have to be filled
+    assert rest in {b'', b'\0', b'\xff'}, rest
 
-    buffer = [list(decode_line(line, width, fill_value)) for line in lines]
-    return np.array(buffer, dtype=np.uint8)
+    return np.asarray(
+        _decode_lines(data, starts, ends, width, fill_value),
+        dtype=np.uint8,
+    ).reshape(height, width)
 
 
 BUFFER_LIMIT = 128
@@ -83,82 +133,113 @@ def raw_group(buf: Sequence[int]) -> tuple[int, Sequence[int]]:
     return (2 * (len(buf) - 1), list(buf))
 
 
-def encode_groups(
-    groups: Iterable[Sequence[int]],
-    buf: Sequence[int] = (),
+def _encode_runs(  # noqa: C901, PLR0912, PLR0913
+    line: bytes,
+    bounds: Sequence[int],
+    runs: Sequence[int],
+    buf_len: int = 0,
+    *,
     limit: int = 4,
     carry: bool = True,
     end_limit: int = 1,
     seps: bytes | None = None,
-) -> Iterator[tuple[int, Sequence[int]]]:
-    buf = list(buf)
-    # print('GROUPS', [tuple(g) for g in groups])
-    groups = iter(groups)
-    for group in groups:
-        if len(set(buf)) == 1 and len(buf) > 1:
-            yield compressed_group(buf)
-            buf = []
-
-        if seps and bytes(buf) == seps:
-            yield compressed_group(buf)
-            if len(group) <= limit:
-                yield raw_group(group)
+) -> Iterator[tuple[bool, int, int]]:
+    """Codes of line as (compressed, start, end) spans.
+
+    Groups of equal values in line start at `bounds`, after buffer of `buf_len`.
+    `runs` numbers runs of equal values for each pixel,
+    buffer is always span of line right before current group.
+    """
+
+    def same(start: int, end: int) -> bool:
+        return runs[start] == runs[end - 1]
+
+    bstart, bend = 0, buf_len
+    groups = list(zip(bounds, [*bounds[1:], len(line)], strict=True))
+    idx = 0
+    while idx < len(groups):
+        gstart, gend = groups[idx]
+        idx += 1
+        if bend - bstart > 1 and same(bstart, bend):
+            yield True, bstart, bend
+            bstart = bend
+
+        if seps and line[bstart:bend] == seps:
+            yield True, bstart, bend
+            if gend - gstart <= limit:
+                yield False, gstart, gend
             else:
-                yield raw_group(group[:1])
-                yield compressed_group(group[1:])
-            buf = []
+                yield False, gstart, gstart + 1
+                yield True, gstart + 1, gend
+            bstart = bend = gend
             continue
 
-        assert isinstance(buf, list)
-        if len(group) < limit or len(buf) + limit > BUFFER_LIMIT:
-            if seps and bytes(group) == seps:
-                if buf:
-                    yield raw_group(buf)
-                buf = group
+        if gend - gstart < limit or bend - bstart + limit > BUFFER_LIMIT:
+            if seps and line[gstart:gend] == seps:
+                if bend > bstart:
+                    yield False, bstart, bend
+                bstart, bend = gstart, gend
                 continue
 
-            buf += group
+            if bend == bstart:
+                bstart = gstart
+            bend = gend
 
-            if len(buf) > BUFFER_LIMIT:
-                yield raw_group(buf[:BUFFER_LIMIT])
-                buf = buf[BUFFER_LIMIT:]
+            if bend - bstart > BUFFER_LIMIT:
+                yield False, bstart, bstart + BUFFER_LIMIT
+                bstart += BUFFER_LIMIT
 
             continue
 
-        if buf:
+        if bend > bstart:
             if carry:
-                buf += group[:1]
-                group = group[1:]
-            yield raw_group(buf)
-            buf = []
-
-        if len(group) > BUFFER_LIMIT:
-            yield compressed_group(group[:BUFFER_LIMIT])
-            group = group[BUFFER_LIMIT:]
-            assert not buf
-            yield from encode_groups(
-                [group, *groups],
-                buf=(),
-                limit=limit,
-                carry=carry,
-                end_limit=end_limit,
-                seps=seps,
-            )
-        else:
-            # print('AAA 1', (2 * (len(group) - 1) + 1, group[:1]))
-            if len(group) > 1 or set(group) == {0}:
-                # print('AAA 1', (2 * (len(group) - 1) + 1, group[:1]))
-                yield compressed_group(group)
-            else:
-                # print('AAA 2', (2 * (len(group) - 1), list(group)))
-                yield raw_group(group)
-    if buf:
-        if len(set(buf)) == 1 and len(buf) > end_limit:
-            yield compressed_group(buf)
-        elif seps and bytes(buf) == seps:
-            yield compressed_group(buf)
+                bend = gstart = gstart + 1
+            yield False, bstart, bend
+        bstart = bend = gend
+
+        if gend - gstart > BUFFER_LIMIT:
+            yield True, gstart, gstart + BUFFER_LIMIT
+            # rest of group is encoded as next group
+            idx -= 1
+            groups[idx] = (gstart + BUFFER_LIMIT, gend)
+        elif gend - gstart > 1 or line[gstart] == 0:
+            yield True, gstart, gend
         else:
-            yield raw_group(buf)
+            yield False, gstart, gend
+
+    if bend > bstart:
+        yield (
+            (bend - bstart > end_limit and same(bstart, bend))
+            or bool(seps and line[bstart:bend] == seps),
+            bstart,
+            bend,
+        )
+
+
+def encode_groups(
+    groups: Iterable[Sequence[int]],
+    buf: Sequence[int] = (),
+    limit: int = 4,
+    carry: bool = True,
+    end_limit: int = 1,
+    seps: bytes | None = None,
+) -> Iterator[tuple[int, Sequence[int]]]:
+    groups = [list(group) for group in groups]
+    line = bytes([*buf, *itertools.chain.from_iterable(groups)])
+    bounds = list(itertools.accumulate(len(group) for group in groups[:-1]))
+    runs = list(itertools.accumulate(a != b for a, b in itertools.pairwise(line)))
+    for compressed, start, end in _encode_runs(
+        line,
+        [len(buf) + bound for bound in [0, *bounds]] if groups else [],
+        [0, *runs],
+        len(buf),
+        limit=limit,
+        carry=carry,
+        end_limit=end_limit,
+        seps=seps,
+    ):
+        span = list(line[start:end])
+        yield compressed_group(span) if compressed else raw_group(span)
 
 
 def encode_image(
@@ -168,22 +249,28 @@ def encode_image(
     end_limit: int = 1,
     seps: bytes | None = None,
 ) -> bytes:
+    image = np.asarray(bmap, dtype=np.uint8)
+    # groups of equal values in each line
+    changes = np.diff(image, axis=1, prepend=image[:, :1]) != 0
+    rows, cols = np.nonzero(changes)
+    row_bounds = np.split(cols, np.searchsorted(rows, np.arange(1, len(image))))
+    runs = np.cumsum(changes, axis=1).tolist()
     buffer = bytearray()
-    for line in bmap:
-        grouped = [list(group) for c, group in itertools.groupby(line)]
-        eg = list(
-            encode_groups(
-                grouped,
-                buf=(),
-                limit=limit,
-                carry=carry,
-                end_limit=end_limit,
-                seps=seps,
-            ),
-        )
-        # print('ENCODED', eg)
-        linedata = b''.join(bytes([ll, *g]) for ll, g in eg)
-        buffer += base.wrap_uint16le(linedata)
-    # if len(buffer) % 2:
-    #     buffer += b'\x00'
+    for line, bounds, line_runs in zip(image, row_bounds, runs, strict=True):
+        linedata = bytearray()
+        data = line.tobytes()
+        for compressed, start, end in _encode_runs(
+            data,
+            [0, *bounds.tolist()] if len(data) else [],
+            line_runs,
+            limit=limit,
+            carry=carry,
+            end_limit=end_limit,
+            seps=seps,
+        ):
+            if compressed:
+                linedata += bytes([2 * (end - start - 1) + 1, data[start]])
+            else:
+                linedata += bytes([2 * (end - start - 1)]) + data[start:end]
+        buffer += base.wrap_uint16le(bytes(linedata))
     return bytes(buffer)
@@ -1,8 +1,34 @@
-import itertools
 from typing import IO, Any
 
 import numpy as np
 
+from nutcracker.codex import base
+
+MASKS = {16: (4, 0x0F), 32: (3, 0x07), 64: (2, 0x03)}
+
+
+def _parse_runs(
+    data: bytes,
+    mask: int,
+) -> tuple[np.ndarray[Any, np.intp], np.ndarray[Any, np.intp]]:
+    """Positions and pixel counts of complete codes in data.
+
+    Code holds count in `mask` bits, count of 0 is read from next byte instead.
+    """
+    view = np.frombuffer(data, dtype=np.uint8).astype(np.intp)
+    steps = np.where(view & mask, 1, 2)
+    pos = base.code_positions(
+        steps,
+        np.zeros(1, dtype=np.intp),
+        np.full(1, len(view), dtype=np.intp),
+    )
+    # last code may miss its count byte
+    pos = pos[pos + steps[pos] <= len(view)]
+    counts = view[pos] & mask
+    extended = counts == 0
+    counts[extended] = view[pos[extended] + 1]
+    return pos, counts
+
 
 def decode1(
     width: int,
@@ -12,58 +38,71 @@ def decode1(
     *,
     strict: bool = True,
 ) -> np.ndarray[Any, np.uint8]:
-    masks = {16: (4, 0x0F), 32: (3, 0x07), 64: (2, 0x03)}
-    shift, mask = masks[num_colors]
-
-    out = bytearray()
+    shift, mask = MASKS[num_colors]
     decoded_size = width * height
 
-    try:
-        while len(out) < decoded_size:
-            rep = stream.read(1)[0]
-            color = rep >> shift
-            rep &= mask
-            if rep == 0:
-                rep = stream.read(1)[0]
-            out += bytes([color]) * rep
-
-        return np.frombuffer(out[:decoded_size], dtype=np.uint8).reshape(
-            (height, width),
-            order='F',
-        )
+    start = stream.tell()
+    # codes take at most 2 bytes each, more is read only for runs of 0 pixels
+    data = stream.read(2 * decoded_size)
+    while True:
+        pos, counts = _parse_runs(data, mask)
+        filled = np.cumsum(counts)
+        used = np.searchsorted(filled, decoded_size) + 1 if decoded_size else 0
+        if used <= len(pos):
+            if used:
+                last = int(pos[used - 1])
+                stream.seek(start + last + (1 if data[last] & mask else 2))
+            break
+        more = stream.read(len(data))
+        if not more:
+            if strict:
+                raise IndexError(  # noqa: TRY003
+                    f'stream ended after {filled[-1] if len(pos) else 0}'
+                    f' of {decoded_size} pixels',
+                )
+            # rest of pixels is filled with 0, stream is left at end
+            used = len(pos)
+            break
+        data += more
 
-    except IndexError:
-        if strict:
-            raise
-        out += b'\0' * (decoded_size - len(out))
-        return np.frombuffer(out[:decoded_size], dtype=np.uint8).reshape(
-            (height, width),
-            order='F',
-        )
+    colors = np.frombuffer(data, dtype=np.uint8)[pos[:used]] >> shift
+    out = np.zeros(decoded_size, dtype=np.uint8)
+    pixels = np.repeat(colors, counts[:used])[:decoded_size]
+    out[: len(pixels)] = pixels
+    return out.reshape((height, width), order='F')
 
 
 def encode1(
     image: np.ndarray[Any, np.uint8],
     num_colors: int,
 ) -> bytes:
-    masks = {16: (4, 0x0F), 32: (3, 0x07), 64: (2, 0x03)}
-    assert num_colors in masks, num_colors
-    shift, mask = masks[num_colors]
+    assert num_colors in MASKS, num_colors
+    shift, mask = MASKS[num_colors]
 
-    buffer = image.T.tobytes()
-    output = bytearray()
+    pixels = np.asarray(image).ravel(order='F')
+    if not len(pixels):
+        return b''
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(pixels)) + 1])
+    lengths = np.diff(starts, append=len(pixels))
+    values = pixels[starts].astype(np.intp)
+    invalid = np.flatnonzero(values >= num_colors)
+    if len(invalid):
+        value = values[invalid[0]]
+        raise ValueError(f'Invalid color value: {value} >= {num_colors}')
 
-    grouped = [list(group) for _, group in itertools.groupby(buffer)]
-    for group in grouped:
-        glen = len(group)
-        value = group[0]
-        if value >= num_colors:
-            raise ValueError(f'Invalid color value: {value} >= {num_colors}')
-        while glen > 255:
-            output += bytes([value << shift, 255])
-            glen -= 255
-        if glen > mask:
-            output += bytes([value << shift, glen])
-        else:
-            output += bytes([value << shift | glen])
-    return bytes(output)
+    # runs over 255 pixels are split to codes of 255 and rest
+    full = (lengths - 1) // 255
+    rest = lengths - 255 * full
+    run = np.repeat(np.arange(len(starts)), full + 1)
+    last = np.zeros(len(run), dtype=bool)
+    last[np.cumsum(full + 1) - 1] = True
+    counts = np.where(last, rest[run], 255)
+    # counts over mask are stored in byte after code
+    extended = ~last | (counts > mask)
+    codes = values[run] << shift
+    sizes = 1 + extended
+    offsets = np.cumsum(sizes) - sizes
+    output = np.empty(int(sizes.sum()), dtype=np.uint8)
+    output[offsets] = np.where(extended, codes, codes | counts)
+    output[offsets[extended] + 1] = counts[extended]
+    return output.tobytes()
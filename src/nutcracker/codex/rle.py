@@ -2,6 +2,10 @@ import io
 import itertools
 from collections.abc import Sequence
 
+import numpy as np
+from numpy.typing import NDArray
+
+from . import base
 from .base import unwrap_uint16le, wrap_uint16le
 
 
@@ -23,23 +27,6 @@ def encode_lined_rle(bmap: Sequence[Sequence[int]]) -> bytes:
         return stream.getvalue()
 
 
-def decode_rle_group(line, width):
-    out = [0 for _ in range(width)]
-    currx = 0
-    with io.BytesIO(line) as stream:
-        while stream.tell() < len(line) and currx < width:
-            code = ord(stream.read(1))
-            if code & 1:  # skip count
-                currx += code >> 1
-            else:
-                count = (code >> 2) + 1
-                out[currx : currx + count] = (
-                    stream.read(1) * count if code & 2 else stream.read(count)
-                )
-                currx += count
-    return out
-
-
 def decode_rle_group_gen(line, width):
     with io.BytesIO(line) as stream:
         while stream.tell() < len(line):
@@ -116,18 +103,57 @@ def encode_rle_groups(groups, buf=()):
         yield (4 * (len(buf) - 1), list(buf))
 
 
-def decode_lined_rle(data, width, height, verify=True):
-    with io.BytesIO(data) as stream:
-        lines = [unwrap_uint16le(stream) for _ in range(height)]
-    output = [decode_rle_group(line, width) for line in lines]
-    output2 = [list(decode_rle_group_gen(line, width)) for line in lines]
-
-    for ll, o in zip(lines, output2):
+def _parse_runs(
+    data: bytes,
+    width: int,
+    height: int,
+) -> tuple[NDArray[np.intp], NDArray[np.intp], NDArray[np.intp], NDArray[np.bool_]]:
+    """Runs of all lines as (output offset, count, code position, is raw) arrays.
+
+    Skipped pixels give no run, counts are clipped to line width and line data,
+    codes after line is filled are ignored.
+    """
+    empty = np.zeros(0, dtype=np.intp)
+    if not height or not width:
+        return empty, empty, empty, empty.astype(bool)
+    starts, ends = base.uint16le_line_bounds(data, height)
+    codes = np.frombuffer(data, dtype=np.uint8, count=int(ends[-1])).astype(np.intp)
+    steps = np.where(codes & 1, 1, np.where(codes & 2, 2, (codes >> 2) + 2))
+    pos = base.code_positions(steps, starts, ends)
+    if not len(pos):
+        return empty, empty, empty, empty.astype(bool)
+
+    code = codes[pos]
+    line = np.searchsorted(starts, pos, side='right') - 1
+    skip = code & 1 == 1
+    advance = np.where(skip, code >> 1, (code >> 2) + 1)
+    before = np.cumsum(advance) - advance
+    first = np.flatnonzero(np.diff(line, prepend=-1))
+    currx = before - np.repeat(before[first], np.diff(first, append=len(pos)))
+
+    keep = ~skip & (currx < width)
+    code, pos, line, currx = code[keep], pos[keep], line[keep], currx[keep]
+    raw = code & 2 == 0
+    line_ends = ends[line]
+    counts = np.minimum(advance[keep], width - currx)
+    # runs are cut at end of line data
+    counts = np.where(
+        raw,
+        np.minimum(counts, line_ends - pos - 1),
+        np.where(pos + 1 < line_ends, counts, 0),
+    )
+    return line * width + currx, counts, pos, raw
+
+
+def check_rle_groups(lines: Sequence[bytes], width: int) -> None:
+    """Print lines which would be grouped differently by `encode_rle_groups`."""
+    for ll in lines:
+        o = list(decode_rle_group_gen(ll, width))
         g = [
             list(group)
             for c, group in itertools.groupby(b''.join(bytes(oo) for _, oo in o))
         ]
-        e = [t for t in encode_rle_groups(g)]
+        e = list(encode_rle_groups(g))
         o = [(c, gl[:1]) if c & (1 | 2) else (c, gl) for c, gl in o]
         if e != o:
             print('================')
@@ -135,8 +161,33 @@ def decode_lined_rle(data, width, height, verify=True):
             print('REGROUPED', g)
             print('OGROUPS', o)
             print('ENCODED', e)
+
+
+def decode_lined_rle(data, width, height, verify=True):
+    """Decode lines of run codes into image, skipped pixels are 0.
+
+    Runs are parsed at once, then pixels are gathered from data in one step.
+    With `verify`, lines are checked to encode back the same.
+    """
+    dst, counts, pos, raw = _parse_runs(data, width, height)
+    out = np.zeros((height, width), dtype=np.uint8)
+    # runs are in order, pixels between them are skipped
+    marks = np.zeros(width * height + 1, dtype=np.int8)
+    marks[dst] = 1
+    marks[dst + counts] -= 1
+    out.ravel()[np.cumsum(marks[:-1], dtype=np.int8) > 0] = base.expand_runs(
+        np.frombuffer(data, dtype=np.uint8),
+        pos,
+        counts,
+        raw,
+    )
+
     if verify:
-        encoded = encode_lined_rle(output)
+        with io.BytesIO(data) as stream:
+            lines = [unwrap_uint16le(stream) for _ in range(height)]
+        check_rle_groups(lines, width)
+
+        encoded = encode_lined_rle(out.tolist())
 
         with io.BytesIO(encoded) as stream:
             elines = [unwrap_uint16le(stream) for _ in range(height)]
@@ -152,4 +203,4 @@ def decode_lined_rle(data, width, height, verify=True):
             exit(1)
 
         assert encoded == data, (encoded, data)
-    return output
+    return out
@@ -1,11 +1,11 @@
 import io
-import itertools
-from collections.abc import Sequence
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from functools import partial
 
 import numpy as np
-
-from nutcracker.utils.funcutils import grouper
+from numpy.typing import NDArray
 
 TRANSPARENCY = 255
 
@@ -18,131 +18,241 @@ def read_uint32le(stream):
     return int.from_bytes(stream.read(4), byteorder='little', signed=False)
 
 
-def to_byte(num):
-    return bytes([num % 256])
-
-
-def create_bitsream(stream):
-    sd = stream.read()
-    bits = ''.join(f'{x:08b}'[::-1] for x in sd)
-    return (int(x) for x in bits)
-
+HE_DELTA_COLOR = (-4, -3, -2, -1, 1, 2, 3, 4)
 
-def collect_bits(bitstream, count):
-    # TODO: check if special handling needed when count > 8
-    assert count <= 8
-    return int(''.join(str(next(bitstream)) for _ in range(count))[::-1], 2)
+# operations of codes by their prefix, single 0 bit repeats color
+_SAME, _NEW_COLOR, _DELTA, _BASIC_DEC, _BASIC_FLIP, _RUN = range(6)
 
+# codes are looked up by this many next bits of stream
+PREFIX_BITS = 5
 
-def decode_basic(stream, decoded_size, palen):
-    sub = 1
 
-    with io.BytesIO() as out:
-        color = stream.read(1)[0]
-        bitstream = create_bitsream(stream)
-        out.write(to_byte(color))
+@dataclass(frozen=True)
+class CodeTable:
+    """Length, operation and color delta of code for each possible prefix.
 
-        while out.tell() < decoded_size:
-            if next(bitstream):
-                if next(bitstream):
-                    if next(bitstream):
-                        sub = -sub
-                    color -= sub
-                else:
-                    color = collect_bits(bitstream, palen)
-                    sub = 1
-            out.write(to_byte(color))
-        return out.getvalue()
+    Length does not include color value of `_NEW_COLOR` and count of `_RUN`.
+    """
 
+    lengths: NDArray[np.int64]
+    ops: NDArray[np.int64]
+    deltas: NDArray[np.int64]
 
-def decode_run_majmin(stream, decoded_size, palen):
-    with io.BytesIO() as out:
-        color = stream.read(1)[0]
-        bitstream = create_bitsream(stream)
-        out.write(to_byte(color))
-
-        while out.tell() < decoded_size:
-            if next(bitstream):
-                if next(bitstream):
-                    shift = collect_bits(bitstream, 3) - 4
-                    if shift != 0:
-                        # print(f'SHIFT {shift}')
-                        color += shift
-                    else:
-                        ln = collect_bits(bitstream, 8) - 1
-                        out.write(to_byte(color) * ln)
-                        # print(f'LARGE GROUP {ln + 1}')
-                else:
-                    color = collect_bits(bitstream, palen)
-                    # print(f'NEW COLOR {color}')
-            # else:
-            #     print('SMALL GROUP')
-            out.write(to_byte(color))
-
-        return out.getvalue()
+    @classmethod
+    def create(cls, code: Callable[[int], tuple[int, int, int]]) -> 'CodeTable':
+        table = np.array(
+            [
+                code(bits) if bits & 1 else (1, _SAME, 0)
+                for bits in range(1 << PREFIX_BITS)
+            ],
+            dtype=np.int64,
+        )
+        return cls(*table.T)
+
+
+def _basic_code(bits: int) -> tuple[int, int, int]:
+    if not bits & 0b10:
+        return 2, _NEW_COLOR, 0
+    return 3, _BASIC_FLIP if bits & 0b100 else _BASIC_DEC, 0
+
+
+def _majmin_code(bits: int) -> tuple[int, int, int]:
+    if not bits & 0b10:
+        return 2, _NEW_COLOR, 0
+    shift = (bits >> 2) - 4
+    return (5, _DELTA, shift) if shift else (5, _RUN, 0)
+
+
+def _he_code(bits: int) -> tuple[int, int, int]:
+    if not bits & 0b10:
+        return 2, _NEW_COLOR, 0
+    return 5, _DELTA, HE_DELTA_COLOR[bits >> 2]
+
+
+BASIC_CODES = CodeTable.create(_basic_code)
+MAJMIN_CODES = CodeTable.create(_majmin_code)
+HE_CODES = CodeTable.create(_he_code)
+
+
+def _bit_windows(data: NDArray[np.uint8]) -> NDArray[np.int64]:
+    """Value of next 25 bits (LSB first) at each bit position of data."""
+    padded = np.concatenate([data, np.zeros(4, dtype=np.uint8)]).astype(np.int64)
+    words = padded[:-3] | padded[1:-2] << 8 | padded[2:-1] << 16 | padded[3:] << 24
+    positions = np.arange(len(data) * 8 + 1)
+    return words[positions >> 3] >> (positions & 7)
+
+
+def _follow(nxt: NDArray[np.int64], count: int) -> NDArray[np.int64]:
+    """First `count` positions on path from 0 through `nxt`, by pointer doubling."""
+    path = np.zeros(1, dtype=np.int64)
+    jump = nxt
+    while True:
+        # jump leads `len(path)` steps further
+        path = np.concatenate([path, jump[path]])
+        if len(path) >= count:
+            return path[:count]
+        jump = jump[jump]
+
+
+def _segment_sum(
+    values: NDArray[np.int64], resets: NDArray[np.bool_]
+) -> NDArray[np.int64]:
+    """Cumulative sum of values, restarting at each reset."""
+    total = np.cumsum(values)
+    starts = np.maximum.accumulate(np.where(resets, np.arange(len(values)), 0))
+    return total - total[starts] + values[starts]
+
+
+def decode_bitstream(
+    data: bytes | memoryview,
+    decoded_size: int,
+    palen: int,
+    codes: CodeTable,
+    out: NDArray[np.uint8] | None = None,
+) -> NDArray[np.uint8]:
+    """Decode strip data starting with byte of first color into `out`.
+
+    Code at each bit position is looked up by its prefix in `codes` at once,
+    positions of actual codes are then found by pointer doubling,
+    and colors are accumulated between new colors.
+    """
+    if out is None:
+        out = np.empty(decoded_size, dtype=np.uint8)
+    view = np.frombuffer(data, dtype=np.uint8)
+    out[0] = view[0]
+    count = decoded_size - 1
+    if count <= 0:
+        return out
+
+    nbits = (len(view) - 1) * 8
+    windows = _bit_windows(view[1:])
+    prefixes = windows & ((1 << PREFIX_BITS) - 1)
+    lengths = codes.lengths + np.select(
+        [codes.ops == _NEW_COLOR, codes.ops == _RUN],
+        [palen, 8],
+    )
+    ends = np.arange(nbits + 1) + lengths[prefixes]
+    # codes cannot start at end of data, path stays there
+    nxt = np.minimum(ends, nbits)
+    nxt[nbits] = nbits
+
+    path = _follow(nxt, count)
+    windows = windows[path]
+    ops = codes.ops[prefixes[path]]
+    pixels = np.where(ops == _RUN, np.maximum((windows >> PREFIX_BITS) & 0xFF, 1), 1)
+    total = np.cumsum(pixels)
+    used = int(np.searchsorted(total, count)) + 1
+    if used > count or total[used - 1] != count:
+        raise ValueError('SMAP run exceeds strip size')  # noqa: TRY003
+    path, ops, windows, pixels = path[:used], ops[:used], windows[:used], pixels[:used]
+    if path[-1] == nbits or ends[path[-1]] > nbits:
+        raise ValueError('SMAP bitstream ended before end of strip')  # noqa: TRY003
+
+    new = ops == _NEW_COLOR
+    deltas = codes.deltas[windows & ((1 << PREFIX_BITS) - 1)]
+    basic = (ops == _BASIC_DEC) | (ops == _BASIC_FLIP)
+    if basic.any():
+        # sign of basic step is flipped by each flip since last new color
+        flips = _segment_sum((ops == _BASIC_FLIP).astype(np.int64), new)
+        deltas = np.where(basic, np.where(flips & 1, 1, -1), deltas)
+    values = np.where(new, (windows >> 2) & ((1 << palen) - 1), deltas)
+    colors = _segment_sum(
+        np.concatenate([[view[0]], values]),
+        np.concatenate([[True], new]),
+    )[1:]
+    out[1:] = np.repeat((colors & 0xFF).astype(np.uint8), pixels)
+    return out
+
+
+def decode_basic(stream, decoded_size, palen, out=None):
+    return decode_bitstream(stream.read(), decoded_size, palen, BASIC_CODES, out)
+
+
+def decode_run_majmin(stream, decoded_size, palen, out=None):
+    return decode_bitstream(stream.read(), decoded_size, palen, MAJMIN_CODES, out)
+
+
+def pack_codes(lengths: NDArray[np.int64], values: NDArray[np.int64]) -> bytes:
+    """Pack codes of given bit lengths LSB first, padded with zero bits to bytes.
+
+    Only bits set in values are written, long runs of zero bits are cheap.
+    """
+    offsets = np.cumsum(lengths) - lengths
+    bits = np.zeros(int(lengths.sum()), dtype=np.uint8)
+    for bit in range(int(values.max(initial=0)).bit_length()):
+        selected = (values >> bit) & 1 == 1
+        bits[offsets[selected] + bit] = 1
+    return np.packbits(bits, bitorder='little').tobytes()
+
+
+def _new_color_codes(
+    colors: NDArray[np.int64],
+    palen: int,
+    new: NDArray[np.bool_],
+) -> NDArray[np.int64]:
+    if (colors[new] >> palen).any():
+        raise ValueError(  # noqa: TRY003
+            f'Too many colors: pixel value of {colors[new].max()} in {palen} bits',
+        )
+    return 0b01 | colors << 2
 
 
 def encode_basic(data, palen):
-    bits = []
-    color = data[0]
-    sub = 1
-    for curr in data[1:]:
-        if curr == color:
-            bits.extend([0])
-        elif color - curr == sub:
-            # print(f'SHIFT {curr - color}')
-            bits.extend([1, 1, 0])
-        elif curr - color == sub:
-            # print(f'SHIFT {curr - color}')
-            bits.extend([1, 1, 1])
-            sub = -sub
-        else:
-            # print(f'NEW COLOR {curr}')
-            bits.extend([1, 0])
-            bits.extend(int(x) for x in f'{curr:0{palen}b}'[::-1])
-            sub = 1
-        color = curr
-
-    gbits = grouper((str(x) for x in bits), 8, fillvalue='0')
-    return data[:1] + bytes(int(''.join(byte)[::-1], 2) for byte in gbits)
+    pixels = np.frombuffer(data, dtype=np.uint8).astype(np.int64)
+    deltas = np.diff(pixels)
+    same = deltas == 0
+    step = np.abs(deltas) == 1
+    # sign of steps is -delta of previous step, reset to 1 by new color
+    events = np.maximum.accumulate(np.where(same, -1, np.arange(len(deltas))))
+    previous = np.concatenate([[-1], events])[:-1]
+    subs = np.where(step, -deltas, 1)[previous]
+    subs[previous < 0] = 1
+    flip = step & (deltas == subs)
+    new = ~same & ~step
+    lengths = np.select([same, step, new], [1, 3, 2 + palen])
+    values = np.select(
+        [step & ~flip, flip, new],
+        [0b011, 0b111, _new_color_codes(pixels[1:], palen, new)],
+    )
+    return bytes(data[:1]) + pack_codes(lengths, values)
 
 
 def encode_run_majmin(data, palen, limit=255):
-    bits = []
-    grouped = (list(group) for _, group in itertools.groupby(data))
-    color = None
-    for currs in grouped:
-        curr = currs[0]
-        currs = currs[1:]
-        assert curr != color
-        if not bits:
-            bits.extend(int(x) for x in f'{curr:08b}'[::-1])
-        elif -4 <= curr - color < 4:
-            # print(f'SHIFT {curr - color}')
-            bits.extend([1, 1])
-            bits.extend(int(x) for x in f'{curr - color + 4:03b}'[::-1])
-        else:
-            # print(f'NEW COLOR {curr}')
-            bits.extend([1, 0])
-            bits.extend(int(x) for x in f'{curr:0{palen}b}'[::-1])
-        color = curr
-
-        if currs:
-            for group in grouper(currs, 255):
-                group = [x for x in group if x is not None]
-                if (
-                    len(group) > limit
-                ):  # 12 in v6+ (dig, samnmax, dott (code 108)), 255 in v5? (atlantis, monkey2 (code 68))
-                    bits.extend([1, 1, 0, 0, 1])
-                    bits.extend(int(x) for x in f'{len(group):08b}'[::-1])
-                    # print(f'LARGE GROUP {len(group)}')
-                else:
-                    # for _ in range(len(group)):
-                    #     print('SMALL GROUP')
-                    bits.extend([0] * len(group))
-
-    gbits = grouper((str(x) for x in bits), 8, fillvalue='0')
-    return bytes(int(''.join(byte)[::-1], 2) for byte in gbits)
+    pixels = np.frombuffer(data, dtype=np.uint8).astype(np.int64)
+    if not len(pixels):
+        return b''
+    starts = np.flatnonzero(np.diff(pixels, prepend=-1))
+    colors = pixels[starts]
+    repeats = np.diff(starts, append=len(pixels)) - 1
+
+    # first color is written as 8 bits, then shift or new color
+    deltas = np.diff(colors)
+    shift = (deltas >= -4) & (deltas < 4)
+    color_lengths = np.concatenate([[8], np.where(shift, 5, 2 + palen)])
+    color_values = np.concatenate(
+        [
+            colors[:1],
+            np.where(
+                shift,
+                0b11 | (deltas + 4) << 2,
+                _new_color_codes(colors[1:], palen, ~shift),
+            ),
+        ],
+    )
+
+    # repeats are written in groups of at most 255,
+    # groups larger than limit as single code, others as zero bits
+    full, rest = np.divmod(repeats, 255)
+    ncodes = 1 + full + (rest > 0)
+    offsets = np.cumsum(ncodes) - ncodes
+    groups = np.full(int(ncodes.sum()), 255)
+    groups[(offsets + ncodes - 1)[rest > 0]] = rest[rest > 0]
+    large = groups > limit
+    lengths = np.where(large, 13, groups)
+    values = np.where(large, 0b10011 | groups << 5, 0)
+    lengths[offsets] = color_lengths
+    values[offsets] = color_values
+    return pack_codes(lengths, values)
 
 
 def decode_raw(stream, decoded_size, width):
@@ -155,83 +265,60 @@ def unknown_decoder(*args):
     raise ValueError('Unknown Decoder')
 
 
-def decode_he(stream, decoded_size, palen):
-    delta_color = [-4, -3, -2, -1, 1, 2, 3, 4]
-
-    with io.BytesIO() as out:
-        color = stream.read(1)[0]
-        bitstream = create_bitsream(stream)
-        out.write(to_byte(color))
-
-        while out.tell() < decoded_size:
-            if next(bitstream):
-                if next(bitstream):
-                    color += delta_color[collect_bits(bitstream, 3)]
-                else:
-                    color = collect_bits(bitstream, palen)
-            out.write(to_byte(color))
-        return out.getvalue()
+def decode_he(stream, decoded_size, palen, out=None):
+    return decode_bitstream(stream.read(), decoded_size, palen, HE_CODES, out)
 
 
 def encode_he(data, palen):
-    delta_color = [-4, -3, -2, -1, 1, 2, 3, 4]
-
-    bits = []
-    color = data[0]
-    for curr in data[1:]:
-        if curr == color:
-            bits.extend([0])
-        elif curr - color in delta_color:
-            # print(f'SHIFT {curr - color}')
-            bits.extend([1, 1])
-            bits.extend(int(x) for x in f'{delta_color.index(curr - color):03b}'[::-1])
-        else:
-            # print(f'NEW COLOR {curr}')
-            bits.extend([1, 0])
-            bits.extend(int(x) for x in f'{curr:0{palen}b}'[::-1])
-        color = curr
-
-    gbits = grouper((str(x) for x in bits), 8, fillvalue='0')
-    return data[:1] + bytes(int(''.join(byte)[::-1], 2) for byte in gbits)
+    pixels = np.frombuffer(data, dtype=np.uint8).astype(np.int64)
+    deltas = np.diff(pixels)
+    same = deltas == 0
+    shift = ~same & (np.abs(deltas) <= 4)
+    lengths = np.select([same, shift], [1, 5], 2 + palen)
+    # index in HE_DELTA_COLOR, which skips zero
+    index = np.where(deltas < 0, deltas + 4, deltas + 3)
+    values = np.select(
+        [same, shift],
+        [0, 0b11 | index << 2],
+        _new_color_codes(pixels[1:], palen, ~same & ~shift),
+    )
+    return bytes(data[:1]) + pack_codes(lengths, values)
 
 
 def get_method_info(code):
     direction = 'HORIZONTAL'
     if 0x03 <= code <= 0x12 or 0x22 <= code <= 0x26:
-        # if 3 <= code <= 18 or 34 <= code <= 38:
         direction = 'VERTICAL'
 
     method = unknown_decoder
     if code in (0x01, 0x95):
-        # if code in (1, 149):
         assert direction == 'HORIZONTAL'
         method = decode_raw
     elif 0x0E <= code <= 0x30:
-        # elif 14 <= code <= 48:
         method = decode_basic
     elif 0x40 <= code <= 0x80:
-        # elif 64 <= code <=128:
         assert direction == 'HORIZONTAL'
         method = decode_run_majmin
     elif 0x86 <= code <= 0x94:
-        # elif 134 <= code <=148:
         method = decode_he
 
     tr = None
     if 0x22 <= code <= 0x30 or 0x54 <= code <= 0x80 or code >= 0x8F:
-        # if 34 <= code <= 48 or 84 <= code <= 128 or code >= 143:
         tr = TRANSPARENCY
 
     palen = code % 10
 
-    # assert 0 <= palen <= 8
     return method, direction, tr, palen
 
 
+def _raw_code(data):
+    return 0x95 if 0xBB in data else 0x01
+
+
 def fake_encode_strip(data, height, width):
     print(f'==============={0xBB in data}===================')
     with io.BytesIO() as s:
-        s.write(b'\x95' if 0xBB in data else b'\x01')
+        s.write(bytes([_raw_code(data)]))
         s.write(bytes(data))
         return s.getvalue()
 
@@ -240,20 +327,24 @@ def encode_raw(data, *args):
     return data
 
 
-def encode_strip(data, height, width, code, allow_upgrade=True):
+def _strip_encoder(code, decode_method, palen):
+    if decode_method == decode_run_majmin:
+        if code - palen in {60, 80}:
+            return partial(encode_run_majmin, limit=255)
+        assert code - palen in {100, 120}, (code, palen)
+        return partial(encode_run_majmin, limit=12)
+    if decode_method == decode_basic:
+        return encode_basic
+    if decode_method == decode_he:
+        return encode_he
+    return None
+
+
+def encode_strip(data, height, width, code, *, allow_upgrade=True, verify=False):  # noqa: PLR0913
     method, direction, tr, palen = get_method_info(code)
     data = bytes(data) if direction == 'HORIZONTAL' else bytes(data.T)
-    if method == decode_run_majmin:
-        if code - palen in {60, 80}:
-            encode_method = partial(encode_run_majmin, limit=255)
-        else:
-            assert code - palen in {100, 120}, (code, palen)
-            encode_method = partial(encode_run_majmin, limit=12)
-    elif method == decode_basic:
-        encode_method = encode_basic
-    elif method == decode_he:
-        encode_method = encode_he
-    else:
+    encode_method = _strip_encoder(code, method, palen)
+    if encode_method is None:
         assert code in {0x01, 0x95}
         encode_method = encode_raw
     max_color = max(data)
@@ -263,26 +354,81 @@ def encode_strip(data, height, width, code, allow_upgrade=True):
             if allow_upgrade and max_bits <= 8:  # upgrade palen
                 assert allow_upgrade
                 print(
-                    f'WARNING: upgrading palette length from {palen} to {max_bits} to be able toinsert color value {max_color}',
+                    f'WARNING: upgrading palette length from {palen} to {max_bits}'
+                    f' to be able to insert color value {max_color}',
                 )
                 code -= palen
                 palen = max_bits
                 code += palen
             else:
                 raise ValueError(
-                    f'Too many colors: trying to fit pixel value of {max_color} in {palen} bits, max: {(2 ** palen) - 1}',
+                    f'Too many colors: trying to fit pixel value of {max_color}'
+                    f' in {palen} bits, max: {(2**palen) - 1}',
                 )
     with io.BytesIO() as s:
         s.write(bytes([code]))
         encoded = encode_method(data, palen)
-        with io.BytesIO(encoded) as vstream:
-            assert method(vstream, height * width, palen) == data
+        if verify:
+            with io.BytesIO(encoded) as vstream:
+                assert bytes(method(vstream, height * width, palen)) == data
         s.write(bytes(encoded))
         return s.getvalue()
 
 
-def parse_strip(height, width, data, transparency=None):
-    print((height, width))
+def candidate_codes(code: int, palen: int, *, he: bool = False) -> list[int]:
+    """Codecs to try instead of `code`, with same transparency.
+
+    HE codecs are only given when the game supports them,
+    raw codec only when `code` is raw.
+    """
+    method, _, tr, _ = get_method_info(code)
+    # basic vertical, basic horizontal, majmin, majmin (limit 12), HE
+    bases = (30, 40, 80, 120, 140) if tr is not None else (10, 20, 60, 100, 130)
+    codes = [base + palen for base in (bases if he else bases[:-1])]
+    if method == decode_raw:
+        codes.append(code)
+    return codes
+
+
+def encode_strip_optimal(  # noqa: PLR0913
+    data: NDArray[np.uint8],
+    height: int,
+    width: int,
+    code: int,
+    *,
+    he: bool = False,
+    verify: bool = False,
+) -> bytes:
+    """Smallest encoding of strip among candidate codecs, `code` wins ties.
+
+    Only the smallest palette bit length fitting the strip is tried,
+    as longer ones only make new color codes longer.
+    """
+    palen = max(4, int(np.max(data)).bit_length())
+    encoded = []
+    for candidate in dict.fromkeys([code, *candidate_codes(code, palen, he=he)]):
+        try:
+            encoded.append(
+                encode_strip(
+                    data,
+                    height,
+                    width,
+                    candidate,
+                    allow_upgrade=False,
+                    verify=verify,
+                ),
+            )
+        except ValueError:
+            # palette bit length of reference codec is too short
+            continue
+    return min(encoded, key=len)
+
+
+def parse_strip(height, width, data, transparency=None, *, verify=False):
+    """Decode single strip of SMAP image.
+
+    With `verify`, decoded strip is checked to encode back the same.
+    """
     with io.BytesIO(data) as s:
         code = s.read(1)[0]
 
@@ -292,53 +438,19 @@ def parse_strip(height, width, data, transparency=None):
         if tr is not None:
             tr = transparency
 
-        print(code, decode_method, direction, tr, palen, sep=' === ')
-
-        # try:
-
         decoded = decode_method(s, width * height, palen)  # [:width * height]
 
-        # if decode_method == decode_basic:
-        #     with io.BytesIO(decoded) as dec_stream:
-        #         print(decoded)
-        #         print(data[1:])
-        #         assert encode_basic(dec_stream, height, palen, 8) == data[1:]
-
-        if decode_method in {decode_run_majmin, decode_basic, decode_he}:
-            if decode_method == decode_run_majmin:
-                if code - palen in {60, 80}:
-                    encode_method = partial(encode_run_majmin, limit=255)
-                else:
-                    assert code - palen in {100, 120}, (code, palen)
-                    encode_method = partial(encode_run_majmin, limit=12)
-            elif decode_method == decode_basic:
-                encode_method = encode_basic
-            elif decode_method == decode_he:
-                encode_method = encode_he
-            else:
-                raise ValueError('should not have got here')
-
-            print('=====================')
-            encoded = encode_method(decoded, palen)
-            print('---------------------')
+        encode_method = _strip_encoder(code, decode_method, palen)
+        if verify and encode_method:
+            encoded = encode_method(decoded.tobytes(), palen)
             with io.BytesIO(encoded) as e:
-                assert decode_method(e, width * height, palen) == decoded
+                assert np.array_equal(decode_method(e, width * height, palen), decoded)
 
             pos = s.tell()
             s.seek(1, 0)
             orig = s.read()
-
-            # s.seek(1, 0)
-            # obits = list(create_bitsream(s))
-
-            # print('O', obits)
-
-            print(pos - 1, len(orig), len(encoded))
-            if orig[: len(encoded)] != encoded:
-                print('ORIG', orig)
-                print('ENCODED', encoded)
-                exit(1)
-            elif len(orig) > len(encoded):
+            assert orig[: len(encoded)] == encoded, (orig, encoded)
+            if len(orig) > len(encoded):
                 assert encoded + b'\x00' == orig
             s.seek(pos)
 
@@ -350,19 +462,49 @@ def parse_strip(height, width, data, transparency=None):
             (height, width),
             order=order,
         )
-        # # return np.zeros((height, 8), dtype=np.uint8)
 
-        # except Exception as exc:
-        #     logging.exception(exc)
-        #     return np.zeros((height, width), dtype=np.uint8)
+
+def _strip_batches(count: int, jobs: int) -> Iterator[slice]:
+    size = max(1, -(-count // (jobs * 4)))
+    for start in range(0, count, size):
+        yield slice(start, min(start + size, count))
+
+
+def _decode_strips(
+    height: int,
+    strip_width: int,
+    strips: Sequence[bytes],
+    transparency: int | None = None,
+    *,
+    verify: bool = False,
+) -> NDArray[np.uint8]:
+    out = np.empty((height, strip_width * len(strips)), dtype=np.uint8)
+    for idx, strip in enumerate(strips):
+        out[:, idx * strip_width : (idx + 1) * strip_width] = parse_strip(
+            height,
+            strip_width,
+            strip,
+            transparency,
+            verify=verify,
+        )
+    return out
 
 
-def decode_smap(
+def decode_smap(  # noqa: PLR0913
     height: int,
     width: int,
     data: bytes,
     transparency: bytes = None,
+    jobs: int = 1,
+    *,
+    verify: bool = False,
 ) -> Sequence[Sequence[int]]:
+    """Decode strips of SMAP image.
+
+    With `verify`, each strip is checked to encode back the same.
+    With more than one job, batches of strips are decoded in worker processes,
+    result is the same as when decoded serially.
+    """
     strip_width = 8
 
     if width == 0 or height == 0:
@@ -374,10 +516,37 @@ def decode_smap(
 
     index = list(zip(offs, offs[1:] + [len(data)]))
 
-    strips = (data[offset:end] for offset, end in index)
-    return np.hstack(
-        [parse_strip(height, strip_width, data, transparency) for data in strips],
-    )
+    strips = [data[offset:end] for offset, end in index]
+    if jobs <= 1:
+        return _decode_strips(
+            height,
+            strip_width,
+            strips,
+            transparency,
+            verify=verify,
+        )
+
+    out = np.empty((height, strip_width * num_strips), dtype=np.uint8)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            (
+                batch,
+                executor.submit(
+                    _decode_strips,
+                    height,
+                    strip_width,
+                    strips[batch],
+                    transparency,
+                    verify=verify,
+                ),
+            )
+            for batch in _strip_batches(num_strips, jobs)
+        ]
+        for batch, future in futures:
+            out[:, batch.start * strip_width : batch.stop * strip_width] = (
+                future.result()
+            )
+    return out
 
 
 def extract_smap_codes(height: int, width: int, data: bytes) -> Sequence[int]:
@@ -394,21 +563,69 @@ def extract_smap_codes(height: int, width: int, data: bytes) -> Sequence[int]:
     return [data[offset] for offset, _ in index]
 
 
-def encode_smap(image: Sequence[Sequence[int]], codes=None) -> bytes:
+def _encode_strips(
+    strips: Sequence[NDArray[np.uint8]],
+    codes: Sequence[int] | None,
+    *,
+    verify: bool = False,
+    optimize: bool = False,
+    he: bool = False,
+) -> list[bytes]:
+    if optimize:
+        refs = codes or [_raw_code(s) for s in strips]
+        return [
+            encode_strip_optimal(s, *s.shape, code, he=he, verify=verify)
+            for s, code in zip(strips, refs)
+        ]
+    if codes:
+        return [
+            encode_strip(s, *s.shape, code, verify=verify)
+            for s, code in zip(strips, codes)
+        ]
+    return [fake_encode_strip(s, *s.shape) for s in strips]
+
+
+def encode_smap(
+    image: Sequence[Sequence[int]],
+    codes=None,
+    *,
+    verify: bool = False,
+    jobs: int = 1,
+    optimize: bool = False,
+) -> bytes:
+    """Encode image as SMAP strips, using given codec of each strip if any.
+
+    With `optimize`, each strip is encoded with all candidate codecs
+    and the smallest encoding is kept, given codecs are the reference.
+    With more than one job, batches of strips are encoded in worker processes,
+    result is the same as when encoded serially.
+    """
     strip_width = 8
 
     height, width = image.shape
     print(height, width)
     num_strips = width // strip_width
-    if codes:
-        print('CODES', codes)
-        strips = [
-            encode_strip(s, *s.shape, code)
-            for s, code in zip(np.hsplit(image, num_strips), codes)
-        ]
+    print(f'CODES {codes}' if codes else 'NO CODES')
+    image_strips = np.hsplit(image, num_strips)
+    he = bool(codes) and any(get_method_info(code)[0] == decode_he for code in codes)
+    if jobs <= 1:
+        strips = _encode_strips(
+            image_strips, codes, verify=verify, optimize=optimize, he=he
+        )
     else:
-        print('NO CODES')
-        strips = [fake_encode_strip(s, *s.shape) for s in np.hsplit(image, num_strips)]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(
+                    _encode_strips,
+                    image_strips[batch],
+                    codes[batch] if codes else None,
+                    verify=verify,
+                    optimize=optimize,
+                    he=he,
+                )
+                for batch in _strip_batches(num_strips, jobs)
+            ]
+            strips = [strip for future in futures for strip in future.result()]
     with io.BytesIO() as stream:
         offset = 8 + 4 * len(strips)
         for strip in strips:
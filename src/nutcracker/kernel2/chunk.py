@@ -1,4 +1,6 @@
+import functools
 import logging
+import struct
 from abc import ABC
 from collections.abc import Iterable, Iterator, Sequence
 from dataclasses import dataclass, replace
@@ -19,6 +21,19 @@ import numpy as np
 from numpy.typing import NDArray
 
 ArrayBuffer = NDArray[np.uint8] | memoryview
+BUFFER_TYPES = (memoryview, np.ndarray, bytes, bytearray)
+
+CHUNK_TABLE_DTYPE = np.dtype(
+    [
+        ('offset', '<i8'),  # offset of chunk header in container buffer
+        ('tag', 'S4'),
+        ('size', '<u8'),  # size as stored in header
+        ('data_start', '<i8'),
+        ('data_end', '<i8'),
+    ],
+)
+
+ChunkTable = NDArray[np.void]
 
 
 class HeaderDType(Protocol):
@@ -195,6 +210,78 @@ def read_chunks(
         offset = noffset + calc_align(noffset, cfg.alignment)
 
 
+_STRUCT_CODES = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+
+@functools.cache
+def _header_struct(header_dtype: type[ChunkHeader]) -> tuple[struct.Struct, int, int]:
+    """Compile header dtype to struct format and positions of tag and size fields."""
+    dtype = np.dtype(cast(np.dtype, header_dtype.dtype))
+    assert dtype.names
+    fields = sorted(dtype.names, key=lambda name: dtype.fields[name][1])  # type: ignore[index]
+    order = '>' if any(dtype[name].byteorder == '>' for name in fields) else '<'
+    codes = ''.join(
+        f'{dtype[name].itemsize}s'
+        if dtype[name].kind == 'S'
+        else _STRUCT_CODES[dtype[name].itemsize]
+        for name in fields
+    )
+    fmt = struct.Struct(order + codes)
+    assert fmt.size == dtype.itemsize
+    return fmt, fields.index('tag'), fields.index('size')
+
+
+def scan_chunks(
+    cfg: ChunkSettings,
+    buffer: ArrayBuffer,
+    offset: int = 0,
+) -> ChunkTable:
+    """Scan chunk headers of a single container level in one pass.
+
+    Chunk objects are not created, use `get_chunk` to create one from table entry.
+    """
+    header, tag_idx, size_idx = _header_struct(cfg.header_dtype)
+    hsize = header.size
+    incl = hsize if cfg.inclheader else 0
+    view = memoryview(buffer) if isinstance(buffer, BUFFER_TYPES) else buffer
+    unpack = header.unpack_from
+    if view is buffer:
+        # lazy buffers (e.g. encrypted files) are only sliced around headers
+        def unpack(view: ArrayBuffer, offset: int) -> tuple[bytes | int, ...]:
+            return header.unpack_from(view[offset : offset + hsize])
+
+    length = len(view)
+    entries = []
+    while offset < length:
+        offset = workaround_x80(cfg, view, offset)
+        start = offset + hsize
+        if start > length:
+            raise ValueError(f'chunk header truncated at offset {offset}')  # noqa: TRY003
+        fields = unpack(view, offset)
+        tag, size = fields[tag_idx], fields[size_idx]
+        if not size and not tag.strip(b'\0'):
+            end = length
+        else:
+            end = start + size - incl
+            if not start <= end <= length:
+                actual = len(view[start:end])
+                raise ValueError(f'chunk data size mismatch: {actual} != {end - start}')  # noqa: TRY003
+        entries.append((offset, tag, size, start, end))
+        offset = end + calc_align(end, cfg.alignment)
+    return np.array(entries, dtype=CHUNK_TABLE_DTYPE)
+
+
+def get_chunk(cfg: ChunkSettings, buffer: ArrayBuffer, entry: np.void) -> Chunk:
+    """Create chunk for given entry of table created by `scan_chunks`."""
+    offset, start, end = (
+        int(entry['offset']),
+        int(entry['data_start']),
+        int(entry['data_end']),
+    )
+    header = cfg.header_dtype.from_buffer(buffer[offset:start])
+    return Chunk(header, nslice(buffer, start, end))
+
+
 def mktag(
     cfg: ChunkSettings,
     tag: str,
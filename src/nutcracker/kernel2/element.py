@@ -1,5 +1,6 @@
+import hashlib
 import logging
-from collections import Counter, defaultdict
+from collections import Counter
 from collections.abc import Callable, Iterable, Iterator
 from contextlib import contextmanager
 from dataclasses import dataclass, field
@@ -10,47 +11,152 @@ from typing import (
 from nutcracker.kernel2.chunk import (
     ArrayBuffer,
     Chunk,
+    ChunkHeaderData,
     ChunkSettings,
+    calc_align,
     mktag,
-    read_chunks,
+    scan_chunks,
     write_chunks,
 )
+from nutcracker.kernel2.schema import infer_schema
+from nutcracker.utils import copyio
 
+HASH_SIZE = 16
 
-class Element:
-    __slots__ = ('cfg', 'chunk', 'attribs', 'parent', '_children', '_data')
 
+class Element:
+    __slots__ = (
+        'cfg',
+        '_chunk',
+        '_source',
+        'attribs',
+        'parent',
+        '_children',
+        '_data',
+        '_tag_index',
+        '_dirty',
+        '_size',
+        '_hash',
+    )
+
+    _chunk: Chunk | None
+    _source: tuple[bytes, ArrayBuffer, ArrayBuffer] | None
     _children: list['Element'] | None
     _data: bytes | None
+    _tag_index: dict[str, list['Element']] | None
+    _dirty: bool
+    _size: int | None
+    _hash: bytes | None
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         cfg: 'IndexerSettings',
-        chunk: Chunk,
+        chunk: Chunk | None,
         attribs: dict[str, Any] | None = None,
         parent: 'Element | None' = None,
+        source: tuple[bytes, ArrayBuffer, ArrayBuffer] | None = None,
     ) -> None:
+        # chunk creation can be deferred by giving (tag, header, data) as source
+        assert chunk is not None or source is not None
         self.cfg = cfg
-        self.chunk = chunk
+        self._chunk = chunk
+        self._source = source
         self.attribs = attribs or {}
         self.parent = parent
         self._children = None
         self._data = None
+        self._tag_index = None
+        self._dirty = False
+        self._size = None
+        self._hash = None
+
+    @property
+    def chunk(self) -> Chunk:
+        if self._chunk is None:
+            assert self._source is not None
+            _, header, data = self._source
+            self._chunk = Chunk(self.cfg.header_dtype.from_buffer(header), data)
+            self._source = None
+        return self._chunk
 
     def update_children(self, children: Iterable['Element']) -> None:
         children = list(children)
         # children should have been mapped already to avoid index offset issues
         assert self._children is not None
-        self._children = children
-        self.update_raw(
-            write_chunks(
-                self.cfg,
-                (mktag(self.cfg, child.tag, child.data) for child in self.children()),
-            )
-        )
+        self.set_children(children)
+
+    def set_children(self, children: Iterable['Element']) -> None:
+        """Replace children, data is serialized from children only when needed."""
+        self._children = list(children)
+        for child in self._children:
+            child.parent = self
+        self._tag_index = None
+        self._dirty = True
+        self._invalidate()
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    @property
+    def modified(self) -> bool:
+        """Data differs from source buffer the element was mapped from."""
+        return self._dirty or self._data is not None
 
     def update_raw(self, value: bytes) -> None:
         self._data = value
+        self._dirty = False
+        self._invalidate()
+
+    def _invalidate(self) -> None:
+        # ancestors holding this element as child are serialized again
+        self._size = None
+        self._hash = None
+        parent = self.parent
+        if parent is None or parent._children is None:  # noqa: SLF001
+            return
+        if not (parent.dirty and parent._size is None):  # noqa: SLF001
+            parent._dirty = True  # noqa: SLF001
+            parent._invalidate()  # noqa: SLF001
+
+    @property
+    def size(self) -> int:
+        """Size of data as it will be written, without serializing children."""
+        if self._size is None:
+            if not self._dirty:
+                self._size = len(self.data)
+            else:
+                size = 0
+                hsize = self.cfg.header_dtype.itemsize()
+                for child in self.children():
+                    csize = hsize + child.size
+                    size += csize + calc_align(csize, self.cfg.alignment)
+                self._size = size
+        return self._size
+
+    @property
+    def hash(self) -> bytes:
+        """Merkle hash of chunk, containers are hashed from hashes of children."""
+        if self._hash is None:
+            if self.cfg.schema.get(self.tag):
+                children = b''.join(child.hash for child in self.children())
+                self._hash = node_hash(self.tag, self.size, children)
+            else:
+                self._hash = leaf_hash(self.tag, self.size, self.data)
+        return self._hash
+
+    def layout(self) -> None:
+        """Update offset and size attributes of modified descendants from sizes."""
+        if not self._dirty:
+            return
+        offset = 0
+        hsize = self.cfg.header_dtype.itemsize()
+        for child in self.children():
+            child.attribs['offset'] = offset
+            child.attribs['size'] = child.size
+            child.layout()
+            csize = hsize + child.size
+            offset += csize + calc_align(csize, self.cfg.alignment)
 
     def children(self) -> Iterator['Element']:
         schema = self.cfg.schema.get(self.tag)
@@ -60,18 +166,46 @@ class Element:
             self._children = list(map_chunks(self.cfg, self.data, parent=self))
         yield from self._children
 
+    def attach_children(self, children: Iterable['Element']) -> None:
+        """Set children which were already mapped elsewhere (e.g. from cache)."""
+        self._children = list(children)
+        self._tag_index = None
+
     def add_child(self, child: 'Element') -> None:
+        """Append child while keeping raw data, use `set_children` to serialize."""
         if self._children is None:
             self._children = list(self.children())
         self._children.append(child)
+        self._tag_index = None
+        self._hash = None
+
+    def children_by_tag(self, tag: str) -> list['Element']:
+        """Children with given tag, grouped by tag lazily on first call."""
+        if self._tag_index is None:
+            index: dict[str, list[Element]] = {}
+            for child in self.children():
+                index.setdefault(child.tag, []).append(child)
+            self._tag_index = index
+        return self._tag_index.get(tag, [])
 
     @property
     def tag(self) -> str:
+        if self._source is not None:
+            return self._source[0].decode('ascii')
         return self.chunk.tag
 
     @property
     def data(self) -> ArrayBuffer:
+        if self._dirty:
+            # serialized data keeps size, ancestors need no update
+            self._data = write_chunks(
+                self.cfg,
+                (mktag(self.cfg, child.tag, child.data) for child in self.children()),
+            )
+            self._dirty = False
         if self._data is None:
+            if self._source is not None:
+                return self._source[2]
             return self.chunk.data
         return memoryview(self._data)
 
@@ -93,6 +227,22 @@ def _format_children(
         yield f'{tag}*{count}' if count > 1 else tag
 
 
+def leaf_hash(tag: str, size: int, data: ArrayBuffer) -> bytes:
+    digest = hashlib.blake2b(digest_size=HASH_SIZE, person=b'leaf')
+    digest.update(tag.encode('ascii'))
+    digest.update(size.to_bytes(8, byteorder='little'))
+    digest.update(data)
+    return digest.digest()
+
+
+def node_hash(tag: str, size: int, children: bytes) -> bytes:
+    digest = hashlib.blake2b(digest_size=HASH_SIZE, person=b'node')
+    digest.update(tag.encode('ascii'))
+    digest.update(size.to_bytes(8, byteorder='little'))
+    digest.update(children)
+    return digest.digest()
+
+
 class MissingSchemaKeyError(Exception):
     def __init__(self, tag: str) -> None:
         super().__init__(f'Missing key in schema: {tag}')
@@ -116,6 +266,18 @@ def schema_check(cfg: 'IndexerSettings') -> Iterator[None]:
         getattr(cfg, 'logger', logging).warning(exc)
 
 
+def check_schema(
+    cfg: 'IndexerSettings',
+    elem: Element,
+    parent: Element | None = None,
+) -> None:
+    with schema_check(cfg):
+        if elem.tag not in cfg.schema:
+            raise MissingSchemaKeyError(elem.tag)
+        if parent and elem.tag not in cfg.schema[parent.tag]:
+            raise MissingSchemaEntryError(parent.tag, elem.tag)
+
+
 def map_chunks(
     cfg: 'IndexerSettings',
     buffer: ArrayBuffer,
@@ -123,25 +285,68 @@ def map_chunks(
     parent: Element | None = None,
     offset: int = 0,
 ) -> Iterator[Element]:
-    for coffset, chunk in read_chunks(cfg, buffer, offset):
+    for coffset, tag, _, start, end in scan_chunks(cfg, buffer, offset).tolist():
         elem = Element(
             cfg,
-            chunk,
-            {
-                'offset': coffset,
-                'size': len(chunk.data),
-                **(cfg.extra(parent, chunk, coffset) if cfg.extra else {}),
-            },
+            None,
+            {'offset': coffset, 'size': end - start},
+            parent=parent,
+            source=(tag, buffer[coffset:start], buffer[start:end]),
         )
-        with schema_check(cfg):
-            if elem.tag not in cfg.schema:
-                raise MissingSchemaKeyError(elem.tag)
-            if parent and elem.tag not in cfg.schema[parent.tag]:
-                raise MissingSchemaEntryError(parent.tag, elem.tag)
+        if cfg.extra:
+            elem.attribs.update(cfg.extra(parent, elem, coffset))
+        check_schema(cfg, elem, parent)
         yield elem
 
 
-ExtraFunc = Callable[[Element | None, Chunk, int], dict[str, Any]]
+CopyFunc = Callable[[Element], int | None]
+
+
+def _write_element(
+    cfg: ChunkSettings,
+    write: Callable[[ArrayBuffer], int],
+    elem: Element,
+    copy: CopyFunc | None,
+) -> int:
+    if copy and not elem.modified:
+        copied = copy(elem)
+        if copied is not None:
+            return copied
+    size = elem.size
+    if cfg.inclheader:
+        size += cfg.header_dtype.itemsize()
+    header = cfg.header_dtype.create(
+        ChunkHeaderData(tag=elem.tag.encode('ascii'), size=size),
+    )
+    written = write(bytes(header))
+    if elem.dirty:
+        for child in elem.children():
+            csize = _write_element(cfg, write, child, copy)
+            written += csize + write(bytes(calc_align(csize, cfg.alignment)))
+    else:
+        data = elem.data
+        for offset in range(0, len(data), copyio.BLOCK_SIZE):
+            written += write(data[offset : offset + copyio.BLOCK_SIZE])
+    return written
+
+
+def write_element(
+    cfg: ChunkSettings,
+    write: Callable[[ArrayBuffer], int],
+    elem: Element,
+    copy: CopyFunc | None = None,
+) -> int:
+    """Stream element chunk to output without serializing it in memory.
+
+    Headers are written from element sizes, then data in order.
+    Data of elements which were not modified is copied from source buffer,
+    `copy` can write whole unmodified chunk instead, returns None to decline.
+    """
+    return _write_element(cfg, write, elem, copy)
+
+
+# called with parent and element while mapped, chunk of element is not created yet
+ExtraFunc = Callable[[Element | None, Element, int], dict[str, Any]]
 
 
 @dataclass(frozen=True)
@@ -154,24 +359,6 @@ class IndexerSettings(ChunkSettings):
 def generate_schema(
     cfg: ChunkSettings,
     buffer: ArrayBuffer,
-    parent_tag: str | None = None,
     schema: dict[str, set[str]] | None = None,
 ) -> dict[str, set[str]]:
-    if schema is None:
-        schema = defaultdict(set)
-
-    for _, chunk in read_chunks(cfg, buffer):
-        tag = chunk.tag
-
-        if parent_tag is not None:
-            schema[parent_tag].add(tag)
-
-        if tag in schema and not schema[tag]:
-            continue
-
-        try:
-            generate_schema(cfg, chunk.data, tag, schema)
-        except Exception:
-            schema[tag] = set()
-
-    return dict(schema)
+    return infer_schema(cfg, buffer, schema)
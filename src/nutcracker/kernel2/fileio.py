@@ -1,25 +1,146 @@
-import tempfile
+from collections import OrderedDict
 from collections.abc import Iterator
 from contextlib import AbstractContextManager, contextmanager
 from types import TracebackType
-from typing import cast, overload
+from typing import Any, cast, overload
 
 import numpy as np
-from numpy.typing import ArrayLike
+from numpy.typing import ArrayLike, NDArray
+
+PAGE_SIZE = 1 << 16
+CACHE_PAGES = 256
+
+
+class _PageCache:
+    """Decrypted pages of XOR-ed source, least recently used are evicted first."""
+
+    __slots__ = ('source', 'key', 'page_size', 'capacity', 'pages')
+
+    def __init__(
+        self,
+        source: NDArray[np.uint8],
+        key: int,
+        page_size: int,
+        capacity: int,
+    ) -> None:
+        self.source = source
+        self.key = np.uint8(key)
+        self.page_size = page_size
+        self.capacity = capacity
+        self.pages: OrderedDict[int, NDArray[np.uint8]] = OrderedDict()
+
+    def page(self, num: int) -> NDArray[np.uint8]:
+        page = self.pages.get(num)
+        if page is not None:
+            self.pages.move_to_end(num)
+            return page
+        start = num * self.page_size
+        page = self.source[start : start + self.page_size] ^ self.key
+        page.flags.writeable = False
+        self.pages[num] = page
+        if len(self.pages) > self.capacity:
+            self.pages.popitem(last=False)
+        return page
+
+    def read(self, start: int, stop: int) -> NDArray[np.uint8]:
+        if stop <= start:
+            return np.zeros(0, dtype=np.uint8)
+        if stop - start > self.page_size * self.capacity // 2:
+            # bulk reads would only flush the cache
+            return self.source[start:stop] ^ self.key
+        first, last = start // self.page_size, (stop - 1) // self.page_size
+        base = first * self.page_size
+        if first == last:
+            return self.page(first)[start - base : stop - base]
+        pages = np.concatenate([self.page(num) for num in range(first, last + 1)])
+        return pages[start - base : stop - base]
+
+
+class XorBuffer:
+    """Read-only view of XOR-ed data, decrypted only where accessed.
+
+    Slices longer than a page are lazy views as well,
+    shorter slices are decrypted to memoryview.
+    Buffer protocol decrypts the whole view.
+    """
+
+    __slots__ = ('_cache', '_start', '_stop')
+
+    def __init__(self, cache: _PageCache, start: int, stop: int) -> None:
+        self._cache = cache
+        self._start = start
+        self._stop = stop
+
+    @classmethod
+    def create(
+        cls,
+        source: NDArray[np.uint8],
+        key: int,
+        page_size: int = PAGE_SIZE,
+        cache_pages: int = CACHE_PAGES,
+    ) -> 'XorBuffer':
+        return cls(_PageCache(source, key, page_size, cache_pages), 0, len(source))
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    @property
+    def nbytes(self) -> int:
+        return len(self)
+
+    @overload
+    def __getitem__(self, index: slice) -> 'XorBuffer | memoryview': ...
+    @overload
+    def __getitem__(self, index: int) -> int: ...
+    def __getitem__(self, index: slice | int) -> 'XorBuffer | memoryview | int':
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return memoryview(self)[index]
+            start, stop = self._start + start, self._start + max(start, stop)
+            if stop - start > self._cache.page_size:
+                return XorBuffer(self._cache, start, stop)
+            return memoryview(self._cache.read(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('index out of range')  # noqa: TRY003
+        offset = self._start + index
+        return int(self._cache.read(offset, offset + 1)[0])
+
+    def __buffer__(self, _flags: int) -> memoryview:
+        return memoryview(self._cache.read(self._start, self._stop))
+
+    def tobytes(self) -> bytes:
+        return bytes(self)
+
+    def __eq__(self, other: object) -> bool:
+        return memoryview(self) == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        # remaining memoryview methods operate on decrypted data
+        return getattr(memoryview(self), name)
+
+    def __repr__(self) -> str:
+        return f'XorBuffer<{self._start}:{self._stop}>'
 
 
 class ResourceFile(AbstractContextManager[memoryview]):
     __slots__ = ('buffer', 'closed')
 
-    def __init__(self, buffer: ArrayLike) -> None:
-        self.buffer = memoryview(buffer)  # type: ignore[arg-type]
+    def __init__(self, buffer: ArrayLike | XorBuffer) -> None:
+        self.buffer: memoryview | XorBuffer = (
+            buffer if isinstance(buffer, XorBuffer) else memoryview(buffer)  # type: ignore[arg-type]
+        )
         self.closed = False
 
     def __len__(self) -> int:
         return len(self.buffer)
 
     def __buffer__(self, _flags: int) -> memoryview:
-        return self.buffer
+        return memoryview(self.buffer)
 
     def __exit__(
         self,
@@ -48,13 +169,8 @@ class ResourceFile(AbstractContextManager[memoryview]):
             yield cast(memoryview, cls(data))
             return
 
-        with tempfile.TemporaryFile() as tmp:
-            result = np.memmap(tmp, dtype='u1', mode='w+', shape=data.shape)
-            result[:] = data ^ key
-            result.flush()
-            del result
-            with cls(np.memmap(tmp, dtype='u1', mode='r', shape=data.shape)) as f:
-                yield f
+        with cls(XorBuffer.create(data, key)) as f:
+            yield cast(memoryview, f)
 
     def close(self) -> None:
         self.closed = True
@@ -1,11 +1,13 @@
 from dataclasses import dataclass, replace
 from typing import Any, Self
 
-from nutcracker.kernel2 import tree
+from nutcracker.kernel2 import query, tree
 from nutcracker.kernel2.chunk import (
     IFFChunkHeader,
+    get_chunk,
     mktag,
     read_chunks,
+    scan_chunks,
     untag,
     write_chunks,
 )
@@ -25,6 +27,8 @@ class _DefaultOverride:
 @dataclass(frozen=True)
 class Preset(IndexerSettings, _DefaultOverride):
     read_chunks = read_chunks
+    scan_chunks = scan_chunks
+    get_chunk = get_chunk
     write_chunks = write_chunks
     map_chunks = map_chunks
     generate_schema = generate_schema
@@ -37,6 +41,8 @@ class Preset(IndexerSettings, _DefaultOverride):
     findpath = staticmethod(tree.findpath)
     render = staticmethod(tree.render)
     renders = staticmethod(tree.renders)
+    select = staticmethod(query.select)
+    select_many = staticmethod(query.select_many)
 
 
 shell = Preset(
@@ -0,0 +1,203 @@
+import functools
+import re
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+
+from nutcracker.kernel2.element import Element
+from nutcracker.kernel2.tree import compile_tag
+
+STEP_RE = re.compile(r'(?P<tags>[^/\[\]]+)(?P<predicates>(?:\[[^\]]*\])*)(?:/|$)')
+PREDICATE_RE = re.compile(r'\[(?P<key>\w+)=(?P<value>[^\]]*)\]')
+
+State = tuple[int, int]  # (query index, step index)
+
+
+@dataclass(frozen=True)
+class Step:
+    tags: tuple[str, ...]
+    predicates: tuple[tuple[str, str], ...] = ()
+
+    @property
+    def descendant(self) -> bool:
+        return self.tags == ('**',)
+
+    @property
+    def literal(self) -> str | None:
+        if len(self.tags) != 1 or self.predicates:
+            return None
+        (tag,) = self.tags
+        if tag == '*' or self.descendant or compile_tag(tag):
+            return None
+        return tag
+
+    def match_tag(self, tag: str) -> bool:
+        for pattern in self.tags:
+            if pattern == '*':
+                return True
+            match = compile_tag(pattern)
+            if tag == pattern if match is None else match(tag):
+                return True
+        return False
+
+    def match(self, elem: Element) -> bool:
+        return self.match_tag(elem.tag) and all(
+            str(elem.attribs.get(key)) == value for key, value in self.predicates
+        )
+
+
+@dataclass(frozen=True)
+class Query:
+    """Compiled path expression.
+
+    Steps are separated by `/`, each step is a tag pattern, `*` for any tag,
+    or several of those separated by `|`. `**` matches any number of levels.
+    Attributes can be matched with predicates, e.g. `LECF/LFLF[gid=12]/ROOM`.
+    """
+
+    expr: str
+    steps: tuple[Step, ...]
+
+
+@functools.cache
+def compile_query(expr: str) -> Query:
+    steps = []
+    pos = 0
+    while pos < len(expr):
+        match = STEP_RE.match(expr, pos)
+        if not match:
+            raise ValueError(f'invalid query {expr!r} at position {pos}')  # noqa: TRY003
+        predicates = tuple(
+            (pred['key'], pred['value'])
+            for pred in PREDICATE_RE.finditer(match['predicates'])
+        )
+        if len(predicates) != match['predicates'].count('['):
+            raise ValueError(f'invalid predicate in query {expr!r}')  # noqa: TRY003
+        step = Step(tuple(match['tags'].split('|')), predicates)
+        if step.descendant and predicates:
+            raise ValueError(f'predicates are not allowed on ** in {expr!r}')  # noqa: TRY003
+        steps.append(step)
+        pos = match.end()
+    if not steps:
+        raise ValueError(f'empty query {expr!r}')  # noqa: TRY003
+    return Query(expr, tuple(steps))
+
+
+def _advance(
+    queries: tuple[Query, ...],
+    states: Iterable[State],
+    tag: str,
+    elem: Element | None = None,
+) -> tuple[set[int], frozenset[State]]:
+    """Match states against element, predicates are assumed to match if no element."""
+    matched: set[int] = set()
+    child_states: set[State] = set()
+    pending = list(states)
+    while pending:
+        qidx, sidx = pending.pop()
+        steps = queries[qidx].steps
+        if sidx == len(steps):
+            # query ending with ** matches every element
+            matched.add(qidx)
+            continue
+        step = steps[sidx]
+        if step.descendant:
+            child_states.add((qidx, sidx))
+            pending.append((qidx, sidx + 1))
+        elif step.match_tag(tag) and (elem is None or step.match(elem)):
+            if sidx + 1 == len(steps):
+                matched.add(qidx)
+            else:
+                child_states.add((qidx, sidx + 1))
+    return matched, frozenset(child_states)
+
+
+def _select(
+    queries: tuple[Query, ...],
+    states: frozenset[State],
+    root: Iterable[Element],
+) -> Iterator[tuple[int, Element]]:
+    for elem in root:
+        matched, child_states = _advance(queries, states, elem.tag, elem)
+        for qidx in sorted(matched):
+            yield qidx, elem
+        if child_states:
+            yield from _select(
+                queries, child_states, _children(queries, child_states, elem)
+            )
+
+
+def _children(
+    queries: tuple[Query, ...],
+    states: frozenset[State],
+    elem: Element,
+) -> Iterable[Element]:
+    tags = {queries[qidx].steps[sidx].literal for qidx, sidx in states}
+    if len(tags) == 1:
+        (tag,) = tags
+        if tag is not None:
+            return elem.children_by_tag(tag)
+    return elem.children()
+
+
+def select_many(
+    exprs: Iterable[str],
+    root: Iterable[Element] | Element | None,
+) -> Iterator[tuple[int, Element]]:
+    """Match several path expressions in a single pass over the tree.
+
+    Yields (index of expression, element) in document order,
+    only containers which may lead to a match are expanded.
+    """
+    if not root:
+        return
+    queries = tuple(compile_query(expr) for expr in exprs)
+    if isinstance(root, Element):
+        root = root.children()
+    states = frozenset((qidx, 0) for qidx in range(len(queries)))
+    yield from _select(queries, states, root)
+
+
+def select(expr: str, root: Iterable[Element] | Element | None) -> Iterator[Element]:
+    for _, elem in select_many((expr,), root):
+        yield elem
+
+
+def query_schema(
+    schema: Mapping[str, set[str]],
+    exprs: Iterable[str],
+) -> dict[str, set[str]]:
+    """Narrow schema to containers needed to evaluate given expressions.
+
+    Matched containers keep their complete schema.
+    """
+    queries = tuple(compile_query(expr) for expr in exprs)
+    initial = frozenset((qidx, 0) for qidx in range(len(queries)))
+    expanded: set[str] = set()
+    kept: set[str] = set()
+    visited: set[tuple[str, frozenset[State]]] = set()
+    pending = [(tag, initial) for tag in schema]
+    while pending:
+        tag, states = pending.pop()
+        if (tag, states) in visited:
+            continue
+        visited.add((tag, states))
+        matched, child_states = _advance(queries, states, tag)
+        if matched:
+            kept.add(tag)
+        if child_states:
+            expanded.add(tag)
+            pending.extend((child, child_states) for child in schema.get(tag, ()))
+
+    pending_kept = list(kept)
+    while pending_kept:
+        tag = pending_kept.pop()
+        for child in schema.get(tag, ()):
+            if child not in kept:
+                kept.add(child)
+                pending_kept.append(child)
+
+    expanded |= kept
+    return {
+        tag: set(children) if tag in expanded else set()
+        for tag, children in schema.items()
+    }
@@ -0,0 +1,168 @@
+import json
+import os
+from collections.abc import Hashable, Iterator, Mapping
+from pathlib import Path
+
+import numpy as np
+
+from nutcracker.kernel2.chunk import (
+    BUFFER_TYPES,
+    ArrayBuffer,
+    ChunkSettings,
+    _header_struct,
+    calc_align,
+)
+
+Schema = dict[str, set[str]]
+
+# tags are printable ASCII, zero padded data is not taken as container
+_TAG_BYTES = np.zeros(256, dtype=bool)
+_TAG_BYTES[0x20:0x7F] = True
+
+
+def plausible_chunks(
+    cfg: ChunkSettings,
+    buffer: ArrayBuffer,
+) -> list[tuple[str, int, int]] | None:
+    """Headers of buffer as single container level, None if buffer is not one.
+
+    Same layout rules as `scan_chunks`, but never raises:
+    sizes must chain exactly to end of buffer and all tags must be plausible.
+    Gives (tag, data start, data end) of each chunk.
+    """
+    header, tag_idx, size_idx = _header_struct(cfg.header_dtype)
+    hsize = header.size
+    incl = hsize if cfg.inclheader else 0
+    view = memoryview(buffer) if isinstance(buffer, BUFFER_TYPES) else buffer
+    length = len(view)
+    tags, entries = [], []
+    offset = 0
+    while offset < length:
+        if cfg.skip_byte is not None and view[offset] == cfg.skip_byte:
+            offset += 1
+        start = offset + hsize
+        if start > length:
+            return None
+        fields = header.unpack_from(view[offset:start])
+        tag, size = fields[tag_idx], fields[size_idx]
+        if not size and not tag.strip(b'\0'):
+            end = length
+        else:
+            end = start + size - incl
+            if not start <= end <= length:
+                return None
+        tags.append(tag)
+        entries.append((start, end))
+        offset = end + calc_align(end, cfg.alignment)
+    if not _TAG_BYTES[np.frombuffer(b''.join(tags), dtype=np.uint8)].all():
+        return None
+    return [
+        (tag.decode('ascii'), start, end)
+        for tag, (start, end) in zip(tags, entries, strict=True)
+    ]
+
+
+def infer_schema(
+    cfg: ChunkSettings,
+    buffer: ArrayBuffer,
+    schema: Mapping[str, set[str]] | None = None,
+) -> Schema:
+    """Infer schema from chunks in buffer, each chunk header is read once.
+
+    Chunks whose data is a plausible container level are containers,
+    others are leaves. Tags already known as leaves in `schema` are not checked.
+    """
+    result: Schema = {tag: set(children) for tag, children in (schema or {}).items()}
+
+    def infer(entries: list[tuple[str, int, int]], data: ArrayBuffer) -> None:
+        for tag, start, end in entries:
+            if tag in result and not result[tag]:
+                continue
+            chunk_data = data[start:end]
+            children = plausible_chunks(cfg, chunk_data)
+            if children is None:
+                result[tag] = set()
+                continue
+            if children:
+                result.setdefault(tag, set()).update(ctag for ctag, _, _ in children)
+            infer(children, chunk_data)
+
+    root = plausible_chunks(cfg, buffer)
+    if root is not None:
+        infer(root, buffer)
+    return result
+
+
+def dump_schema(schema: Mapping[str, set[str]]) -> dict[str, list[str]]:
+    return {tag: sorted(children) for tag, children in schema.items()}
+
+
+def load_schema(schema: Mapping[str, list[str]]) -> Schema:
+    return {tag: set(children) for tag, children in schema.items()}
+
+
+class SchemaCache:
+    """Inferred schemas memoized by key, e.g. (tag, version) of chunk.
+
+    Schemas are kept for the process and saved to `path` when attached,
+    chunks with same key only check tags which were not seen before.
+    """
+
+    def __init__(self, path: str | os.PathLike[str] | None = None) -> None:
+        self.path: Path | None = None
+        self._schemas: dict[str, Schema] = {}
+        if path is not None:
+            self.attach(path)
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return ':'.join(str(part) for part in parts)
+
+    def attach(self, path: str | os.PathLike[str]) -> None:
+        """Merge schemas saved in file and save further updates to it."""
+        self.path = Path(path)
+        try:
+            with self.path.open() as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, schema in saved.items():
+            merged = self._schemas.setdefault(key, {})
+            for tag, children in load_schema(schema).items():
+                merged.setdefault(tag, set()).update(children)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._key(key) in self._schemas
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._schemas)
+
+    def infer(
+        self,
+        cfg: ChunkSettings,
+        buffer: ArrayBuffer,
+        key: Hashable,
+    ) -> Schema:
+        skey = self._key(key)
+        cached = self._schemas.get(skey)
+        schema = infer_schema(cfg, buffer, cached)
+        if schema != cached:
+            self._schemas[skey] = schema
+            self.save()
+        return schema
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        tmp = self.path.with_name(f'{self.path.name}.tmp{os.getpid()}')
+        try:
+            with tmp.open('w') as f:
+                json.dump(
+                    {key: dump_schema(schema) for key, schema in self._schemas.items()},
+                    f,
+                )
+            # concurrent writers keep one consistent version
+            tmp.replace(self.path)
+        except OSError:
+            pass
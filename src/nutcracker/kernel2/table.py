@@ -0,0 +1,393 @@
+import os
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass, field, replace
+from typing import Any, Self
+
+import numpy as np
+from numpy.typing import NDArray
+
+from nutcracker.kernel2.chunk import ArrayBuffer, Chunk, nslice
+from nutcracker.kernel2.element import (
+    HASH_SIZE,
+    Element,
+    IndexerSettings,
+    check_schema,
+    leaf_hash,
+    map_chunks,
+    node_hash,
+)
+
+TABLE_DTYPE = np.dtype(
+    [
+        ('parent', '<i4'),  # index of parent entry, -1 for root
+        ('tag', '<u2'),  # index in table tags
+        ('name', '<i4'),  # index in table names, -1 when element has no path
+        ('relative', '?'),  # name is relative to parent path
+        ('offset', '<i8'),  # offset attribute, relative to parent data
+        ('header', '<i8'),  # offsets in table buffer
+        ('data_start', '<i8'),
+        ('data_end', '<i8'),
+        ('gid', '<i8'),  # -1 when element has no gid
+    ],
+)
+
+ElementRow = tuple[int, int, int, bool, int, int, int, int, int]
+
+
+def _dump_strings(strings: Iterable[str]) -> NDArray[np.uint8]:
+    return np.frombuffer('\0'.join(strings).encode('utf-8'), dtype=np.uint8)
+
+
+def _load_strings(data: NDArray[np.uint8]) -> list[str]:
+    return bytes(data).decode('utf-8').split('\0')
+
+
+class _Interner(dict[str, int]):
+    def __missing__(self, key: str) -> int:
+        self[key] = len(self)
+        return self[key]
+
+
+@dataclass
+class ElementTable:
+    """Array backed element tree, stored as columns in document order.
+
+    Path of each element is stored as interned name relative to parent path,
+    elements are materialized as lightweight `TableElement` views on access.
+    Only `path` and `gid` attributes set by `cfg.extra` are kept.
+    """
+
+    entries: NDArray[np.void]
+    tags: list[str]
+    names: list[str]
+    schema: dict[str, set[str]]
+    cfg: IndexerSettings | None = None
+    buffer: ArrayBuffer | None = None
+    _index: tuple[NDArray[np.intp], NDArray[np.intp]] | None = field(
+        default=None,
+        repr=False,
+    )
+    _tag_ids: dict[str, int] | None = field(default=None, repr=False)
+    _hashes: NDArray[np.void] | None = field(default=None, repr=False)
+
+    @classmethod
+    def from_buffer(
+        cls,
+        cfg: IndexerSettings,
+        buffer: ArrayBuffer,
+        offset: int = 0,
+    ) -> Self:
+        """Map chunks in buffer up to depth allowed by schema.
+
+        Mapped elements are not kept, only their table entries.
+        """
+        table = cls._tabulate(
+            map_chunks(cfg, buffer, offset=offset),
+            lambda elem: (
+                map_chunks(cfg, elem.data, parent=elem)
+                if cfg.schema.get(elem.tag)
+                else ()
+            ),
+            cfg.schema,
+        )
+        return replace(table, cfg=cfg, buffer=buffer)
+
+    @classmethod
+    def from_elements(
+        cls,
+        root: Iterable[Element],
+        schema: dict[str, set[str]],
+    ) -> Self:
+        """Tabulate elements and their children, positions are relative to root."""
+        return cls._tabulate(root, lambda elem: elem.children(), schema)
+
+    @classmethod
+    def _tabulate(
+        cls,
+        root: Iterable[Element],
+        children: Callable[[Element], Iterable[Element]],
+        schema: dict[str, set[str]],
+    ) -> Self:
+        rows: list[ElementRow] = []
+        tags = _Interner()
+        names = _Interner()
+
+        def tabulate(elements: Iterable[Element], parent: int, base: int) -> None:
+            for elem in elements:
+                header = base + elem.attribs['offset']
+                start = header + elem.cfg.header_dtype.itemsize()
+                path = elem.attribs.get('path')
+                gid = elem.attribs.get('gid')
+                name, relative = path, False
+                dirname = elem_paths.get(parent)
+                if path is not None and dirname and os.path.dirname(path) == dirname:
+                    name, relative = os.path.basename(path), True
+                idx = len(rows)
+                rows.append(
+                    (
+                        parent,
+                        tags[elem.tag],
+                        -1 if name is None else names[name],
+                        relative,
+                        elem.attribs['offset'],
+                        header,
+                        start,
+                        start + elem.attribs['size'],
+                        -1 if gid is None else gid,
+                    ),
+                )
+                elem_paths[idx] = elem.attribs.get('path')
+                tabulate(children(elem), idx, start)
+                del elem_paths[idx]
+
+        elem_paths: dict[int, str | None] = {}
+        tabulate(root, -1, 0)
+        return cls(
+            np.array(rows, dtype=TABLE_DTYPE),
+            list(tags),
+            list(names),
+            schema,
+        )
+
+    def to_arrays(self) -> dict[str, NDArray[Any]]:
+        """Columns and strings of table as arrays, e.g. for `np.savez`.
+
+        Hashes are included only if already computed.
+        """
+        arrays = {
+            'entries': self.entries,
+            'tags': _dump_strings(self.tags),
+            'names': _dump_strings(self.names),
+        }
+        if self._hashes is not None:
+            arrays['hashes'] = self._hashes
+        return arrays
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Mapping[str, NDArray[Any]],
+        schema: dict[str, set[str]],
+    ) -> Self:
+        return cls(
+            arrays['entries'],
+            _load_strings(arrays['tags']),
+            _load_strings(arrays['names']),
+            schema,
+            _hashes=arrays.get('hashes'),
+        )
+
+    def bind(self, cfg: IndexerSettings, buffer: ArrayBuffer) -> Self:
+        """Use table with given settings and buffer the table was created from."""
+        return replace(self, cfg=cfg, buffer=buffer)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator['TableElement']:
+        return (self.element(int(idx)) for idx in self.children_of(-1))
+
+    def children_of(self, index: int) -> NDArray[np.intp]:
+        """Indices of children of entry at given index, -1 for roots."""
+        if self._index is None:
+            parents = self.entries['parent'].astype(np.intp) + 1
+            order = np.argsort(parents, kind='stable')
+            bounds = np.zeros(len(self.entries) + 2, dtype=np.intp)
+            np.cumsum(np.bincount(parents, minlength=len(bounds) - 1), out=bounds[1:])
+            self._index = order, bounds
+        order, bounds = self._index
+        return order[bounds[index + 1] : bounds[index + 2]]
+
+    def tag(self, index: int) -> str:
+        return self.tags[self.entries['tag'][index]]
+
+    def tag_id(self, tag: str) -> int | None:
+        if self._tag_ids is None:
+            self._tag_ids = {tag: idx for idx, tag in enumerate(self.tags)}
+        return self._tag_ids.get(tag)
+
+    def path(self, index: int) -> str | None:
+        entry = self.entries[index]
+        if entry['name'] < 0:
+            return None
+        name = self.names[entry['name']]
+        if not entry['relative']:
+            return name
+        parent = self.path(int(entry['parent']))
+        assert parent is not None
+        return os.path.join(parent, name)
+
+    def attribs(self, index: int) -> dict[str, Any]:
+        entry = self.entries[index]
+        attribs = {
+            'offset': int(entry['offset']),
+            'size': int(entry['data_end'] - entry['data_start']),
+        }
+        if entry['name'] >= 0:
+            attribs['path'] = self.path(index)
+            attribs['gid'] = None if entry['gid'] < 0 else int(entry['gid'])
+        return attribs
+
+    def data(self, index: int) -> ArrayBuffer:
+        assert self.buffer is not None
+        entry = self.entries[index]
+        return nslice(self.buffer, int(entry['data_start']), int(entry['data_end']))
+
+    def chunk(self, index: int) -> Chunk:
+        assert self.cfg is not None
+        assert self.buffer is not None
+        entry = self.entries[index]
+        header = self.buffer[int(entry['header']) : int(entry['data_start'])]
+        return Chunk(self.cfg.header_dtype.from_buffer(header), self.data(index))
+
+    def hashes(self) -> NDArray[np.void]:
+        """Merkle hashes of all entries, same as `Element.hash` with table schema.
+
+        Leaves are hashed directly from buffer,
+        containers from hashes of their children gathered in a single array.
+        """
+        if self._hashes is None:
+            assert self.buffer is not None
+            hashes = np.zeros(len(self), dtype=f'V{HASH_SIZE}')
+            tags, containers = (
+                self.tags,
+                [bool(self.schema.get(tag)) for tag in self.tags],
+            )
+            view = self.buffer
+            rows = zip(
+                self.entries['tag'].tolist(),
+                self.entries['data_start'].tolist(),
+                self.entries['data_end'].tolist(),
+                strict=True,
+            )
+            # children always follow their parent
+            for idx, (tag, start, end) in reversed(list(enumerate(rows))):
+                if containers[tag]:
+                    children = hashes[self.children_of(idx)].tobytes()
+                    hashes[idx] = node_hash(tags[tag], end - start, children)
+                else:
+                    hashes[idx] = leaf_hash(tags[tag], end - start, view[start:end])
+            self._hashes = hashes
+        return self._hashes
+
+    def element(self, index: int) -> 'TableElement':
+        return TableElement(self, index)
+
+    def materialize(self) -> list[Element]:
+        """Create regular elements for entries reachable through `cfg.schema`."""
+        assert self.cfg is not None
+        assert self.buffer is not None
+        cfg, buffer = self.cfg, self.buffer
+        elements: list[Element | None] = []
+        children: dict[int, list[Element]] = {}
+        for idx, (parent, _, _, _, _, header, start, end, _) in enumerate(
+            self.entries.tolist(),
+        ):
+            pelem = elements[parent] if parent >= 0 else None
+            if parent >= 0 and (pelem is None or not cfg.schema.get(pelem.tag)):
+                elements.append(None)
+                continue
+            elem = Element(
+                cfg,
+                None,
+                self.attribs(idx),
+                source=(
+                    self.tag(idx).encode('ascii'),
+                    buffer[header:start],
+                    buffer[start:end],
+                ),
+            )
+            check_schema(cfg, elem, pelem)
+            elements.append(elem)
+            children.setdefault(parent, []).append(elem)
+
+        for idx, elem in enumerate(elements):
+            if elem is None or not cfg.schema.get(elem.tag):
+                continue
+            # containers missing from table are mapped on access
+            if self.schema.get(elem.tag):
+                elem.attach_children(children.get(idx, ()))
+
+        return children.get(-1, [])
+
+
+class TableElement(Element):
+    """Element view of a single `ElementTable` entry."""
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table: ElementTable, index: int) -> None:
+        assert table.cfg is not None
+        self.table = table
+        self.index = index
+        self.cfg = table.cfg
+        self._chunk = None
+        self._source = None
+        self.attribs = table.attribs(index)
+        self.parent = None
+        self._children = None
+        self._data = None
+        self._tag_index = None
+        self._dirty = False
+        self._size = None
+        self._hash = None
+
+    @property
+    def chunk(self) -> Chunk:
+        if self._chunk is None:
+            self._chunk = self.table.chunk(self.index)
+        return self._chunk
+
+    @property
+    def tag(self) -> str:
+        return self.table.tag(self.index)
+
+    @property
+    def data(self) -> ArrayBuffer:
+        if self._data is None and not self._dirty:
+            return self.table.data(self.index)
+        return super().data
+
+    @property
+    def hash(self) -> bytes:
+        if (
+            self._hash is None
+            and not self.modified
+            and self.table.schema == self.cfg.schema
+        ):
+            self._hash = bytes(self.table.hashes()[self.index])
+        return super().hash
+
+    def children(self) -> Iterator[Element]:
+        if self._children is not None or not self.table.schema.get(self.tag):
+            # modified elements and containers missing from table are mapped
+            yield from super().children()
+            return
+        if not self.cfg.schema.get(self.tag):
+            return
+        for idx in self.children_of():
+            child = self.table.element(int(idx))
+            check_schema(self.cfg, child, self)
+            yield child
+
+    def children_by_tag(self, tag: str) -> list[Element]:
+        if self._children is not None or not self.table.schema.get(self.tag):
+            return super().children_by_tag(tag)
+        if self._tag_index is None:
+            self._tag_index = {}
+        if tag not in self._tag_index:
+            self._tag_index[tag] = list(self._children_by_tag(tag))
+        return self._tag_index[tag]
+
+    def _children_by_tag(self, tag: str) -> Iterator[Element]:
+        tag_id = self.table.tag_id(tag)
+        if not self.cfg.schema.get(self.tag) or tag_id is None:
+            return
+        idx = self.children_of()
+        for cidx in idx[self.table.entries['tag'][idx] == tag_id]:
+            child = self.table.element(int(cidx))
+            check_schema(self.cfg, child, self)
+            yield child
+
+    def children_of(self) -> NDArray[np.intp]:
+        return self.table.children_of(self.index)
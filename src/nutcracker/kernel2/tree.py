@@ -1,21 +1,49 @@
+import functools
 import io
+import json
 import os
 import sys
-from collections.abc import Iterable, Iterator
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import replace
 from typing import IO
 
-from parse import parse  # type: ignore[import-untyped]
+import numpy as np
+from parse import compile as compile_parser  # type: ignore[import-untyped]
 
-from nutcracker.kernel2.element import Element
+from nutcracker.kernel2.element import Element, IndexerSettings
+from nutcracker.kernel2.table import ElementTable
+
+TREE_FORMAT = 1
+
+
+@functools.cache
+def compile_tag(tag: str) -> Callable[[str], bool] | None:
+    """Compile tag pattern to matcher, None for literal tag."""
+    if '{' not in tag:
+        return None
+    parser = compile_parser(tag)
+    return lambda value: parser.parse(value, evaluate_result=False) is not None
+
+
+@functools.cache
+def split_path(path: str) -> tuple[str, ...]:
+    path = os.path.normpath(path)
+    if not path or path == '.':
+        return ()
+    return tuple(path.split(os.sep))
 
 
 def findall(tag: str, root: Iterable[Element] | Element | None) -> Iterator[Element]:
     if not root:
         return
+    match = compile_tag(tag)
     if isinstance(root, Element):
+        if match is None:
+            yield from root.children_by_tag(tag)
+            return
         root = root.children()
     for elem in root:
-        if parse(tag, elem.tag, evaluate_result=False):
+        if elem.tag == tag if match is None else match(elem.tag):
             yield elem
 
 
@@ -26,11 +54,9 @@ def find(tag: str, root: Iterable[Element] | Element | None) -> Element | None:
 def findpath(
     path: str, root: Iterable[Element] | Element | None
 ) -> Iterable[Element] | Element | None:
-    path = os.path.normpath(path)
-    if not path or path == '.':
-        return root
-    dirname, basename = os.path.split(path)
-    return find(basename, findpath(dirname, root))
+    for tag in split_path(path):
+        root = find(tag, root)
+    return root
 
 
 def render(
@@ -57,3 +83,36 @@ def renders(element: Element) -> str:
     with io.StringIO() as stream:
         render(element, stream=stream)
         return stream.getvalue()
+
+
+def dump_tree(
+    file: str | os.PathLike[str] | IO[bytes],
+    root: Iterable[Element],
+    schema: dict[str, set[str]],
+) -> ElementTable:
+    """Save tags, offsets, sizes, paths and gids of element tree to `.npz` file."""
+    table = ElementTable.from_elements(root, schema)
+    meta = {
+        'format': TREE_FORMAT,
+        'schema': {tag: sorted(children) for tag, children in schema.items()},
+    }
+    np.savez(file, meta=np.array(json.dumps(meta)), **table.to_arrays())
+    return table
+
+
+def load_tree(
+    file: str | os.PathLike[str] | IO[bytes],
+    cfg: IndexerSettings | None = None,
+) -> ElementTable:
+    """Load element tree saved by `dump_tree` without scanning resources.
+
+    Elements can be accessed when `cfg` is given, e.g. to `render` them,
+    data is available only after binding the table to the resource buffer.
+    """
+    with np.load(file) as data:
+        meta = json.loads(str(data['meta']))
+        if meta['format'] != TREE_FORMAT:
+            raise ValueError(f'unsupported tree format: {meta["format"]}')  # noqa: TRY003
+        schema = {tag: set(children) for tag, children in meta['schema'].items()}
+        table = ElementTable.from_arrays(data, schema)
+    return replace(table, cfg=cfg)
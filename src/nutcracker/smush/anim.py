@@ -57,10 +57,10 @@ def from_bytes(resource: ArrayBuffer) -> Element:
 
     def set_frame_id(
         parent: Element | None,
-        chunk: Chunk,
+        elem: Element,
         offset: int,
     ) -> dict[str, Any]:
-        if chunk.tag != 'FRME':
+        if elem.tag != 'FRME':
             return {}
         return {'id': next(it)}
 
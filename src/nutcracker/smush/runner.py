@@ -4,17 +4,12 @@ from collections.abc import Iterable
 
 import typer
 
-from nutcracker.smush import anim
-from nutcracker.smush.compress import strip_compress_san
-from nutcracker.smush.decode import decode_nut, decode_san
-from nutcracker.smush.preset import smush
-from nutcracker.utils.fileio import write_file
-from nutcracker.utils.funcutils import flatten
-
 app = typer.Typer()
 
 
 def get_files(globs: Iterable[str]) -> set[str]:
+    from nutcracker.utils.funcutils import flatten
+
     return set(flatten(glob.iglob(fname) for fname in globs))
 
 
@@ -22,6 +17,9 @@ def get_files(globs: Iterable[str]) -> set[str]:
 def map_elements(
     files: list[str] = typer.Argument(..., help='Files to read from'),
 ) -> None:
+    from nutcracker.smush import anim
+    from nutcracker.smush.preset import smush
+
     for filename in get_files(files):
         basename = os.path.basename(filename)
         print(f'Mapping file: {basename}')
@@ -35,6 +33,9 @@ def decode(
     nut: bool = typer.Option(False, '--nut', help='Decode to grid image'),
     target_dir: str = typer.Option('out', '--target', '-t', help='Target directory'),
 ) -> None:
+    from nutcracker.smush import anim
+    from nutcracker.smush.decode import decode_nut, decode_san
+
     for filename in get_files(files):
         basename = os.path.basename(filename)
         print(f'Decoding file: {basename}')
@@ -51,6 +52,10 @@ def compress(
     files: list[str] = typer.Argument(..., help='Files to read from'),
     target_dir: str = typer.Option('out', '--target', '-t', help='Target directory'),
 ) -> None:
+    from nutcracker.smush import anim
+    from nutcracker.smush.compress import strip_compress_san
+    from nutcracker.utils.fileio import write_file
+
     for filename in get_files(files):
         basename = os.path.basename(filename)
         print(f'Compressing file: {basename}')
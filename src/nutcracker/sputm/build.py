@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
 
+import glob
 import io
 import os
-from collections.abc import Iterable, Iterator, Sequence
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from functools import partial
 
+from nutcracker.chiper import xor
 from nutcracker.kernel2.chunk import Chunk
-from nutcracker.kernel2.element import Element
+from nutcracker.kernel2.element import (
+    CopyFunc,
+    Element,
+    write_element,
+)
 from nutcracker.kernel2.fileio import read_file
 from nutcracker.sputm.tree import GameResource, GameResourceConfig
-from nutcracker.utils.fileio import write_file
+from nutcracker.utils import copyio
+from nutcracker.utils.fileio import replace_file
+from nutcracker.utils.pack import PackFile
 
 from .index import (
     read_directory_leg as read_dir,
@@ -129,25 +139,71 @@ def make_index_from_resource(
     return build_index(ref)
 
 
+@dataclass(frozen=True)
+class PatchDir:
+    """Patch files in directory tree, paths are relative to the directory."""
+
+    dirname: str
+    files: frozenset[str]
+
+    @classmethod
+    def scan(cls, dirname: str | os.PathLike[str]) -> 'PatchDir':
+        files = frozenset(glob.iglob(f'{dirname}/**/*', recursive=True))
+        return cls(os.fspath(dirname), files)
+
+    def __contains__(self, path: object) -> bool:
+        return isinstance(path, str) and os.path.join(self.dirname, path) in self.files
+
+    def isfile(self, path: str) -> bool:
+        return os.path.isfile(os.path.join(self.dirname, path))
+
+    def read(self, path: str) -> bytes:
+        return read_file(os.path.join(self.dirname, path))
+
+
+def open_patch(path: str | os.PathLike[str]) -> PatchDir | PackFile:
+    """Open patch directory or pack file."""
+    return PackFile(path) if os.path.isfile(path) else PatchDir.scan(path)
+
+
 def update_element(
-    basedir: str,
+    patch: PatchDir | PackFile,
     elements: Iterable[Element],
-    files: dict[str, bytes],
+    origins: dict[str, int] | None = None,
+    base: int = 0,
 ) -> Iterator[Element]:
-    offset = 0
+    """Replace elements with patch files which differ from reference.
+
+    Offsets of untouched rooms in reference disk are collected to `origins`.
+    """
     for elem in elements:
-        elem.attribs['offset'] = offset
-        full_path = os.path.join(basedir, elem.attribs.get('path'))
-        if full_path in files:
-            print(elem.attribs.get('path'))
-            if os.path.isfile(full_path):
-                attribs = elem.attribs
-                elem = next(sputm.map_chunks(read_file(full_path)))
-                elem.attribs = attribs
+        origin = base + elem.attribs['offset']
+        path = elem.attribs.get('path')
+        if path in patch:
+            if patch.isfile(path):
+                data = patch.read(path)
+                if data != bytes(sputm.mktag(elem.tag, elem.data)):
+                    print(path)
+                    attribs = elem.attribs
+                    elem = next(sputm.map_chunks(data))
+                    elem.attribs = attribs
             else:
-                elem.update_children(update_element(basedir, elem.children(), files))
-        offset += len(elem.data) + 8
-        elem.attribs['size'] = len(elem.data)
+                children = list(elem.children())
+                updated = list(
+                    update_element(
+                        patch,
+                        children,
+                        origins,
+                        origin + sputm.header_dtype.itemsize(),
+                    ),
+                )
+                if any(
+                    new is not old or new.modified
+                    for new, old in zip(updated, children, strict=True)
+                ):
+                    elem.set_children(updated)
+        if origins is not None and elem.tag == 'LFLF' and not elem.modified:
+            origins[path] = origin
         yield elem
 
 
@@ -168,43 +224,65 @@ def update_loff(config: GameResourceConfig, disk: Element) -> None:
         loff.update_raw(loff_data)
 
 
+def copy_origins(src: int, dst: int, origins: Mapping[str, int]) -> CopyFunc:
+    """Copy untouched chunks verbatim from reference disk file."""
+
+    def copy(elem: Element) -> int | None:
+        origin = origins.get(elem.attribs.get('path'))
+        if origin is None:
+            return None
+        size = sputm.header_dtype.itemsize() + len(elem.data)
+        copied = copyio.copy_range(src, dst, origin, size)
+        assert copied == size, (copied, size)
+        return copied
+
+    return copy
+
+
 def rebuild_resources(
     gameres: GameResource,
     basename: str,
     updated_resource: Sequence[Element],
+    origins: Mapping[str, int] | None = None,
 ) -> None:
+    """Write updated disks and index.
+
+    Rooms listed in `origins` are copied verbatim from reference disks,
+    as encryption does not depend on position. Files are replaced only
+    when written, so reference game can be rebuilt in place.
+    """
     index_file, *disks = gameres.game.disks
     for t, disk in zip(updated_resource, disks, strict=True):
+        # disk root is always rewritten from its children
+        t.set_children(t.children())
+        t.layout()
         update_loff(gameres.config, t)
 
         _, ext = os.path.splitext(disk)
-        write_file(
-            f'{basename}{ext}',
-            bytes(
-                sputm.mktag(
-                    t.tag,
-                    memoryview(
-                        sputm.write_chunks(
-                            sputm.mktag(e.tag, e.data) for e in t.children()
-                        )
-                    ),
-                )
-            ),
-            key=gameres.game.chiper_key,
-        )
+        with (
+            open(os.path.join(gameres.game.basedir, disk), 'rb') as src,
+            replace_file(f'{basename}{ext}') as f,
+        ):
+            write_element(
+                sputm,
+                partial(xor.write, f, key=gameres.game.chiper_key),
+                t,
+                copy_origins(src.fileno(), f.fileno(), origins) if origins else None,
+            )
 
     _, ext = os.path.splitext(index_file)
-    write_file(
-        f'{basename}{ext}',
-        sputm.write_chunks(
-            make_index_from_resource(
-                updated_resource,
-                gameres.game.index,
-                gameres.config.base_fix,
+    with replace_file(f'{basename}{ext}') as f:
+        xor.write(
+            f,
+            sputm.write_chunks(
+                make_index_from_resource(
+                    updated_resource,
+                    gameres.game.index,
+                    gameres.config.base_fix,
+                ),
             ),
-        ),
-        key=gameres.game.chiper_key,
-    )
+            key=gameres.game.chiper_key,
+        )
 
 
 # ## REFERENCE
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import zipfile
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from nutcracker.kernel2.element import Element
+from nutcracker.kernel2.fileio import ResourceFile
+from nutcracker.kernel2.schema import dump_schema, load_schema
+from nutcracker.kernel2.table import ElementTable
+
+from .preset import sputm
+from .resource import Game
+
+CACHE_EXT = '.nutidx'
+CACHE_FORMAT = 3
+SCHEMA_CACHE_EXT = '.nutschema'
+
+
+@dataclass(frozen=True)
+class IndexCache:
+    files: dict[str, dict[str, Any]]
+    game: dict[str, int]
+    index_schema: dict[str, set[str]]
+    schema: dict[str, set[str]]
+    disks: list[ElementTable]
+
+    def matches(self, game: Game) -> bool:
+        return self.game == game_key(game)
+
+
+def cache_path(index_file: str | os.PathLike[str]) -> str:
+    return os.path.splitext(index_file)[0] + CACHE_EXT
+
+
+def schema_cache_path(index_file: str | os.PathLike[str]) -> str:
+    return os.path.splitext(index_file)[0] + SCHEMA_CACHE_EXT
+
+
+def game_key(game: Game) -> dict[str, int]:
+    return {
+        'version': game.version,
+        'he_version': game.he_version,
+        'chiper_key': game.chiper_key,
+    }
+
+
+def file_digest(path: str | os.PathLike[str]) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'blake2b').hexdigest()
+
+
+def file_key(path: str | os.PathLike[str]) -> dict[str, Any]:
+    stat = os.stat(path)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': file_digest(path),
+    }
+
+
+def is_fresh(path: str | os.PathLike[str], key: Mapping[str, Any]) -> bool:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != key['size']:
+        return False
+    # content hash is only checked when file was touched
+    return stat.st_mtime_ns == key['mtime_ns'] or file_digest(path) == key['hash']
+
+
+def create_index_cache(
+    index_file: str | os.PathLike[str],
+    game: Game,
+    tables: Iterable[ElementTable],
+    schema: dict[str, set[str]],
+) -> IndexCache:
+    _, *disks = game.disks
+    tables = list(tables)
+    for table in tables:
+        # saved with index to compare games without reading them
+        table.hashes()
+    files = {
+        os.path.basename(index_file): file_key(index_file),
+        **{disk: file_key(os.path.join(game.basedir, disk)) for disk in disks},
+    }
+    return IndexCache(
+        files=files,
+        game=game_key(game),
+        index_schema=game.index_schema,
+        schema=schema,
+        disks=tables,
+    )
+
+
+def save_index_cache(path: str | os.PathLike[str], cache: IndexCache) -> None:
+    meta = {
+        'format': CACHE_FORMAT,
+        'files': cache.files,
+        'game': cache.game,
+        'index_schema': dump_schema(cache.index_schema),
+        'schema': dump_schema(cache.schema),
+        'disks': len(cache.disks),
+    }
+    arrays = {'meta': np.array(json.dumps(meta))}
+    for num, disk in enumerate(cache.disks):
+        for key, value in disk.to_arrays().items():
+            arrays[f'{key}_{num}'] = value
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def load_index_cache(index_file: str | os.PathLike[str]) -> IndexCache | None:
+    """Load index cache of given game, returns None if missing or outdated."""
+    try:
+        with np.load(cache_path(index_file)) as data:
+            meta = json.loads(str(data['meta']))
+            if meta['format'] != CACHE_FORMAT:
+                return None
+            schema = load_schema(meta['schema'])
+            disks = [
+                ElementTable.from_arrays(
+                    {key: data[f'{key}_{num}'] for key in ('entries', 'tags', 'names')},
+                    schema,
+                )
+                for num in range(meta['disks'])
+            ]
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        # missing, truncated or corrupt npz file
+        return None
+
+    basedir = os.path.dirname(index_file)
+    if not all(
+        is_fresh(os.path.join(basedir, fname), key)
+        for fname, key in meta['files'].items()
+    ):
+        return None
+
+    return IndexCache(
+        files=meta['files'],
+        game=meta['game'],
+        index_schema=load_schema(meta['index_schema']),
+        schema=schema,
+        disks=disks,
+    )
+
+
+def clear_index_cache(index_file: str | os.PathLike[str]) -> bool:
+    if os.path.exists(schema_cache_path(index_file)):
+        os.remove(schema_cache_path(index_file))
+    path = cache_path(index_file)
+    if not os.path.exists(path):
+        return False
+    os.remove(path)
+    return True
+
+
+def restore_game_resources(
+    cache: IndexCache,
+    game: Game,
+    *,
+    table: bool = False,
+    disk_index: int | None = None,
+    **kwargs: Any,
+) -> Iterator[Element]:
+    """Rebuild element tree of each disk from index without scanning.
+
+    When `table` is set, elements are given as views of the index table.
+    Only disk at `disk_index` is restored when given.
+    """
+    cfg = sputm(**kwargs)
+    _, *disks = game.disks
+    for didx, (disk, index) in enumerate(zip(disks, cache.disks, strict=True)):
+        if disk_index is not None and didx != disk_index:
+            continue
+        with ResourceFile.load(
+            os.path.join(game.basedir, disk),
+            key=game.chiper_key,
+        ) as resource:
+            bound = index.bind(cfg, resource[:])
+            yield from (iter(bound) if table else bound.materialize())
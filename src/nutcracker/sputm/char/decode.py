@@ -115,13 +115,12 @@ def handle_char(data):
 CHAR_PALETTE = [((59 + x) ** 2 * 83 // 67) % 256 for x in range(256 * 3)]
 
 
+CHAR_QUERIES = ('CHAR', 'LFLF/CHAR', 'LECF/LFLF/CHAR')
+
+
 def get_chars(root: Iterable[Element]) -> Iterator[Element]:
-    for elem in root:
-        if elem.tag in {'LECF', 'LFLF', 'CHAR'}:
-            if elem.tag in {'CHAR'}:
-                yield elem
-            else:
-                yield from get_chars(elem.children())
+    for _, elem in sputm.select_many(CHAR_QUERIES, root):
+        yield elem
 
 
 def decode_font(char: Element) -> image.TImage:
@@ -0,0 +1,59 @@
+from collections.abc import Iterable, Iterator
+from enum import Enum
+
+from nutcracker.kernel2.element import Element
+
+from .tree import GameResource
+
+
+class Change(str, Enum):
+    ADDED = 'A'
+    REMOVED = 'D'
+    MODIFIED = 'M'
+
+
+def _key(elem: Element) -> str:
+    return elem.attribs.get('path') or elem.tag
+
+
+def diff_elements(
+    old: Iterable[Element],
+    new: Iterable[Element],
+) -> Iterator[tuple[Change, str]]:
+    """Compare element trees by hash, descending only into differing containers.
+
+    Elements are matched by path, yields (change, path) in order of `old`,
+    followed by added elements.
+    """
+    new_elems = {_key(elem): elem for elem in new}
+    seen = set()
+    for elem in old:
+        key = _key(elem)
+        seen.add(key)
+        other = new_elems.get(key)
+        if other is None:
+            yield Change.REMOVED, key
+            continue
+        if elem.hash == other.hash:
+            continue
+        if elem.tag == other.tag and elem.cfg.schema.get(elem.tag):
+            changes = list(diff_elements(elem.children(), other.children()))
+            if changes:
+                yield from changes
+                continue
+        # payload or header changed outside of children
+        yield Change.MODIFIED, key
+    for key in new_elems:
+        if key not in seen:
+            yield Change.ADDED, key
+
+
+def diff_games(
+    old: GameResource,
+    new: GameResource,
+) -> Iterator[tuple[Change, str]]:
+    """Compare index and disks of two games."""
+    yield from diff_elements(old.game.index, new.game.index)
+    yield from diff_elements(
+        old.read_resources(table=True), new.read_resources(table=True)
+    )
@@ -0,0 +1,106 @@
+import pickle
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from nutcracker.kernel2.element import Element
+
+if TYPE_CHECKING:
+    from .tree import GameResource, GameSource
+
+T = TypeVar('T')
+
+SelectFunc = Callable[[Iterable[Element]], Iterable[Element]]
+ProcessFunc = Callable[..., T]  # (gameres, element, *args)
+
+# game resource opened once by each worker process
+_worker: dict[str, Any] = {}
+
+
+def _init_worker(source: 'GameSource') -> None:
+    _worker['gameres'] = source.open()
+
+
+def _read_selected(
+    disk_index: int,
+    select: SelectFunc,
+    kwargs: dict[str, Any],
+) -> list[Element]:
+    # disks are submitted in order, so only elements of last disk are kept
+    cached = _worker.get('disk')
+    if cached is None or cached[0] != disk_index:
+        gameres = _worker['gameres']
+        elems = list(select(gameres.read_disk(disk_index, **kwargs)))
+        cached = _worker['disk'] = (disk_index, elems)
+    return cached[1]
+
+
+def _process_part(  # noqa: PLR0913
+    disk_index: int,
+    part: int,
+    parts: int,
+    select: SelectFunc,
+    process: ProcessFunc[T],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> list[T]:
+    # worker maps the disk file itself once, only positions are sent between processes
+    elems = _read_selected(disk_index, select, kwargs)
+    try:
+        return [process(_worker['gameres'], elem, *args) for elem in elems[part::parts]]
+    except Exception as exc:
+        try:
+            pickle.loads(pickle.dumps(exc))  # noqa: S301
+        except Exception:
+            # error could not be restored in main process, would break the pool
+            raise RuntimeError(f'{type(exc).__name__}: {exc}') from None  # noqa: TRY003
+        raise
+
+
+def _interleave(parts: Sequence[list[T]]) -> list[T]:
+    merged: list[Any] = [None] * sum(len(part) for part in parts)
+    for start, part in enumerate(parts):
+        merged[start :: len(parts)] = part
+    return merged
+
+
+def map_disks(
+    gameres: 'GameResource',
+    select: SelectFunc,
+    process: ProcessFunc[T],
+    *args: Any,
+    jobs: int = 1,
+    **kwargs: Any,
+) -> Iterator[list[T]]:
+    """Apply `process` on elements selected from each disk, yields results per disk.
+
+    With more than one job, elements are processed in worker processes,
+    `select` and `process` should be module level functions then.
+    Each disk is split to interleaved parts, so element count is not needed upfront.
+    Results are given in the same order as when processed serially.
+    `kwargs` are given to `GameResource.read_disk`.
+    """
+    if jobs <= 1:
+        for didx in range(gameres.num_disks):
+            elems = select(gameres.read_disk(didx, **kwargs))
+            yield [process(gameres, elem, *args) for elem in elems]
+        return
+
+    assert gameres.source is not None
+    parts = jobs * 4
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(gameres.source,),
+    ) as executor:
+        futures = [
+            [
+                executor.submit(
+                    _process_part, didx, part, parts, select, process, args, kwargs
+                )
+                for part in range(parts)
+            ]
+            for didx in range(gameres.num_disks)
+        ]
+        for disk_futures in futures:
+            yield _interleave([future.result() for future in disk_futures])
@@ -1,5 +1,6 @@
 from nutcracker.kernel2.chunk import IFFChunkHeader
 from nutcracker.kernel2.preset import Preset
+from nutcracker.kernel2.schema import SchemaCache
 
 from .schema import SCHEMA
 
@@ -11,3 +12,6 @@ sputm = Preset(
     schema=SCHEMA,
     errors='ignore',
 )
+
+# schemas inferred from chunks of unknown layout, e.g. v8 images
+schemas = SchemaCache()
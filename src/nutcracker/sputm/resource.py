@@ -45,6 +45,7 @@ class _GameMeta:
 class Game(_GameMeta):
     index: Sequence[Element] = field(repr=False)
     disks: Sequence[str] = field(repr=False)
+    index_schema: dict[str, set[str]] = field(repr=False, default_factory=dict)
 
 
 def get_disk(game: _GameMeta, num: int) -> str:
@@ -62,7 +63,11 @@ def get_disk(game: _GameMeta, num: int) -> str:
     return f'DISK{num:02d}.LEC' if num > 0 else '000.LFL'
 
 
-def load_resource(index_file: str | os.PathLike[str], chiper_key: int | None = None) -> Game:
+def load_resource(
+    index_file: str | os.PathLike[str],
+    chiper_key: int | None = None,
+    schema: dict[str, set[str]] | None = None,
+) -> Game:
     print(index_file)
     basename, ext = os.path.splitext(os.path.basename(index_file))
     ext = ext.upper()
@@ -72,7 +77,8 @@ def load_resource(index_file: str | os.PathLike[str], chiper_key: int | None = N
         chiper_key = chiper_keys.get(ext, 0x00)
 
     with ResourceFile.load(index_file, key=chiper_key) as index:
-        schema = sputm.generate_schema(index)
+        # index schema is kept with index cache of each game, not shared
+        schema = schema or sputm.generate_schema(index)
         index_root = list(sputm(schema=schema).map_chunks(index))
 
     # Detect version from index
@@ -103,6 +109,7 @@ def load_resource(index_file: str | os.PathLike[str], chiper_key: int | None = N
         **(asdict(game)),
         index=index_root,
         disks=tuple(get_disk(game, disk) for disk in disks),
+        index_schema=schema,
     )
 
 
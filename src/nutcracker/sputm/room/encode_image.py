@@ -15,7 +15,7 @@ from nutcracker.codex.smap import (
 from nutcracker.kernel2.element import Element
 from nutcracker.utils.fileio import write_file
 
-from ..preset import sputm
+from ..preset import schemas, sputm
 
 
 def encode_block_v8(
@@ -23,6 +23,9 @@ def encode_block_v8(
     blocktype: str,
     version: int = 8,
     ref: Element | None = None,
+    strip_jobs: int = 1,
+    *,
+    optimize: bool = False,
 ) -> bytes:
     im = Image.open(filename)
     npim = np.asarray(im, dtype=np.uint8)
@@ -31,7 +34,7 @@ def encode_block_v8(
         ref_data = ref.data if ref else None
         if version == 8 and ref_data:
             chunk = bytes(sputm.mktag(blocktype, ref_data))
-            s = sputm.generate_schema(chunk)
+            s = schemas.infer(sputm, chunk, (blocktype, version))
             image = next(sputm(schema=s).map_chunks(chunk))
 
             bstr = sputm.findpath('BSTR/WRAP', image)
@@ -39,8 +42,8 @@ def encode_block_v8(
             ref_data = bstr.data[8:] if bstr else None
 
         codes = extract_smap_codes(*npim.shape, ref_data) if ref_data else None
-        smap = encode_smap(npim, codes=codes)
-        assert np.array_equal(npim, decode_smap(*npim.shape, smap))
+        smap = encode_smap(npim, codes=codes, jobs=strip_jobs, optimize=optimize)
+        assert np.array_equal(npim, decode_smap(*npim.shape, smap, jobs=strip_jobs))
         # TODO: detect version, older games should return here
         if version < 8:
             return smap
@@ -55,11 +58,14 @@ def encode_block_v8(
 
         # verify
         chunk = bytes(sputm.mktag(blocktype, smap_v8))
-        s = sputm.generate_schema(chunk)
+        s = schemas.infer(sputm, chunk, (blocktype, version))
         image = next(sputm(schema=s).map_chunks(chunk))
 
         bstr = sputm.findpath('BSTR/WRAP', image)
-        assert np.array_equal(npim, decode_smap(*npim.shape, bstr.data[8:]))
+        assert np.array_equal(
+            npim,
+            decode_smap(*npim.shape, bstr.data[8:], jobs=strip_jobs),
+        )
 
         return smap_v8
 
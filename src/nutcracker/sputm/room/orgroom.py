@@ -2,12 +2,13 @@
 
 import io
 import os
+import time
 from collections.abc import Iterable, Iterator, Sequence
 from dataclasses import dataclass
 
 from nutcracker.kernel2.element import Element
 
-from ..preset import sputm
+from ..preset import schemas, sputm
 from .encode_image import encode_block_v8
 from .pproom import get_rooms, read_room_settings
 from .proom import read_imhd, read_imhd_v7, read_imhd_v8
@@ -89,12 +90,15 @@ def read_objects(room, version):
                 #     yield path, name, bomp, obj_x, obj_y
 
 
-def encode_images_v8(
+def encode_images_v8(  # noqa: PLR0913
     basedir: str,
     imag: Element,
     obj_name: str,
     room_id: int,
     rnam: str,
+    strip_jobs: int = 1,
+    *,
+    optimize: bool = False,
 ) -> Iterator[tuple[Element, bytes | None]]:
     _, *frames = imag.children()
     for iidx, imxx in enumerate(frames):
@@ -106,12 +110,18 @@ def encode_images_v8(
         im_path = os.path.join(basedir, f'{im_path}.png')
 
         chunk = bytes(sputm.mktag(imxx.tag, imxx.data))
-        s = sputm.generate_schema(chunk)
+        s = schemas.infer(sputm, chunk, (imxx.tag, 8))
         image = next(sputm(schema=s).map_chunks(chunk))
         print(image)
 
         if os.path.exists(im_path):
-            encoded = encode_block_v8(im_path, imxx.tag, ref=imxx)
+            encoded = encode_block_v8(
+                im_path,
+                imxx.tag,
+                ref=imxx,
+                strip_jobs=strip_jobs,
+                optimize=optimize,
+            )
             if image.tag == 'SMAP':
                 zpln = sputm.find('ZPLN', image)
                 assert (
@@ -156,17 +166,50 @@ def make_wrap(images: Sequence[tuple[Element, bytes | None]]) -> bytes:
         )
 
 
-def make_room_images_patch(
+@dataclass
+class EncodeReport:
+    """Sizes of encoded images of a room compared to reference."""
+
+    room: str
+    images: int = 0
+    ref_size: int = 0
+    size: int = 0
+    seconds: float = 0.0
+
+    def add(self, ref: Element, content: bytes, seconds: float) -> None:
+        self.images += 1
+        self.ref_size += len(sputm.mktag(ref.tag, ref.data))
+        self.size += len(content)
+        self.seconds += seconds
+
+    def __str__(self) -> str:
+        change = (self.size - self.ref_size) / self.ref_size if self.ref_size else 0
+        return (
+            f'{self.room}: {self.images} images,'
+            f' {self.ref_size} -> {self.size} bytes ({change:+.1%}),'
+            f' {self.seconds:.2f}s'
+        )
+
+
+def make_room_images_patch(  # noqa: PLR0913
     root: Iterable[Element],
     basedir: str,
     rnam: str,
     version: int,
+    strip_jobs: int = 1,
+    *,
+    optimize: bool = False,
 ) -> Iterator[tuple[str, bytes]]:
     for t in root:
         for lflf in get_rooms(t.children()):
             header, palette, room, rmim = read_room_settings(lflf)
             room_bg = None
             room_id = lflf.attribs.get('gid')
+            report = EncodeReport(
+                f'{room_id:04d}_{rnam.get(room_id)}'
+                if room_id in rnam
+                else lflf.attribs['path'],
+            )
 
             for imxx in read_room(header, rmim):
                 im_path = (
@@ -178,16 +221,19 @@ def make_room_images_patch(
                 im_path = os.path.join(basedir, 'backgrounds', f'{im_path}.png')
 
                 chunk = bytes(sputm.mktag(imxx.tag, imxx.data))
-                s = sputm.generate_schema(chunk)
+                s = schemas.infer(sputm, chunk, (imxx.tag, version))
                 image = next(sputm(schema=s).map_chunks(chunk))
 
                 if os.path.exists(im_path):
                     # res_path = os.path.join(dirname, imxx.attribs['path'])
+                    start = time.perf_counter()
                     encoded = encode_block_v8(
                         im_path,
                         imxx.tag,
                         version=version,
                         ref=imxx,
+                        strip_jobs=strip_jobs,
+                        optimize=optimize,
                     )
                     if encoded:
                         if image.tag == 'SMAP':
@@ -204,16 +250,16 @@ def make_room_images_patch(
                                 )
                                 assert zpln
                                 encoded += bytes(sputm.mktag('ZPLN', zpln.data))
-                        yield (
-                            imxx.attribs['path'],
-                            bytes(sputm.mktag(imxx.tag, encoded)),
-                        )
+                        content = bytes(sputm.mktag(imxx.tag, encoded))
+                        report.add(imxx, content, time.perf_counter() - start)
+                        yield imxx.attribs['path'], content
                         # os.makedirs(os.path.dirname(res_path), exist_ok=True)
                         # write_file(res_path, sputm.mktag(imxx.tag, encoded))
                     print((im_path, imxx.attribs['path'], imxx.tag))
 
             for path, obj_name, imag, obj_header in read_objects(room, version):
                 if imag.tag == 'WRAP':
+                    start = time.perf_counter()
                     images = list(
                         encode_images_v8(
                             os.path.join(basedir, 'objects'),
@@ -221,11 +267,15 @@ def make_room_images_patch(
                             obj_name,
                             room_id,
                             rnam,
+                            strip_jobs=strip_jobs,
+                            optimize=optimize,
                         ),
                     )
                     if any(custome is not None for imxx, custome in images):
                         # res_path = os.path.join(dirname, imag.attribs['path'])
-                        yield imag.attribs['path'], make_wrap(images)
+                        content = make_wrap(images)
+                        report.add(imag, content, time.perf_counter() - start)
+                        yield imag.attribs['path'], content
                         # os.makedirs(os.path.dirname(res_path), exist_ok=True)
                         # write_file(res_path, make_wrap(images))
 
@@ -255,23 +305,28 @@ def make_room_images_patch(
                     im_path = os.path.join(basedir, 'objects', f'{im_path}.png')
 
                     chunk = bytes(sputm.mktag(imag.tag, imag.data))
-                    s = sputm.generate_schema(chunk)
+                    s = schemas.infer(sputm, chunk, (imag.tag, version))
                     image = next(sputm(schema=s).map_chunks(chunk))
 
                     # print(im_path, imag)
                     if os.path.exists(im_path):
                         print('exists')
+                        start = time.perf_counter()
                         encoded = encode_block_v8(
                             im_path,
                             imag.tag,
                             version=version,
                             ref=imag,
+                            strip_jobs=strip_jobs,
+                            optimize=optimize,
                         )
                         if encoded:
-                            yield (
-                                imag.attribs['path'],
-                                bytes(sputm.mktag(imag.tag, encoded)),
-                            )
+                            content = bytes(sputm.mktag(imag.tag, encoded))
+                            report.add(imag, content, time.perf_counter() - start)
+                            yield imag.attribs['path'], content
                             # os.makedirs(os.path.dirname(res_path), exist_ok=True)
                             # write_file(res_path, sputm.mktag(imxx.tag, encoded))
                         print((im_path, imag.attribs['path'], imag.tag))
+
+            if report.images:
+                print(report)
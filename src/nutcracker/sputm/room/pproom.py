@@ -9,7 +9,7 @@ from nutcracker.graphics import image
 from nutcracker.graphics.frame import resize_pil_image
 from nutcracker.graphics.image import convert_to_pil_image
 
-from ..preset import sputm
+from ..preset import schemas, sputm
 from .proom import (
     read_imhd,
     read_imhd_v7,
@@ -45,7 +45,7 @@ def read_room_settings(lflf):
     return header, palette, room, rmim or sputm.find('IMAG', room)
 
 
-def read_room(header, rmim):
+def read_room(header, rmim, strip_jobs=1):
     if rmim.tag == 'RMIM':
         # 'Game Version < 7'
         for imxx in sputm.findall('IM{:02x}', rmim):
@@ -55,6 +55,7 @@ def read_room(header, rmim):
                 header.width,
                 header.height,
                 header.zbuffers,
+                strip_jobs=strip_jobs,
             )
             if bgim is None:
                 continue
@@ -75,7 +76,7 @@ def read_room(header, rmim):
             assert imxx.attribs['gid'] == 1, imxx.attribs['gid']
 
             chunk = bytes(sputm.mktag(imxx.tag, imxx.data))
-            s = sputm.generate_schema(chunk)
+            s = schemas.infer(sputm, chunk, (imxx.tag, 8))
             image = next(sputm(schema=s).map_chunks(chunk))
 
             bgim = read_room_background_v8(
@@ -83,6 +84,7 @@ def read_room(header, rmim):
                 header.width,
                 header.height,
                 header.zbuffers,
+                strip_jobs=strip_jobs,
             )
             if bgim is None:
                 continue
@@ -97,7 +99,7 @@ def read_room(header, rmim):
             yield path, im, zpxx
 
 
-def read_objects(header, room, version):
+def read_objects(header, room, version, strip_jobs=1):
     for obim in sputm.findall('OBIM', room):
         imhd = sputm.find('IMHD', obim).data
         if version < 8:
@@ -117,6 +119,7 @@ def read_objects(header, room, version):
                     obj_height,
                     0,
                     transparency=header.transparency,
+                    strip_jobs=strip_jobs,
                 )
                 if bgim is None:
                     continue
@@ -137,7 +140,7 @@ def read_objects(header, room, version):
                 _, *frames = wrap.children()
                 for iidx, bomp in enumerate(frames):
                     chunk = bytes(sputm.mktag(bomp.tag, bomp.data))
-                    s = sputm.generate_schema(chunk)
+                    s = schemas.infer(sputm, chunk, (bomp.tag, version))
                     image = next(sputm(schema=s).map_chunks(chunk))
 
                     bgim = read_room_background_v8(
@@ -146,6 +149,7 @@ def read_objects(header, room, version):
                         obj_height,
                         0,
                         transparency=header.transparency,
+                        strip_jobs=strip_jobs,
                     )
                     im = convert_to_pil_image(bgim)
 
@@ -155,13 +159,12 @@ def read_objects(header, room, version):
                     yield path, name, im, obj_x, obj_y
 
 
+ROOM_QUERIES = ('LFLF', 'LECF/LFLF')
+
+
 def get_rooms(root):
-    for elem in root:
-        if elem.tag in {'LECF', 'LFLF'}:
-            if elem.tag in {'LFLF'}:
-                yield elem
-            else:
-                yield from get_rooms(elem.children())
+    for _, elem in sputm.select_many(ROOM_QUERIES, root):
+        yield elem
 
 
 EGA = (
@@ -190,64 +193,79 @@ def extract_room_images(root, basedir, rnam, version, ega_mode=False):
         paths = {}
 
         for lflf in get_rooms(t.children()):
-            header, palette, room, rmim = read_room_settings(lflf)
-            print(header)
-            epal = sputm.find('EPAL', room)
-            if epal:
-                egapal = np.frombuffer(epal.data, dtype=np.uint8)
-            room_bg = None
-            room_id = lflf.attribs.get('gid')
-
-            for path, room_bg, zpxx in read_room(header, rmim):
-                if ega_mode and epal:
-                    room_bg = np.asarray(room_bg)
-                    room_bg1 = egapal[room_bg] % 16
-                    room_bg2 = egapal[room_bg] // 16
-                    room_bg3 = np.copy(room_bg1)
-                    room_bg4 = np.copy(room_bg2)
-                    room_bg3[::2, :] = room_bg2[::2, :]
-                    room_bg4[::2, :] = room_bg1[::2, :]
-                    room_bg = np.dstack([room_bg3, room_bg4]).reshape(
-                        room_bg.shape[0],
-                        room_bg.shape[1] * 2,
-                    )
-                    room_bg = np.repeat(room_bg, 2, axis=0)
-                    # print(room_bg.shape)
-                    room_bg = Image.fromarray(EGA[np.asarray(room_bg)])
-                else:
-                    room_bg.putpalette(palette)
-
-                path = f'{room_id:04d}_{rnam.get(room_id)}' if room_id in rnam else path
-
-                path = path.replace(os.path.sep, '_')
-                # dirname = os.path.dirname(path)
-                # os.makedirs(os.path.join(basedir, dirname), exist_ok=True)
-                assert path not in paths, path
+            for path in extract_room(lflf, basedir, rnam, version, ega_mode=ega_mode):
+                assert path not in paths, (path, paths)
                 paths[path] = True
-                room_bg.save(os.path.join(basedir, 'backgrounds', f'{path}.png'))
 
-            for path, name, im, obj_x, obj_y in read_objects(header, room, version):
-                im.putpalette(palette)
 
-                path = f'{room_id:04d}_{name}' if room_id in rnam else path
+def extract_room(lflf, basedir, rnam, version, ega_mode=False, strip_jobs=1):
+    """Save images of a single room, returns names of saved images."""
+    paths = {}
+    header, palette, room, rmim = read_room_settings(lflf)
+    print(header)
+    epal = sputm.find('EPAL', room)
+    if epal:
+        egapal = np.frombuffer(epal.data, dtype=np.uint8)
+    room_bg = None
+    room_id = lflf.attribs.get('gid')
+
+    for path, room_bg, zpxx in read_room(header, rmim, strip_jobs=strip_jobs):
+        if ega_mode and epal:
+            room_bg = np.asarray(room_bg)
+            room_bg1 = egapal[room_bg] % 16
+            room_bg2 = egapal[room_bg] // 16
+            room_bg3 = np.copy(room_bg1)
+            room_bg4 = np.copy(room_bg2)
+            room_bg3[::2, :] = room_bg2[::2, :]
+            room_bg4[::2, :] = room_bg1[::2, :]
+            room_bg = np.dstack([room_bg3, room_bg4]).reshape(
+                room_bg.shape[0],
+                room_bg.shape[1] * 2,
+            )
+            room_bg = np.repeat(room_bg, 2, axis=0)
+            # print(room_bg.shape)
+            room_bg = Image.fromarray(EGA[np.asarray(room_bg)])
+        else:
+            room_bg.putpalette(palette)
+
+        path = f'{room_id:04d}_{rnam.get(room_id)}' if room_id in rnam else path
+
+        path = path.replace(os.path.sep, '_')
+        # dirname = os.path.dirname(path)
+        # os.makedirs(os.path.join(basedir, dirname), exist_ok=True)
+        assert path not in paths, path
+        paths[path] = True
+        room_bg.save(os.path.join(basedir, 'backgrounds', f'{path}.png'))
+
+    for path, name, im, obj_x, obj_y in read_objects(
+        header,
+        room,
+        version,
+        strip_jobs=strip_jobs,
+    ):
+        im.putpalette(palette)
+
+        path = f'{room_id:04d}_{name}' if room_id in rnam else path
+
+        path = path.replace(os.path.sep, '_')
+        # dirname = os.path.dirname(path)
+        # os.makedirs(os.path.join(basedir, dirname), exist_ok=True)
+        # while path in paths:
+        #     path += 'd'
+        assert not path in paths, (path, paths)
+        paths[path] = True
+        im.save(os.path.join(basedir, 'objects', f'{path}.png'))
+
+        if room_bg:
+            im_layer = resize_pil_image(
+                *room_bg.size,
+                39,
+                im,
+                image.ImagePosition(x1=obj_x, y1=obj_y),
+            )
+            im_layer.putpalette(palette)
+            im_layer.save(
+                os.path.join(basedir, 'objects_layers', f'{path}.png'),
+            )
 
-                path = path.replace(os.path.sep, '_')
-                # dirname = os.path.dirname(path)
-                # os.makedirs(os.path.join(basedir, dirname), exist_ok=True)
-                # while path in paths:
-                #     path += 'd'
-                assert not path in paths, (path, paths)
-                paths[path] = True
-                im.save(os.path.join(basedir, 'objects', f'{path}.png'))
-
-                if room_bg:
-                    im_layer = resize_pil_image(
-                        *room_bg.size,
-                        39,
-                        im,
-                        image.ImagePosition(x1=obj_x, y1=obj_y),
-                    )
-                    im_layer.putpalette(palette)
-                    im_layer.save(
-                        os.path.join(basedir, 'objects_layers', f'{path}.png'),
-                    )
+    return list(paths)
@@ -11,13 +11,26 @@ from nutcracker.codex.smap import decode_he, decode_smap, read_uint16le, read_ui
 from ..preset import sputm
 
 
-def read_room_background_v8(image, width, height, zbuffers, transparency=None):
+def read_room_background_v8(
+    image,
+    width,
+    height,
+    zbuffers,
+    transparency=None,
+    strip_jobs=1,
+):
     if image.tag == 'SMAP':
         sputm.render(image)
         bstr = sputm.findpath('BSTR/WRAP', image)
         if not bstr:
             return None
-        return decode_smap(height, width, bstr.data[8:], transparency=transparency)
+        return decode_smap(
+            height,
+            width,
+            bstr.data[8:],
+            transparency=transparency,
+            jobs=strip_jobs,
+        )
     elif image.tag == 'BOMP':
         with io.BytesIO(image.data) as s:
             width = read_uint32le(s)
@@ -28,9 +41,16 @@ def read_room_background_v8(image, width, height, zbuffers, transparency=None):
         raise ValueError(f'Unknown image codec: {image.tag}')
 
 
-def read_room_background(image, width, height, zbuffers, transparency=None):
+def read_room_background(
+    image,
+    width,
+    height,
+    zbuffers,
+    transparency=None,
+    strip_jobs=1,
+):
     if image.tag == 'SMAP':
-        return decode_smap(height, width, image.data, transparency)
+        return decode_smap(height, width, image.data, transparency, jobs=strip_jobs)
     elif image.tag == 'BOMP':
         with io.BytesIO(image.data) as s:
             # pylint: disable=unused-variable
@@ -1,33 +1,67 @@
 import os
+from collections.abc import Iterable, Iterator
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
 
-from nutcracker.sputm.room.orgroom import make_room_images_patch
-from nutcracker.sputm.room.pproom import extract_room_images
-from nutcracker.utils.fileio import write_file
+if TYPE_CHECKING:
+    from nutcracker.kernel2.element import Element
 
-from ..tree import open_game_resource
+    from ..tree import GameResource
 
 app = typer.Typer()
 
 
+def _disk_rooms(root: Iterable['Element']) -> Iterator['Element']:
+    from nutcracker.sputm.room.pproom import get_rooms
+
+    for disk in root:
+        yield from get_rooms(disk.children())
+
+
+def _decode_room(
+    gameres: 'GameResource',
+    lflf: 'Element',
+    basedir: str,
+    *,
+    ega_mode: bool,
+    strip_jobs: int,
+) -> list[str]:
+    from nutcracker.sputm.room.pproom import extract_room
+
+    return extract_room(
+        lflf,
+        basedir,
+        gameres.rooms,
+        gameres.game.version,
+        ega_mode=ega_mode,
+        strip_jobs=strip_jobs,
+    )
+
+
 @app.command('decode')
 def decode(
     filename: Path = typer.Argument(..., help='Game resource index file'),
     ega_mode: bool = typer.Option(False, '--ega', help='Simulate EGA images decoding'),
+    no_cache: bool = typer.Option(
+        False,
+        '--no-cache',
+        help='Do not use resource index cache',
+    ),
+    jobs: int = typer.Option(1, '--jobs', '-j', help='Number of worker processes'),
+    strip_jobs: int = typer.Option(
+        1,
+        '--strip-jobs',
+        help='Number of worker processes for strips of each image',
+    ),
 ) -> None:
-    gameres = open_game_resource(filename)
-    basename = gameres.basename
+    from ..parallel import map_disks
+    from ..tree import open_game_resource
 
-    root = gameres.read_resources(
-        # schema=narrow_schema(
-        #     SCHEMA, {'LECF', 'LFLF', 'RMDA', 'ROOM', 'PALS'}
-        # )
-    )
-
-    rnam = gameres.rooms
-    version = gameres.game.version
+    gameres = open_game_resource(filename, use_cache=not no_cache)
+    basename = gameres.basename
 
     basedir = os.path.join(basename, 'IMAGES')
     os.makedirs(basedir, exist_ok=True)
@@ -36,15 +70,46 @@ def decode(
     os.makedirs(os.path.join(basedir, 'objects'), exist_ok=True)
     os.makedirs(os.path.join(basedir, 'objects_layers'), exist_ok=True)
 
-    extract_room_images(root, basedir, rnam, version, ega_mode=ega_mode)
+    for disk in map_disks(
+        gameres,
+        _disk_rooms,
+        partial(_decode_room, ega_mode=ega_mode, strip_jobs=strip_jobs),
+        basedir,
+        jobs=jobs,
+        # schema=narrow_schema(
+        #     SCHEMA, {'LECF', 'LFLF', 'RMDA', 'ROOM', 'PALS'}
+        # )
+    ):
+        paths = [path for room in disk for path in room]
+        assert len(paths) == len(set(paths)), paths
 
 
 @app.command('encode')
 def encode(
     dirname: Path = typer.Argument(..., help='Patch directory'),
     ref: Path = typer.Option(..., '--ref', help='Reference resource index'),
+    no_cache: bool = typer.Option(
+        False,
+        '--no-cache',
+        help='Do not use resource index cache',
+    ),
+    strip_jobs: int = typer.Option(
+        1,
+        '--strip-jobs',
+        help='Number of worker processes for strips of each image',
+    ),
+    optimize: bool = typer.Option(
+        False,
+        '--optimize',
+        help='Use smallest encoding of each strip instead of reference codec',
+    ),
 ) -> None:
-    gameres = open_game_resource(ref)
+    from nutcracker.sputm.room.orgroom import make_room_images_patch
+    from nutcracker.utils.fileio import write_file
+
+    from ..tree import open_game_resource
+
+    gameres = open_game_resource(ref, use_cache=not no_cache)
     basename = os.path.basename(os.path.normpath(dirname))
 
     print(f'Creating patch images for: {basename}')
@@ -60,6 +125,8 @@ def encode(
         os.path.join(basename, 'IMAGES'),
         gameres.rooms,
         gameres.game.version,
+        strip_jobs=strip_jobs,
+        optimize=optimize,
     ):
         res_path = os.path.join(dirname, path)
         os.makedirs(os.path.dirname(res_path), exist_ok=True)
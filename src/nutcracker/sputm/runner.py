@@ -1,29 +1,15 @@
-import glob
 import os
+from collections import Counter
+from enum import Enum
 from pathlib import Path
 
 import typer
 
-from nutcracker.sputm.build import rebuild_resources, update_element
-from nutcracker.sputm.char.decode import decode_all_fonts, get_chars
-from nutcracker.sputm.char.encode import encode_char
-from nutcracker.sputm.schema import SCHEMA
-from nutcracker.sputm.strings import (
-    RAW_ENCODING,
-    get_all_scripts,
-    get_optable,
-    get_script_map,
-    msg_to_print,
-    print_to_msg,
-    update_element_strings,
-)
-from nutcracker.sputm.tree import dump_resources, narrow_schema, open_game_resource
-from nutcracker.utils.fileio import write_file
-
-from .preset import sputm
 from .room import runner as room_image
 from .windex import runner as script_windex
 
+# heavy modules are imported by each command, to keep startup of CLI fast
+
 app = typer.Typer()
 app.add_typer(room_image.app, name='room')
 app.add_typer(script_windex.app, name='script')
@@ -31,27 +17,64 @@ app.add_typer(script_windex.app, name='script')
 # ## RESOURCE
 
 
+class OutputFormat(str, Enum):
+    DIR = 'dir'
+    PACK = 'pack'
+
+
 @app.command()
 def extract(
     filename: Path = typer.Argument(..., help='Game resource index file'),
+    no_cache: bool = typer.Option(
+        False,
+        '--no-cache',
+        help='Do not use resource index cache',
+    ),
+    jobs: int = typer.Option(1, '--jobs', '-j', help='Number of worker processes'),
+    fmt: OutputFormat = typer.Option(
+        OutputFormat.DIR,
+        '--format',
+        help='Save resources to directory tree or to single pack file',
+    ),
+    xml: bool = typer.Option(
+        True,
+        '--xml/--no-xml',
+        help='Render resource tree to rpdump.xml',
+    ),
 ) -> None:
-    gameres = open_game_resource(filename)
+    from nutcracker.sputm.tree import dump_pack, dump_resources, open_game_resource
+    from nutcracker.utils.pack import PACK_EXT
+
+    gameres = open_game_resource(filename, use_cache=not no_cache)
     basename = gameres.basename
     print(f'Extracting game resources: {basename}')
-    dump_resources(gameres, basename)
+    if fmt == OutputFormat.PACK:
+        dump_pack(gameres, f'{basename}{PACK_EXT}', xml=xml)
+    else:
+        dump_resources(gameres, basename, jobs=jobs, xml=xml)
 
 
 @app.command()
 def build(
-    dirname: Path = typer.Argument(..., help='Patch directory'),
+    dirname: Path = typer.Argument(..., help='Patch directory or pack file'),
     ref: Path = typer.Option(..., '--ref', help='Reference resource index'),
+    no_cache: bool = typer.Option(
+        False,
+        '--no-cache',
+        help='Do not use resource index cache',
+    ),
 ) -> None:
-    gameres = open_game_resource(ref)
+    from nutcracker.sputm.build import open_patch, rebuild_resources, update_element
+    from nutcracker.sputm.tree import open_game_resource
+    from nutcracker.utils.pack import PACK_EXT
+
+    gameres = open_game_resource(ref, use_cache=not no_cache)
     basename = os.path.basename(os.path.normpath(dirname))
+    if basename.endswith(PACK_EXT):
+        basename = basename.removesuffix(PACK_EXT)
     print(f'Rebuilding game resources: {basename}')
 
-    files = set(glob.iglob(f'{dirname}/**/*', recursive=True))
-    assert None not in files
+    patch = open_patch(dirname)
 
     root = gameres.read_resources(
         # schema=narrow_schema(
@@ -59,8 +82,59 @@ def build(
         # )
     )
 
-    updated_resource = list(update_element(dirname, root, files))
-    rebuild_resources(gameres, basename, updated_resource)
+    origins: dict[str, int] = {}
+    updated_resource = list(update_element(patch, root, origins))
+    rebuild_resources(gameres, basename, updated_resource, origins)
+
+
+@app.command()
+def diff(
+    old: Path = typer.Argument(..., help='Reference resource index'),
+    new: Path = typer.Argument(..., help='Compared resource index'),
+    no_cache: bool = typer.Option(
+        False,
+        '--no-cache',
+        help='Do not use resource index cache',
+    ),
+) -> None:
+    from nutcracker.sputm.diff import Change, diff_games
+    from nutcracker.sputm.tree import open_game_resource
+
+    old_res = open_game_resource(old, use_cache=not no_cache)
+    new_res = open_game_resource(new, use_cache=not no_cache)
+    print(f'Comparing game resources: {old_res.basename} {new_res.basename}')
+    changes: Counter[Change] = Counter()
+    for change, path in diff_games(old_res, new_res):
+        print(change.value, path)
+        changes[change] += 1
+    print(', '.join(f'{change.name.lower()}: {changes[change]}' for change in Change))
+    if changes:
+        raise typer.Exit(1)
+
+
+@app.command('cache_build')
+def build_cache(
+    filename: Path = typer.Argument(..., help='Game resource index file'),
+) -> None:
+    from nutcracker.sputm.cache import cache_path, clear_index_cache
+    from nutcracker.sputm.tree import open_game_resource
+
+    clear_index_cache(filename)
+    gameres = open_game_resource(filename, use_cache=True)
+    if gameres.cache:
+        print(f'Saved resource index cache: {cache_path(filename)}')
+
+
+@app.command('cache_clear')
+def clear_cache(
+    filename: Path = typer.Argument(..., help='Game resource index file'),
+) -> None:
+    from nutcracker.sputm.cache import cache_path, clear_index_cache
+
+    if clear_index_cache(filename):
+        print(f'Removed resource index cache: {cache_path(filename)}')
+    else:
+        print(f'No resource index cache found: {cache_path(filename)}')
 
 
 # ## STRINGS
@@ -75,8 +149,23 @@ def extract_strings(
         '-t',
         help='save strings to file',
     ),
+    no_cache: bool = typer.Option(
+        False,
+        '--no-cache',
+        help='Do not use resource index cache',
+    ),
 ) -> None:
-    gameres = open_game_resource(filename)
+    from nutcracker.sputm.schema import SCHEMA
+    from nutcracker.sputm.strings import (
+        RAW_ENCODING,
+        get_all_scripts,
+        get_optable,
+        get_script_map,
+        msg_to_print,
+    )
+    from nutcracker.sputm.tree import narrow_schema, open_game_resource
+
+    gameres = open_game_resource(filename, use_cache=not no_cache)
     basename = os.path.basename(os.path.normpath(filename))
     print(f'Extracting strings from game resources: {basename}')
 
@@ -106,8 +195,24 @@ def inject_strings(
         '-t',
         help='save strings to file',
     ),
+    no_cache: bool = typer.Option(
+        False,
+        '--no-cache',
+        help='Do not use resource index cache',
+    ),
 ) -> None:
-    gameres = open_game_resource(filename)
+    from nutcracker.sputm.build import rebuild_resources
+    from nutcracker.sputm.schema import SCHEMA
+    from nutcracker.sputm.strings import (
+        RAW_ENCODING,
+        get_optable,
+        get_script_map,
+        print_to_msg,
+        update_element_strings,
+    )
+    from nutcracker.sputm.tree import narrow_schema, open_game_resource
+
+    gameres = open_game_resource(filename, use_cache=not no_cache)
     basename = gameres.basename
     print(f'Injecting strings into game resources: {basename}')
 
@@ -136,13 +241,23 @@ def inject_strings(
 @app.command('fonts_extract')
 def extract_fonts(
     filename: Path = typer.Argument(..., help='Game resource index file'),
+    no_cache: bool = typer.Option(
+        False,
+        '--no-cache',
+        help='Do not use resource index cache',
+    ),
 ) -> None:
-    gameres = open_game_resource(filename)
+    from nutcracker.kernel2.query import query_schema
+    from nutcracker.sputm.char.decode import CHAR_QUERIES, decode_all_fonts
+    from nutcracker.sputm.schema import SCHEMA
+    from nutcracker.sputm.tree import open_game_resource
+
+    gameres = open_game_resource(filename, use_cache=not no_cache)
     basename = gameres.basename
     print(f'Extracting fonts from game resources: {basename}')
 
     root = gameres.read_resources(
-        schema=narrow_schema(SCHEMA, {'LECF', 'LFLF', 'CHAR'}),
+        schema=query_schema(SCHEMA, CHAR_QUERIES),
     )
 
     outdir = os.path.join(basename, 'chars')
@@ -157,13 +272,26 @@ def extract_fonts(
 def inject_fonts(
     dirname: Path = typer.Argument(..., help='Patch directory'),
     ref: Path = typer.Option(..., '--ref', help='Reference resource index'),
+    no_cache: bool = typer.Option(
+        False,
+        '--no-cache',
+        help='Do not use resource index cache',
+    ),
 ) -> None:
-    gameres = open_game_resource(ref)
+    from nutcracker.kernel2.query import query_schema
+    from nutcracker.sputm.char.decode import CHAR_QUERIES, get_chars
+    from nutcracker.sputm.char.encode import encode_char
+    from nutcracker.sputm.preset import sputm
+    from nutcracker.sputm.schema import SCHEMA
+    from nutcracker.sputm.tree import open_game_resource
+    from nutcracker.utils.fileio import write_file
+
+    gameres = open_game_resource(ref, use_cache=not no_cache)
     basename = os.path.basename(os.path.normpath(dirname))
     print(f'Creating path for game fonts: {basename}')
 
     root = gameres.read_resources(
-        schema=narrow_schema(SCHEMA, {'LECF', 'LFLF', 'CHAR'}),
+        schema=query_schema(SCHEMA, CHAR_QUERIES),
     )
 
     base = os.path.join(dirname, 'chars')
@@ -92,10 +92,8 @@ def update_element_strings(
     opcodes: OpTable,
     script_map: Mapping[str, Callable[[bytes], tuple[bytes, bytes]]],
 ) -> Iterator[Element]:
-    offset = 0
     strings = iter(strings)
     for elem in root:
-        elem.attribs['offset'] = offset
         if elem.tag in {'OBNA', 'TEXT'} and elem.data != b'\x00':
             elem.update_raw(next(strings) + b'\x00')
         elif elem.tag in {'LECF', 'LFLF', 'RMDA', 'ROOM', 'OBCD', 'TLKE', *script_map}:
@@ -121,8 +119,6 @@ def update_element_strings(
                         script_map,
                     )
                 )
-        offset += len(elem.data) + 8
-        elem.attribs['size'] = len(elem.data)
         yield elem
 
 
@@ -1,16 +1,30 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import struct
-from collections.abc import Callable, Container, Iterator, Mapping
-from dataclasses import dataclass
-from typing import Any
+from collections.abc import Callable, Container, Iterable, Iterator, Mapping
+from dataclasses import dataclass, replace
+from typing import IO, Any
 
-from nutcracker.kernel2.chunk import Chunk
-from nutcracker.kernel2.element import Element
+from nutcracker.kernel2.element import Element, ExtraFunc
 from nutcracker.kernel2.fileio import ResourceFile
 from nutcracker.kernel2.preset import Preset
-
+from nutcracker.kernel2.query import query_schema, select_many
+from nutcracker.kernel2.table import ElementTable
+from nutcracker.kernel2.tree import dump_tree
+from nutcracker.utils.fileio import FileWriter
+from nutcracker.utils.pack import PackWriter
+
+from .cache import (
+    IndexCache,
+    cache_path,
+    create_index_cache,
+    load_index_cache,
+    restore_game_resources,
+    save_index_cache,
+    schema_cache_path,
+)
 from .index import (
     IdGen,
     compare_pid_off,
@@ -20,12 +34,15 @@ from .index import (
     read_index_v7,
     read_index_v8,
 )
-from .preset import sputm
+from .parallel import map_disks
+from .preset import schemas, sputm
 from .resource import Game, load_resource
 from .schema import SCHEMA
 
 UINT32LE = struct.Struct('<I')
 
+TREE_FILE = 'rptree.npz'
+
 
 @dataclass(frozen=True)
 class GameResourceConfig:
@@ -34,12 +51,32 @@ class GameResourceConfig:
     base_fix: int = 0
 
 
+@dataclass(frozen=True)
+class GameSource:
+    """Arguments the game resource was opened with, to open it in workers."""
+
+    filename: str
+    version: tuple[int, int] | None = None
+    chiper_key: int | None = None
+    use_cache: bool = False
+
+    def open(self) -> 'GameResource':
+        return open_game_resource(
+            self.filename,
+            self.version,
+            self.chiper_key,
+            use_cache=self.use_cache,
+        )
+
+
 @dataclass(frozen=True)
 class GameResource:
     game: Game
     config: GameResourceConfig
     rooms: Mapping[int, str]
     idgens: Any
+    cache: IndexCache | None = None
+    source: GameSource | None = None
 
     @property
     def basename(self) -> str:
@@ -47,37 +84,151 @@ class GameResource:
 
     @property
     def root(self) -> Iterator[Element]:
-        return read_game_resources(self.game, self.config, self.idgens)
+        return self.read_resources()
 
-    def read_resources(self, **kwargs: Any) -> Iterator[Element]:
+    @property
+    def num_disks(self) -> int:
+        return len(self.game.disks) - 1
+
+    def read_resources(
+        self, *, table: bool = False, **kwargs: Any
+    ) -> Iterator[Element]:
+        if self.cache:
+            return restore_game_resources(self.cache, self.game, table=table, **kwargs)
+        if table:
+            return (
+                elem
+                for disk in read_game_tables(
+                    self.game, self.config, self.idgens, **kwargs
+                )
+                for elem in disk
+            )
         return read_game_resources(self.game, self.config, self.idgens, **kwargs)
 
+    def read_disk(
+        self, disk_index: int, *, table: bool = False, **kwargs: Any
+    ) -> Iterator[Element]:
+        """Map single disk only, disks are indexed independently."""
+        return self.read_resources(table=table, disk_index=disk_index, **kwargs)
+
+    def select(
+        self,
+        *exprs: str,
+        schema: dict[str, set[str]] = SCHEMA,
+        **kwargs: Any,
+    ) -> Iterator[tuple[int, Element]]:
+        """Evaluate path expressions in a single pass over all disks."""
+        root = self.read_resources(schema=query_schema(schema, exprs), **kwargs)
+        return select_many(exprs, root)
+
 
 def save_tree(
     cfg: Preset,
     element: Element | None,
     basedir: str | os.PathLike[str] = '.',
+    writer: FileWriter | PackWriter | None = None,
 ) -> None:
     if not element:
         return
-    print(element, element.attribs)
+    if writer is None:
+        with FileWriter() as writer:
+            save_tree(cfg, element, basedir, writer)
+        return
     path = os.path.join(basedir, element.attribs['path'])
     children = list(element.children())
     if children:
-        os.makedirs(path, exist_ok=True)
+        writer.makedirs(path)
         for c in children:
-            save_tree(cfg, c, basedir=basedir)
+            save_tree(cfg, c, basedir, writer)
     else:
-        with open(path, 'wb') as f:
-            f.write(bytes(cfg.mktag(element.tag, element.data)))
+        writer.write(path, bytes(cfg.mktag(element.tag, element.data)))
+
+
+def create_path_extra(
+    config: GameResourceConfig,
+    idgens: dict[str, IdGen],
+    didx: int,
+) -> ExtraFunc:
+    paths: set[str] = set()
+    wraps: dict[str, dict[int, int]] = {}
+
+    def update_element_path(
+        parent: Element | None,
+        elem: Element,
+        offset: int,
+    ) -> dict[str, Any]:
+        if elem.tag == 'LOFF':
+            # should not happen in HE games
+
+            offs = dict(read_directory(elem.data))
+
+            # # to ignore cloned rooms
+            # droo = idgens['LFLF']
+            # droo = {k: v for k, v  in droo.items() if v == (didx + 1, 0)}
+            # droo = {k: (disk, offs[k]) for k, (disk, _)  in droo.items()}
+
+            droo = {k: (didx + 1, v) for k, v in offs.items()}
+            idgens['LFLF'] = compare_pid_off(droo, 16 - config.base_fix)
+
+        get_gid = idgens.get(elem.tag)
+        gid: int | None
+        if not parent:
+            gid = didx + 1
+        elif parent.attribs['path'] in wraps:
+            gid = wraps[parent.attribs['path']].get(offset)
+        else:
+            gid = get_gid and get_gid(
+                parent and parent.attribs['gid'],
+                elem.data,
+                offset,
+            )
+
+        base = elem.tag + (
+            f'_{gid:04d}'
+            if gid is not None
+            else ''
+            if not get_gid
+            else f'_o_{offset:04X}'
+        )
+
+        dirname = parent.attribs['path'] if parent else ''
+        path = os.path.join(dirname, base)
+
+        if path in paths:
+            path += 'd'
+        # assert path not in paths, path
+        paths.add(path)
+
+        if elem.tag == 'WRAP':
+            _, offs = sputm.untag(elem.data)
+            size = len(offs.data) // 4
+            offs = dict(
+                zip(
+                    struct.unpack(f'<{size}I', offs.data),
+                    range(1, size + 1),
+                    strict=True,
+                ),
+            )
+            wraps[path] = offs
+
+        res = {'path': path, 'gid': gid}
+        return res
+
+    return update_element_path
 
 
 def read_game_resources(
-    game: Game, config: GameResourceConfig, idgens: dict[str, IdGen], **kwargs: Any
+    game: Game,
+    config: GameResourceConfig,
+    idgens: dict[str, IdGen],
+    disk_index: int | None = None,
+    **kwargs: Any,
 ) -> Iterator[Element]:
     _, *disks = game.disks
 
     for didx, disk in enumerate(disks):
+        if disk_index is not None and didx != disk_index:
+            continue
         with ResourceFile.load(
             os.path.join(game.basedir, disk), key=game.chiper_key
         ) as resource:
@@ -87,73 +238,28 @@ def read_game_resources(
             # pprint.pprint(s)
             # root = sputm.map_chunks(resource, idgen=idgens, schema=s)
 
-            paths: dict[str, Chunk] = {}
-            wraps: dict[str, dict[int, int]] = {}
-
-            def update_element_path(
-                parent: Element | None,
-                chunk: Chunk,
-                offset: int,
-            ) -> dict[str, Any]:
-                if chunk.tag == 'LOFF':
-                    # should not happen in HE games
-
-                    offs = dict(read_directory(chunk.data))
-
-                    # # to ignore cloned rooms
-                    # droo = idgens['LFLF']
-                    # droo = {k: v for k, v  in droo.items() if v == (didx + 1, 0)}
-                    # droo = {k: (disk, offs[k]) for k, (disk, _)  in droo.items()}
-
-                    droo = {k: (didx + 1, v) for k, v in offs.items()}
-                    idgens['LFLF'] = compare_pid_off(droo, 16 - config.base_fix)
-
-                get_gid = idgens.get(chunk.tag)
-                gid: int | None
-                if not parent:
-                    gid = didx + 1
-                elif parent.attribs['path'] in wraps:
-                    gid = wraps[parent.attribs['path']].get(offset)
-                else:
-                    gid = get_gid and get_gid(
-                        parent and parent.attribs['gid'],
-                        chunk.data,
-                        offset,
-                    )
-
-                base = chunk.tag + (
-                    f'_{gid:04d}'
-                    if gid is not None
-                    else ''
-                    if not get_gid
-                    else f'_o_{offset:04X}'
-                )
-
-                dirname = parent.attribs['path'] if parent else ''
-                path = os.path.join(dirname, base)
+            extra = create_path_extra(config, idgens, didx)
+            yield from sputm(**kwargs, extra=extra).map_chunks(resource)
 
-                if path in paths:
-                    path += 'd'
-                # assert path not in paths, path
-                paths[path] = chunk
 
-                if chunk.tag == 'WRAP':
-                    _, offs = sputm.untag(chunk.data)
-                    size = len(offs.data) // 4
-                    offs = dict(
-                        zip(
-                            struct.unpack(f'<{size}I', offs.data),
-                            range(1, size + 1),
-                            strict=True,
-                        ),
-                    )
-                    wraps[path] = offs
-
-                res = {'path': path, 'gid': gid}
-                return res
+def read_game_tables(
+    game: Game,
+    config: GameResourceConfig,
+    idgens: dict[str, IdGen],
+    disk_index: int | None = None,
+    **kwargs: Any,
+) -> Iterator[ElementTable]:
+    _, *disks = game.disks
 
-            # yield from sputm(**kwargs).map_chunks(resource, extra=update_element_path)
-            yield from sputm(**kwargs, extra=update_element_path).map_chunks(resource)
+    for didx, disk in enumerate(disks):
+        if disk_index is not None and didx != disk_index:
+            continue
+        with ResourceFile.load(
+            os.path.join(game.basedir, disk), key=game.chiper_key
+        ) as resource:
+            extra = create_path_extra(config, idgens, didx)
+            cfg = sputm(**kwargs, extra=extra)
+            yield ElementTable.from_buffer(cfg, resource[:])
 
 
 def create_config(game: Game) -> GameResourceConfig:
@@ -189,8 +295,18 @@ def open_game_resource(
     filename: str | os.PathLike[str],
     version: tuple[int, int] | None = None,
     chiper_key: int | None = None,
+    *,
+    use_cache: bool = False,
 ) -> GameResource:
-    game = load_resource(filename, chiper_key=chiper_key)
+    cache = load_index_cache(filename) if use_cache else None
+    if use_cache:
+        # schemas inferred for this game are kept next to index cache
+        schemas.attach(schema_cache_path(filename))
+    game = load_resource(
+        filename,
+        chiper_key=chiper_key,
+        schema=cache.index_schema if cache else None,
+    )
 
     if version:
         game.version, game.he_version = version
@@ -198,24 +314,31 @@ def open_game_resource(
 
     rooms, idgens = config.read_index(game.index)
 
-    return GameResource(game, config, rooms, idgens)
+    if use_cache and not (cache and cache.matches(game)):
+        cache = build_index_cache(filename, game, config, idgens)
 
+    source = GameSource(os.fspath(filename), version, chiper_key, use_cache=use_cache)
+    return GameResource(game, config, rooms, idgens, cache, source)
 
-def dump_resources(
-    gameres: GameResource,
-    basename: str,
-    schema: Mapping[str, set] | None = None,
-) -> None:
-    schema = schema or narrow_schema(
-        SCHEMA,
-        {'LECF', 'LFLF', 'RMDA', 'ROOM'},
-    )
-    os.makedirs(basename, exist_ok=True)
-    root = gameres.read_resources(schema=schema)
-    with open(os.path.join(basename, 'rpdump.xml'), 'w') as f:
-        for disk in root:
-            sputm.render(disk, stream=f)
-            save_tree(sputm, disk, basedir=basename)
+
+def build_index_cache(
+    filename: str | os.PathLike[str],
+    game: Game,
+    config: GameResourceConfig,
+    idgens: dict[str, IdGen],
+) -> IndexCache | None:
+    print(f'Building resource index cache: {cache_path(filename)}')
+    tables = read_game_tables(game, config, idgens, schema=SCHEMA)
+    try:
+        cache = create_index_cache(filename, game, tables, SCHEMA)
+    except (OSError, ValueError) as exc:
+        print(f'Could not index game resources, cache is disabled: {exc}')
+        return None
+    try:
+        save_index_cache(cache_path(filename), cache)
+    except (OSError, ValueError) as exc:
+        print(f'Could not save resource index cache: {exc}')
+    return cache
 
 
 def narrow_schema(
@@ -227,3 +350,94 @@ def narrow_schema(
         if container not in trail:
             new_schema[container] = set()
     return new_schema
+
+
+DUMP_SCHEMA = narrow_schema(SCHEMA, {'LECF', 'LFLF', 'RMDA', 'ROOM'})
+
+
+def dump_resources(
+    gameres: GameResource,
+    basename: str,
+    schema: Mapping[str, set] | None = None,
+    *,
+    jobs: int = 1,
+    xml: bool = True,
+) -> None:
+    """Save resources to directory tree.
+
+    Element tree is saved as `TREE_FILE`, `rpdump.xml` is rendered from it.
+    """
+    schema = schema or DUMP_SCHEMA
+    os.makedirs(basename, exist_ok=True)
+    disks = list(gameres.read_resources(schema=schema, table=True))
+    table = dump_tree(os.path.join(basename, TREE_FILE), disks, dict(schema))
+    if xml:
+        with open(os.path.join(basename, 'rpdump.xml'), 'w') as f:
+            render_table(table, stream=f)
+    written, skipped = 0, 0
+    for disk in disks:
+        if jobs > 1:
+            # children are saved by workers
+            os.makedirs(os.path.join(basename, disk.attribs['path']), exist_ok=True)
+            continue
+        with FileWriter() as writer:
+            save_tree(sputm, disk, basename, writer)
+        written += writer.written
+        skipped += writer.skipped
+    if jobs > 1:
+        for disk in map_disks(
+            gameres,
+            _disk_children,
+            _save_child,
+            basename,
+            jobs=jobs,
+            schema=schema,
+            table=True,
+        ):
+            written += sum(count for count, _ in disk)
+            skipped += sum(count for _, count in disk)
+    print(f'Saved {written} files, {skipped} unchanged files skipped')
+
+
+def dump_pack(
+    gameres: GameResource,
+    filename: str,
+    schema: Mapping[str, set] | None = None,
+    *,
+    xml: bool = True,
+) -> None:
+    """Save resources to single pack file, including element tree."""
+    schema = schema or DUMP_SCHEMA
+    disks = list(gameres.read_resources(schema=schema, table=True))
+    with PackWriter(filename) as writer:
+        with io.BytesIO() as stream:
+            table = dump_tree(stream, disks, dict(schema))
+            writer.write(TREE_FILE, stream.getvalue())
+        if xml:
+            with io.StringIO() as rpdump:
+                render_table(table, stream=rpdump)
+                writer.write('rpdump.xml', rpdump.getvalue().encode())
+        for disk in disks:
+            save_tree(sputm, disk, '', writer)
+    print(f'Saved {writer.written} files to {filename}')
+
+
+def render_table(table: ElementTable, stream: IO[str]) -> None:
+    """Render element tree loaded by `load_tree` as XML."""
+    for elem in replace(table, cfg=sputm(schema=table.schema)):
+        sputm.render(elem, stream=stream)
+
+
+def _disk_children(root: Iterable[Element]) -> Iterator[Element]:
+    for disk in root:
+        yield from disk.children()
+
+
+def _save_child(
+    gameres: GameResource,
+    elem: Element,
+    basedir: str,
+) -> tuple[int, int]:
+    with FileWriter() as writer:
+        save_tree(sputm, elem, basedir, writer)
+    return writer.written, writer.skipped
@@ -1,17 +1,16 @@
 import functools
 import os
+from collections.abc import Iterable, Iterator
 from enum import Enum
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
 
-from .. import windex_v5, windex_v6
-from ..preset import sputm
-from ..schema import SCHEMA
-from ..script.bytecode import script_map
-from ..strings import RAW_ENCODING
-from ..tree import narrow_schema, open_game_resource
-from .scu import dump_script_file
+if TYPE_CHECKING:
+    from nutcracker.kernel2.element import Element
+
+    from ..tree import GameResource
 
 app = typer.Typer()
 
@@ -39,6 +38,51 @@ Version = Enum(  # type: ignore[misc]
 )
 
 
+def _disk_rooms(root: Iterable['Element']) -> Iterator['Element']:
+    from ..preset import sputm
+
+    for disk in root:
+        yield from sputm.findall('LFLF', disk)
+
+
+def _decompile_room(
+    gameres: 'GameResource',
+    room: 'Element',
+    script_dir: str,
+    *,
+    verbose: bool,
+    transform: bool,
+) -> None:
+    from .. import windex_v5, windex_v6
+    from ..strings import RAW_ENCODING
+    from .scu import dump_script_file
+
+    if gameres.game.version >= 6:
+        decompile = functools.partial(
+            windex_v6.decompile_script,
+            game=gameres.game,
+            verbose=verbose,
+            transform=transform,
+        )
+    elif gameres.game.version >= 5:
+        decompile = functools.partial(
+            windex_v5.decompile_script,
+            transform=transform,
+        )
+
+    rnam = gameres.rooms
+    room_no = rnam.get(room.attribs['gid'], f"room_{room.attribs['gid']}")
+    print(
+        '==========================',
+        room.attribs['path'],
+        room_no,
+    )
+    fname = f"{script_dir}/{room.attribs['gid']:04d}_{room_no}.scu"
+
+    with open(fname, 'w', **RAW_ENCODING) as script_file:
+        dump_script_file(room_no, room, decompile, script_file)
+
+
 @app.command('decompile')
 def decompile(
     filename: Path = typer.Argument(..., help='Game resource index file'),
@@ -60,21 +104,26 @@ def decompile(
         '--skip-transform',
         help='Disable structure simplification',
     ),
+    no_cache: bool = typer.Option(
+        False,
+        '--no-cache',
+        help='Do not use resource index cache',
+    ),
+    jobs: int = typer.Option(1, '--jobs', '-j', help='Number of worker processes'),
 ) -> None:
+    from ..parallel import map_disks
+    from ..schema import SCHEMA
+    from ..script.bytecode import script_map
+    from ..tree import narrow_schema, open_game_resource
+
     gameres = open_game_resource(
         filename,
         SUPPORTED_VERSION.get(gver.name) if gver else None,
         int(chiper_key, 16) if chiper_key else None,
+        use_cache=not no_cache,
     )
     basename = gameres.basename
 
-    root = gameres.read_resources(
-        schema=narrow_schema(
-            SCHEMA,
-            {'LECF', 'LFLF', 'RMDA', 'ROOM', 'OBCD', *script_map},
-        ),
-    )
-
     rnam = gameres.rooms
     print(gameres.game)
     print(rnam)
@@ -82,31 +131,20 @@ def decompile(
     script_dir = os.path.join('scripts', basename)
     os.makedirs(script_dir, exist_ok=True)
 
-    if gameres.game.version >= 6:
-        decompile = functools.partial(
-            windex_v6.decompile_script,
-            game=gameres.game,
-            verbose=verbose,
-            transform=not skip_transform,
-        )
-    elif gameres.game.version >= 5:
-        decompile = functools.partial(
-            windex_v5.decompile_script,
-            transform=not skip_transform,
-        )
-
-    for disk in root:
-        for room in sputm.findall('LFLF', disk):
-            room_no = rnam.get(room.attribs['gid'], f"room_{room.attribs['gid']}")
-            print(
-                '==========================',
-                room.attribs['path'],
-                room_no,
-            )
-            fname = f"{script_dir}/{room.attribs['gid']:04d}_{room_no}.scu"
-
-            with open(fname, 'w', **RAW_ENCODING) as script_file:
-                dump_script_file(room_no, room, decompile, script_file)
+    for _ in map_disks(
+        gameres,
+        _disk_rooms,
+        functools.partial(
+            _decompile_room, verbose=verbose, transform=not skip_transform
+        ),
+        script_dir,
+        jobs=jobs,
+        schema=narrow_schema(
+            SCHEMA,
+            {'LECF', 'LFLF', 'RMDA', 'ROOM', 'OBCD', *script_map},
+        ),
+    ):
+        pass
 
 
 if __name__ == '__main__':
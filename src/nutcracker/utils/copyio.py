@@ -1,10 +1,61 @@
 import functools
-import io
+import os
 from collections.abc import Callable, Iterator
+from typing import IO
+
+BLOCK_SIZE = 1 << 20
 
 
 def buffered(
     source: Callable[[int | None], bytes],
-    buffer_size: int = io.DEFAULT_BUFFER_SIZE,
+    buffer_size: int = BLOCK_SIZE,
 ) -> Iterator[bytes]:
     return iter(functools.partial(source, buffer_size), b'')
+
+
+def blocks(
+    data: bytes | memoryview, block_size: int = BLOCK_SIZE
+) -> Iterator[memoryview]:
+    view = memoryview(data).cast('B')
+    for offset in range(0, len(view), block_size):
+        yield view[offset : offset + block_size]
+
+
+def write_all(stream: IO[bytes], data: bytes | memoryview) -> int:
+    """Write whole data, unbuffered streams may take only part of it at once."""
+    view = memoryview(data).cast('B')
+    written = 0
+    while written < len(view):
+        size = stream.write(view[written:])
+        if not size:
+            raise OSError(f'Could not write to {stream!r}')  # noqa: TRY003
+        written += size
+    return written
+
+
+def copy_range(src: int, dst: int, offset: int, count: int) -> int:
+    """Copy byte range of src file to current position of dst file descriptor.
+
+    Copy is done by the kernel where possible.
+    """
+    copied = 0
+    try:
+        while copied < count:
+            size = os.copy_file_range(src, dst, count - copied, offset + copied)
+            if not size:
+                break
+            copied += size
+    except (AttributeError, OSError):
+        try:
+            while copied < count:
+                size = os.sendfile(dst, src, offset + copied, count - copied)
+                if not size:
+                    break
+                copied += size
+        except (AttributeError, OSError):
+            while copied < count:
+                data = os.pread(src, min(count - copied, BLOCK_SIZE), offset + copied)
+                if not data:
+                    break
+                copied += os.write(dst, data)
+    return copied
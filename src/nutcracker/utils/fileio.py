@@ -1,11 +1,108 @@
-__all__ = ('read_file', 'write_file')
+__all__ = ('FileWriter', 'read_file', 'replace_file', 'write_file')
 
+import hashlib
+import os
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from types import TracebackType
+from typing import TYPE_CHECKING, BinaryIO
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
 
 from nutcracker.chiper import xor
 from nutcracker.kernel2.fileio import read_file
 
+MAX_PENDING = 1024
+
 
 def write_file(path: str, data: bytes, key: int = 0x00) -> int:
     with Path(path).open('wb') as res:
         return xor.write(res, data, key=key)
+
+
+@contextmanager
+def replace_file(path: str | os.PathLike[str]) -> Iterator[BinaryIO]:
+    """Write unbuffered to temporary file which replaces path once done.
+
+    Previous file can still be read while writing, also when mapped to memory.
+    """
+    path = Path(path)
+    temp = path.with_name(f'.{path.name}.tmp')
+    try:
+        with temp.open('wb', buffering=0) as f:
+            yield f
+        temp.replace(path)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data).digest()
+
+
+def write_if_changed(path: str | os.PathLike[str], data: bytes) -> bool:
+    """Write file unless it already has same content, returns whether written."""
+    path = Path(path)
+    try:
+        if path.stat().st_size == len(data):
+            with path.open('rb') as f:
+                if hashlib.file_digest(f, 'blake2b').digest() == _digest(data):
+                    return False
+    except OSError:
+        pass
+    with path.open('wb') as f:
+        f.write(data)
+    return True
+
+
+class FileWriter:
+    """Write files in background threads, skipping files with same content.
+
+    Directories should be created before files are written to them.
+    """
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending: list[Future[bool]] = []
+        self.written = 0
+        self.skipped = 0
+
+    def makedirs(self, path: str | os.PathLike[str]) -> None:
+        Path(path).mkdir(parents=True, exist_ok=True)
+
+    def write(self, path: str | os.PathLike[str], data: bytes) -> None:
+        self._pending.append(self._executor.submit(write_if_changed, path, data))
+        if len(self._pending) >= MAX_PENDING:
+            # limit memory held by payloads waiting to be written
+            self._collect(len(self._pending) // 2)
+
+    def _collect(self, count: int) -> None:
+        done, self._pending = self._pending[:count], self._pending[count:]
+        for future in done:
+            if future.result():
+                self.written += 1
+            else:
+                self.skipped += 1
+
+    def close(self) -> None:
+        try:
+            self._collect(len(self._pending))
+        finally:
+            self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> 'FileWriter':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        if exc_type is not None:
+            self._pending.clear()
+        self.close()
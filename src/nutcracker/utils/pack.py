@@ -0,0 +1,207 @@
+__all__ = ('PACK_EXT', 'PackFile', 'PackWriter', 'patch_pack')
+
+import hashlib
+import os
+import struct
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from types import TracebackType
+from typing import IO
+
+import numpy as np
+from numpy.typing import NDArray
+
+PACK_EXT = '.nutpack'
+PACK_MAGIC = b'NUTPACK\0'
+PACK_VERSION = 1
+PACK_ALIGN = 16
+HASH_SIZE = 16
+
+# magic, version, number of entries, index offset, names offset, names size
+PACK_HEADER = struct.Struct('<8sIIQQQ')
+
+PACK_INDEX_DTYPE = np.dtype(
+    [
+        ('name', '<u8'),  # offset in names block
+        ('name_size', '<u4'),
+        ('offset', '<u8'),  # offset of payload in pack
+        ('size', '<u8'),
+        ('hash', f'V{HASH_SIZE}'),
+    ],
+)
+
+
+def _align(offset: int) -> int:
+    return -offset % PACK_ALIGN
+
+
+def digest(data: bytes | memoryview) -> bytes:
+    return hashlib.blake2b(data, digest_size=HASH_SIZE).digest()
+
+
+def _write_index(
+    stream: IO[bytes],
+    offset: int,
+    names: list[str],
+    index: NDArray[np.void],
+) -> None:
+    """Write index and names at offset, then update header."""
+    encoded = [name.encode('utf-8') for name in names]
+    sizes = np.array([len(name) for name in encoded], dtype='<u8')
+    index['name'] = np.cumsum(sizes) - sizes
+    index['name_size'] = sizes
+    names_offset = offset + index.nbytes
+    stream.seek(offset)
+    stream.write(index.tobytes())
+    stream.write(b''.join(encoded))
+    stream.truncate()
+    stream.seek(0)
+    stream.write(
+        PACK_HEADER.pack(
+            PACK_MAGIC,
+            PACK_VERSION,
+            len(index),
+            offset,
+            names_offset,
+            int(sizes.sum()),
+        ),
+    )
+
+
+class PackWriter:
+    """Write files to single pack file with index, payloads are aligned.
+
+    Payloads are written as they come, index is written on close.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self._stream = Path(path).open('wb')  # noqa: SIM115
+        self._stream.write(bytes(PACK_HEADER.size + _align(PACK_HEADER.size)))
+        self._entries: list[tuple[int, int, int, int, bytes]] = []
+        self._names: list[str] = []
+        self.written = 0
+        self.skipped = 0
+
+    def makedirs(self, path: str | os.PathLike[str]) -> None:
+        pass
+
+    def write(self, path: str | os.PathLike[str], data: bytes) -> None:
+        offset = self._stream.tell()
+        self._stream.write(data)
+        self._stream.write(bytes(_align(len(data))))
+        self._names.append(Path(path).as_posix())
+        self._entries.append((0, 0, offset, len(data), digest(data)))
+        self.written += 1
+
+    def close(self) -> None:
+        if self._stream.closed:
+            return
+        with self._stream:
+            index = np.array(self._entries, dtype=PACK_INDEX_DTYPE)
+            _write_index(self._stream, self._stream.tell(), self._names, index)
+
+    def __enter__(self) -> 'PackWriter':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class PackFile:
+    """Memory mapped pack file, payloads are read without copying."""
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = path
+        self.buffer = np.memmap(path, dtype='u1', mode='r')
+        magic, version, count, index_offset, names_offset, names_size = (
+            PACK_HEADER.unpack_from(self.buffer)
+        )
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f'{path} is not a supported pack file')  # noqa: TRY003
+        self.index = np.frombuffer(
+            self.buffer,
+            dtype=PACK_INDEX_DTYPE,
+            count=count,
+            offset=index_offset,
+        )
+        names = bytes(self.buffer[names_offset : names_offset + names_size])
+        self.names = [
+            names[start : start + size].decode('utf-8')
+            for start, size in zip(
+                self.index['name'].tolist(),
+                self.index['name_size'].tolist(),
+                strict=True,
+            )
+        ]
+        self._lookup = {name: idx for idx, name in enumerate(self.names)}
+        self._dirs = {
+            parent.as_posix()
+            for name in self.names
+            for parent in Path(name).parents
+            if parent != Path()
+        }
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __contains__(self, path: object) -> bool:
+        if not isinstance(path, str | os.PathLike):
+            return False
+        name = Path(path).as_posix()
+        return name in self._lookup or name in self._dirs
+
+    def isfile(self, path: str | os.PathLike[str]) -> bool:
+        return Path(path).as_posix() in self._lookup
+
+    def hash(self, path: str | os.PathLike[str]) -> bytes:
+        return bytes(self.index['hash'][self._lookup[Path(path).as_posix()]])
+
+    def read(self, path: str | os.PathLike[str]) -> memoryview:
+        entry = self.index[self._lookup[Path(path).as_posix()]]
+        offset, size = int(entry['offset']), int(entry['size'])
+        return memoryview(self.buffer[offset : offset + size])
+
+
+def patch_pack(path: str | os.PathLike[str], files: Mapping[str, bytes]) -> None:
+    """Replace or add entries of pack file without unpacking it.
+
+    Payloads which fit in space of previous payload are written in place,
+    others are appended after existing payloads.
+    """
+    pack = PackFile(path)
+    index, names = pack.index.copy(), list(pack.names)
+    end = int(PACK_HEADER.unpack_from(pack.buffer)[3])
+    lookup = {name: idx for idx, name in enumerate(names)}
+    del pack
+
+    with Path(path).open('r+b') as stream:
+        added = []
+        for name, data in files.items():
+            key = Path(name).as_posix()
+            idx = lookup.get(key)
+            if idx is not None:
+                size = int(index[idx]['size'])
+                offset = int(index[idx]['offset'])
+                if len(data) > size + _align(size):
+                    offset = end
+                    end += len(data) + _align(len(data))
+            else:
+                offset = end
+                end += len(data) + _align(len(data))
+                names.append(key)
+                added.append((0, 0, offset, len(data), digest(data)))
+            stream.seek(offset)
+            stream.write(data)
+            stream.write(bytes(_align(len(data))))
+            if idx is not None:
+                index[idx] = (0, 0, offset, len(data), digest(data))
+        index = np.concatenate([index, np.array(added, dtype=PACK_INDEX_DTYPE)])
+        _write_index(stream, end, names, index)
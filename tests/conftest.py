@@ -0,0 +1,95 @@
+import struct
+from pathlib import Path
+
+import pytest
+
+CHIPER_KEY = 0x69
+
+
+def mktag(tag: str, data: bytes) -> bytes:
+    return tag.encode('ascii') + struct.pack('>I', len(data) + 8) + data
+
+
+def xor(data: bytes, key: int = CHIPER_KEY) -> bytes:
+    return bytes(b ^ key for b in data)
+
+
+def make_room(room_id: int) -> bytes:
+    objects = b''.join(
+        mktag(
+            'OBCD',
+            mktag('CDHD', struct.pack('<H', 100 * room_id + idx) + bytes(11))
+            + mktag('VERB', b'\x00')
+            + mktag('OBNA', f'obj{room_id}_{idx}'.encode() + b'\x00'),
+        )
+        for idx in range(room_id + 1)
+    )
+    scripts = b''.join(
+        mktag('LSCR', bytes([200 + idx]) + bytes(range(idx + 3))) for idx in range(2)
+    )
+    return mktag(
+        'ROOM',
+        mktag('RMHD', struct.pack('<HHH', 320, 200, room_id + 1))
+        + mktag('BOXD', bytes(20 + room_id))
+        + objects
+        + scripts,
+    )
+
+
+def make_disk(
+    rooms: dict[int, list[int]],
+) -> tuple[bytes, dict[int, tuple[int, int]], dict[int, tuple[int, int]]]:
+    offset = 8 + 8 + 1 + 5 * len(rooms)
+    lflfs, loff, dscr, dsou = [], {}, {}, {}
+    for room_id, scripts in rooms.items():
+        body = make_room(room_id)
+        for script_id in scripts:
+            dscr[script_id] = (room_id, len(body))
+            body += mktag('SCRP', bytes([script_id]) * (10 + script_id))
+        dsou[room_id] = (room_id, len(body))
+        body += mktag('SOUN', bytes(range(40)))
+        loff[room_id] = offset + 8
+        lflfs.append(mktag('LFLF', body))
+        offset += len(lflfs[-1])
+    loff_data = bytes([len(rooms)]) + b''.join(
+        bytes([room_id]) + struct.pack('<I', off) for room_id, off in loff.items()
+    )
+    return mktag('LECF', mktag('LOFF', loff_data) + b''.join(lflfs)), dscr, dsou
+
+
+def make_directory(entries: dict[int, tuple[int, int]], num: int) -> bytes:
+    rooms, offs = zip(*(entries.get(idx, (0, 0)) for idx in range(num)), strict=True)
+    return (
+        struct.pack('<H', num)
+        + bytes(rooms)
+        + b''.join(struct.pack('<I', off) for off in offs)
+    )
+
+
+@pytest.fixture()
+def game_dir(tmp_path: Path) -> Path:
+    """Create minimal encrypted SCUMM v6 game split over two disks."""
+    layout = {1: {1: [1, 2], 2: [3]}, 2: {3: [4, 5, 6]}}
+    droo, dscr, dsou = {0: (0, 0)}, {}, {}
+    for disk_id, rooms in layout.items():
+        data, disk_dscr, disk_dsou = make_disk(rooms)
+        dscr.update(disk_dscr)
+        dsou.update(disk_dsou)
+        droo.update({room_id: (disk_id, 0) for room_id in rooms})
+        (tmp_path / f'GAME.{disk_id:03d}').write_bytes(xor(data))
+    rnam = b''.join(
+        bytes([room_id]) + xor(f'room{room_id}'.encode().ljust(9, b'\0'), 0xFF)
+        for room_id in range(1, 4)
+    )
+    index = (
+        mktag('RNAM', rnam + b'\x00')
+        + mktag('MAXS', bytes(30))
+        + mktag('DROO', make_directory(droo, 4))
+        + mktag('DSCR', make_directory(dscr, 7))
+        + mktag('DSOU', make_directory(dsou, 4))
+        + mktag('DCOS', make_directory({}, 1))
+        + mktag('DCHR', make_directory({}, 1))
+        + mktag('DOBJ', struct.pack('<H', 2) + bytes(2))
+    )
+    (tmp_path / 'GAME.000').write_bytes(xor(index))
+    return tmp_path
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from nutcracker.codex import bomp
+from nutcracker.kernel.buffer import UnexpectedBufferSize
+
+
+def make_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    values = rng.choice([0, 0, 0, 7, 7, 7, 12, 200], size=(height, width))
+    runs = rng.integers(1, 8, size=(height, width)).cumsum(axis=1) // 8
+    image = np.take_along_axis(values, np.minimum(runs, width - 1), axis=1)
+    return image.astype(np.uint8)
+
+
+@pytest.mark.parametrize(
+    'params',
+    [
+        (3, False, 1, None),
+        (3, False, 0, None),
+        (4, True, 1, None),
+        (3, False, 0, b'\x00'),
+    ],
+)
+@pytest.mark.parametrize(('width', 'height'), [(1, 1), (8, 12), (300, 3)])
+def test_bomp_roundtrip(width: int, height: int, params: tuple) -> None:
+    image = make_image(width, height)
+    data = bomp.encode_image(image.tolist(), *params)
+    assert np.array_equal(bomp.decode_image(data, width, height), image)
+
+
+def test_decode_line_codes() -> None:
+    # fill 3 with 9, raw [1, 2]
+    line = bytes([2 * 2 + 1, 9, 2 * 1, 1, 2])
+    assert bomp.decode_line(line) == bytes([9, 9, 9, 1, 2])
+    assert bomp.decode_line(line, 7, b'\x05') == bytes([9, 9, 9, 1, 2, 5, 5])
+    with pytest.raises(UnexpectedBufferSize):
+        bomp.decode_line(line, 7)
@@ -0,0 +1,37 @@
+import io
+
+import numpy as np
+import pytest
+
+from nutcracker.codex import bpp_cost
+
+
+@pytest.mark.parametrize('num_colors', [16, 32, 64])
+@pytest.mark.parametrize(('width', 'height'), [(1, 1), (7, 5), (3, 400)])
+def test_bpp_cost_roundtrip(width: int, height: int, num_colors: int) -> None:
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, num_colors, size=(height, width))
+    image = np.minimum(values, rng.integers(0, 2, size=(height, width)) * 255)
+    image = image.astype(np.uint8)
+    image[:, :1] = 1
+    data = bpp_cost.encode1(image, num_colors)
+    stream = io.BytesIO(data + b'\x01')
+    decoded = bpp_cost.decode1(width, height, num_colors, stream)
+    assert np.array_equal(decoded, image)
+    assert stream.tell() == len(data)
+
+
+def test_encode1_codes() -> None:
+    # columns first, run of 255 needs count byte, run of 1 fits in code
+    image = np.array([[2] * 100, [2] * 100, [2] * 55 + [3] * 44 + [1]]).T
+    assert bpp_cost.encode1(image, 16) == bytes([0x20, 255, 0x30, 44, 0x11])
+    with pytest.raises(ValueError, match='Invalid color'):
+        bpp_cost.encode1(image + 14, 16)
+
+
+def test_decode1_truncated() -> None:
+    data = bytes([0x23, 0x40])
+    with pytest.raises(IndexError):
+        bpp_cost.decode1(3, 2, 16, io.BytesIO(data))
+    decoded = bpp_cost.decode1(3, 2, 16, io.BytesIO(data), strict=False)
+    assert decoded.tolist() == [[2, 2, 0], [2, 0, 0]]
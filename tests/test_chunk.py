@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from nutcracker.kernel2.chunk import read_chunks
+from nutcracker.kernel2.fileio import XorBuffer
+from nutcracker.kernel2.preset import Preset, shell
+from nutcracker.kernel2.schema import SchemaCache, infer_schema
+
+sputm = shell(alignment=1, inclheader=True, errors='ignore')
+smush = shell(alignment=2, inclheader=False, errors='ignore')
+
+
+def make_chunks(cfg: Preset, sizes: list[int], skip_at: int = -1) -> bytes:
+    stream = bytearray()
+    for idx, size in enumerate(sizes):
+        if idx == skip_at:
+            stream += b'\x80'
+        hsize = size + 8 if cfg.inclheader else size
+        stream += f'T{idx:03d}'.encode() + hsize.to_bytes(4, byteorder='big')
+        stream += bytes(range(size))
+        stream += bytes(len(stream) % cfg.alignment)
+    return bytes(stream)
+
+
+@pytest.mark.parametrize(
+    ('cfg', 'skip_at'),
+    [(sputm, -1), (sputm, 2), (smush, -1)],
+)
+def test_scan_chunks_matches_read_chunks(cfg: Preset, skip_at: int) -> None:
+    buffer = make_chunks(cfg, [0, 3, 8, 1, 17], skip_at=skip_at) + bytes(8) + b'rest'
+    expected = [
+        (off, chunk.tag, bytes(chunk)) for off, chunk in read_chunks(cfg, buffer)
+    ]
+    table = cfg.scan_chunks(buffer)
+    chunks = [cfg.get_chunk(buffer, entry) for entry in table]
+    assert [
+        (int(entry['offset']), chunk.tag, bytes(chunk))
+        for entry, chunk in zip(table, chunks, strict=True)
+    ] == expected
+    assert [
+        (elem.tag, elem.attribs['offset'], bytes(elem.data))
+        for elem in cfg.map_chunks(buffer)
+    ] == [(tag, off, raw[8:]) for off, tag, raw in expected]
+
+
+def test_scan_chunks_size_mismatch() -> None:
+    with pytest.raises(ValueError, match='size mismatch'):
+        sputm.scan_chunks(b'TEST\x00\x00\x00\x20data')
+
+
+def test_infer_schema(tmp_path: Path) -> None:
+    leaf = bytes(sputm.mktag('LEAF', b'\x01\x02\x03'))
+    fake = bytes(sputm.mktag('FAKE', b'\x00' * 16))
+    wrap = bytes(sputm.mktag('WRAP', leaf + fake))
+    buffer = bytes(sputm.mktag('ROOT', wrap + leaf))
+    schema = {
+        'ROOT': {'WRAP', 'LEAF'},
+        'WRAP': {'LEAF', 'FAKE'},
+        'LEAF': set(),
+        'FAKE': set(),
+    }
+    assert infer_schema(sputm, buffer) == schema
+    assert infer_schema(sputm, b'\xffgarbage') == {}
+
+    path = tmp_path / 'schema.json'
+    cache = SchemaCache(path)
+    assert cache.infer(sputm, buffer, ('ROOT', 8)) == schema
+    other = bytes(sputm.mktag('ROOT', bytes(sputm.mktag('NEW_', leaf))))
+    assert cache.infer(sputm, other, ('ROOT', 8)) == {
+        **schema,
+        'ROOT': {'WRAP', 'LEAF', 'NEW_'},
+        'NEW_': {'LEAF'},
+    }
+    assert ('ROOT', 8) in SchemaCache(path)
+
+
+def test_xor_buffer() -> None:
+    plain = make_chunks(sputm, [3, 70, 0, 200, 5]) * 3
+    encrypted = np.frombuffer(plain, dtype=np.uint8) ^ np.uint8(0x69)
+    cache_pages = 4
+    buffer = XorBuffer.create(encrypted, 0x69, page_size=16, cache_pages=cache_pages)
+
+    assert bytes(buffer) == plain
+    assert bytes(buffer[20:100]) == plain[20:100]
+    assert bytes(buffer[20:100][-50:-10]) == plain[20:100][-50:-10]
+    assert buffer[-1] == plain[-1]
+    assert [
+        (elem.tag, elem.attribs['offset'], bytes(elem.data))
+        for elem in sputm.map_chunks(buffer)
+    ] == [
+        (elem.tag, elem.attribs['offset'], bytes(elem.data))
+        for elem in sputm.map_chunks(plain)
+    ]
+    assert len(buffer._cache.pages) <= cache_pages  # noqa: SLF001
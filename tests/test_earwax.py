@@ -0,0 +1,42 @@
+import struct
+from pathlib import Path
+
+from nutcracker.earwax.preset import earwax
+from nutcracker.earwax.resource import open_game_resource
+
+
+def mkchunk(tag: str, data: bytes) -> bytes:
+    return struct.pack('<I', len(data) + 6) + tag.encode() + data
+
+
+def mkdir(entries: list[tuple[int, int]]) -> bytes:
+    return struct.pack('<H', len(entries)) + b''.join(
+        struct.pack('<BI', room, off) for room, off in entries
+    )
+
+
+def test_read_room_chunks(tmp_path: Path) -> None:
+    room = mkchunk('RO', mkchunk('HD', struct.pack('<HHH', 8, 8, 0)))
+    script, sound = mkchunk('SC', b'script'), mkchunk('SO', b'sound!')
+    lf_data = struct.pack('<H', 1) + room + script + sound
+    offs = mkchunk('FO', bytes([1, 1]) + struct.pack('<I', 18))
+    disk = mkchunk('LE', offs + mkchunk('LF', lf_data))
+    (tmp_path / 'DISK01.LEC').write_bytes(bytes(b ^ 0x69 for b in disk))
+    name = bytes(b ^ 0xFF for b in b'room1'.ljust(9, b'\0'))
+    # directory offsets are relative to room data after room number
+    (tmp_path / '000.LFL').write_bytes(
+        mkchunk('RN', bytes([1]) + name + b'\0')
+        + mkchunk('0R', mkdir([(0, 0), (1, 0)]))
+        + mkchunk('0S', mkdir([(0, 0), (1, len(room))]))
+        + mkchunk('0N', mkdir([(0, 0), (1, len(room) + len(script))]))
+        + mkchunk('0C', mkdir([])),
+    )
+
+    root = list(open_game_resource(str(tmp_path / '000.LFL')))
+    lflf = next(t for t in earwax.find('LE', root).children() if t.tag == 'LF')
+    assert bytes(lflf.data) == lf_data
+    assert [(elem.attribs['path'], bytes(elem.data)) for elem in lflf.children()] == [
+        ('LE_0001/LF_0001/RO', room[6:]),
+        ('LE_0001/LF_0001/SC_0001', b'script'),
+        ('LE_0001/LF_0001/SO_0001', b'sound!'),
+    ]
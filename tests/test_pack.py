@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from nutcracker.utils.pack import PACK_ALIGN, PackFile, PackWriter, patch_pack
+
+
+def test_pack_roundtrip(tmp_path: Path) -> None:
+    path = tmp_path / 'test.nutpack'
+    files = {'LECF/LOFF': b'loff', 'LECF/LFLF/SCRP': b'script', 'rpdump.xml': b''}
+    with PackWriter(path) as writer:
+        for name, data in files.items():
+            writer.write(name, data)
+
+    pack = PackFile(path)
+    assert list(pack) == list(files)
+    assert {name: bytes(pack.read(name)) for name in pack} == files
+    assert all(offset % PACK_ALIGN == 0 for offset in pack.index['offset'].tolist())
+    assert 'LECF/LFLF' in pack
+    assert not pack.isfile('LECF/LFLF')
+    assert 'LECF/LFLF/SOUN' not in pack
+    offset = int(pack.index['offset'][0])
+    del pack
+
+    patched = {'LECF/LOFF': b'LOFF', 'LECF/LFLF/SCRP': b'longer script' * 2}
+    patch_pack(path, {**patched, 'LECF/LFLF/SOUN': b'sound'})
+    pack = PackFile(path)
+    assert {name: bytes(pack.read(name)) for name in pack} == {
+        **files,
+        **patched,
+        'LECF/LFLF/SOUN': b'sound',
+    }
+    # payload which fits is replaced in place
+    assert int(pack.index['offset'][0]) == offset
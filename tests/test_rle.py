@@ -0,0 +1,32 @@
+import struct
+
+import numpy as np
+import pytest
+
+from nutcracker.codex import rle
+
+
+def make_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    values = rng.choice([0, 0, 0, 7, 7, 7, 12, 200], size=(height, width))
+    runs = rng.integers(1, 8, size=(height, width)).cumsum(axis=1) // 8
+    image = np.take_along_axis(values, np.minimum(runs, width - 1), axis=1)
+    return image.astype(np.uint8)
+
+
+@pytest.mark.parametrize(('width', 'height'), [(1, 1), (8, 12), (64, 96), (300, 3)])
+def test_lined_rle_roundtrip(width: int, height: int) -> None:
+    image = make_image(width, height)
+    data = rle.encode_lined_rle(image.tolist())
+    decoded = rle.decode_lined_rle(data, width, height, verify=False)
+    assert decoded.dtype == np.uint8
+    assert np.array_equal(decoded, image)
+    assert np.array_equal(rle.decode_lined_rle(data, width, height), image)
+
+
+def test_decode_lined_rle_codes() -> None:
+    # skip 2, fill 3 with 9, raw [1, 2], then run past width is clipped
+    line = bytes([2 * 2 + 1, 4 * 2 + 2, 9, 4 * 1, 1, 2, 4 * 3 + 2, 5])
+    data = struct.pack('<H', len(line)) + line + struct.pack('<H', 0)
+    decoded = rle.decode_lined_rle(data, 9, 2, verify=False)
+    assert decoded.tolist() == [[0, 0, 9, 9, 9, 1, 2, 5, 5], [0] * 9]
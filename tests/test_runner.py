@@ -0,0 +1,47 @@
+import subprocess
+import sys
+
+import pytest
+
+# modules which should only be imported when their command runs
+HEAVY_MODULES = (
+    'numpy',
+    'PIL',
+    'nutcracker.kernel2.chunk',
+    'nutcracker.sputm.windex_v5',
+    'nutcracker.sputm.windex_v6',
+    'nutcracker.codex.codex',
+)
+
+# cumulative import time of nutcracker modules, excluding typer itself
+IMPORT_BUDGET_US = 100_000
+
+
+def import_times(module: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],  # noqa: S603
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, _, name = (
+            part.strip() for part in line.replace(':', '|', 1).split('|')
+        )
+        times[name] = int(self_us)
+    return times
+
+
+@pytest.mark.parametrize(
+    'module',
+    ['nutcracker.runner', 'nutcracker.sputm.runner', 'nutcracker.smush.runner'],
+)
+def test_runner_import_time(module: str) -> None:
+    times = import_times(module)
+    assert module in times
+    assert not [name for name in HEAVY_MODULES if name in times]
+    own = sum(us for name, us in times.items() if name.startswith('nutcracker'))
+    assert own < IMPORT_BUDGET_US, own
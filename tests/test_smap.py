@@ -0,0 +1,113 @@
+import io
+from collections.abc import Callable
+from functools import partial
+
+import numpy as np
+import pytest
+
+from nutcracker.codex import smap
+
+
+def make_strip(size: int, palen: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    steps = rng.choice([0, 0, 0, 0, 1, -1, 2, -3, 4, 37], size=size)
+    return bytes((np.cumsum(steps) % (1 << palen)).astype(np.uint8))
+
+
+@pytest.mark.parametrize(
+    ('encode', 'decode'),
+    [
+        (smap.encode_basic, smap.decode_basic),
+        (smap.encode_he, smap.decode_he),
+        (partial(smap.encode_run_majmin, limit=255), smap.decode_run_majmin),
+        (partial(smap.encode_run_majmin, limit=12), smap.decode_run_majmin),
+    ],
+)
+@pytest.mark.parametrize('palen', [4, 8])
+def test_strip_roundtrip(
+    encode: Callable[[bytes, int], bytes],
+    decode: Callable[..., np.ndarray],
+    palen: int,
+) -> None:
+    for size, seed in ((8, 0), (8 * 100, 1), (8 * 480, 2)):
+        data = make_strip(size, palen, seed)
+        out = np.zeros(size, dtype=np.uint8)
+        decoded = decode(io.BytesIO(encode(data, palen)), size, palen, out=out)
+        assert decoded is out
+        assert decoded.tobytes() == data
+    flat = bytes(8 * 300)
+    assert decode(io.BytesIO(encode(flat, palen)), len(flat), palen).tobytes() == flat
+
+
+def test_decode_basic_codes() -> None:
+    # color 5, then (LSB first): same, dec, flip, new color 9 in 4 bits
+    data = bytes([5, 0b11110110, 0b00010010])
+    assert smap.decode_basic(io.BytesIO(data), 5, 4).tolist() == [5, 5, 4, 5, 9]
+    assert smap.encode_basic(bytes([5, 5, 4, 5, 9]), 4) == data
+
+
+def test_encode_too_many_colors() -> None:
+    with pytest.raises(ValueError, match='Too many colors'):
+        smap.encode_he(bytes([0, 40]), 4)
+
+
+def test_encode_strip_verify() -> None:
+    strip = np.frombuffer(make_strip(8 * 16, 8), dtype=np.uint8).reshape(16, 8)
+    for code in (0x0E, 0x18, 0x22, 0x40, 0x68, 0x7C, 0x86):
+        encoded = smap.encode_strip(strip, *strip.shape, code, verify=True)
+        assert smap.encode_strip(strip, *strip.shape, code) == encoded
+
+
+def test_decode_truncated_strip() -> None:
+    data = smap.encode_he(make_strip(64, 8), 8)
+    with pytest.raises(ValueError, match='bitstream ended'):
+        smap.decode_he(io.BytesIO(data[: len(data) // 2]), 64, 8)
+
+
+def test_smap_strip_jobs() -> None:
+    height, width = 24, 8 * 20
+    image = np.frombuffer(make_strip(height * width, 8, 3), dtype=np.uint8)
+    image = image.reshape(height, width)
+    codes = [(0x0E, 0x18, 0x22, 0x40, 0x68, 0x7C, 0x86)[idx % 7] for idx in range(20)]
+    data = smap.encode_smap(image, codes=codes)
+    assert smap.encode_smap(image, codes=codes, jobs=3) == data
+    decoded = smap.decode_smap(height, width, data)
+    assert np.array_equal(decoded, image)
+    assert np.array_equal(smap.decode_smap(height, width, data, jobs=3), decoded)
+
+
+def test_candidate_codes() -> None:
+    assert smap.candidate_codes(0x44, 5) == [15, 25, 65, 105]
+    assert smap.candidate_codes(0x8A, 4, he=True) == [14, 24, 64, 104, 134]
+    assert smap.candidate_codes(0x30, 8) == [38, 48, 88, 128]
+    assert smap.candidate_codes(0x95, 8) == [38, 48, 88, 128, 0x95]
+
+
+def test_smap_optimize() -> None:
+    height, width = 40, 8 * 6
+    flat = np.full((height, 8), 3, dtype=np.uint8)
+    noisy = np.random.default_rng(4).integers(0, 200, size=(height, 8), dtype=np.uint8)
+    steps = np.frombuffer(make_strip(height * 8, 4, 5), dtype=np.uint8)
+    image = np.hstack(
+        [flat, noisy, steps.reshape(height, 8), steps.reshape(8, height).T, flat, flat],
+    )
+    codes = [0x8A, 0x8A, 0x1C, 0x1C, 0x44, 0x94]
+    ref = smap.encode_smap(image, codes=codes)
+    data = smap.encode_smap(image, codes=codes, optimize=True, verify=True)
+    assert len(data) < len(ref)
+    assert np.array_equal(smap.decode_smap(height, width, data), image)
+    # runs, reference kept for noise, basic horizontal and vertical,
+    # last strip keeps transparency of reference
+    assert smap.extract_smap_codes(height, width, data) == [104, 138, 24, 14, 104, 124]
+    assert smap.encode_smap(image, codes=codes, optimize=True, jobs=2) == data
+
+
+def test_decode_smap_verify(capsys: pytest.CaptureFixture[str]) -> None:
+    height, width = 24, 8 * 7
+    image = np.frombuffer(make_strip(height * width, 8, 3), dtype=np.uint8)
+    image = image.reshape(height, width)
+    data = smap.encode_smap(image, codes=[0x0E, 0x18, 0x22, 0x40, 0x68, 0x7C, 0x86])
+    capsys.readouterr()
+    assert np.array_equal(smap.decode_smap(height, width, data), image)
+    assert np.array_equal(smap.decode_smap(height, width, data, verify=True), image)
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,232 @@
+import io
+import struct
+from collections.abc import Iterable
+from pathlib import Path
+
+import pytest
+
+from nutcracker.kernel2.element import Element
+from nutcracker.kernel2.tree import load_tree
+from nutcracker.sputm.build import open_patch, rebuild_resources, update_element
+from nutcracker.sputm.cache import cache_path, load_index_cache
+from nutcracker.sputm.diff import Change, diff_games
+from nutcracker.sputm.schema import SCHEMA
+from nutcracker.sputm.strings import get_optable, update_element_strings
+from nutcracker.sputm.tree import (
+    DUMP_SCHEMA,
+    TREE_FILE,
+    dump_resources,
+    narrow_schema,
+    open_game_resource,
+    render_table,
+)
+
+from .conftest import mktag, xor
+
+
+def flatten(root: Iterable[Element]) -> list[tuple[str, dict, bytes]]:
+    return [
+        item
+        for elem in root
+        for item in [
+            (elem.tag, dict(elem.attribs), bytes(elem.data)),
+            *flatten(elem.children()),
+        ]
+    ]
+
+
+def test_index_cache(game_dir: Path) -> None:
+    index_file = game_dir / 'GAME.000'
+    scanned = open_game_resource(index_file)
+    assert scanned.cache is None
+    assert sorted(path.name for path in game_dir.iterdir()) == [
+        'GAME.000',
+        'GAME.001',
+        'GAME.002',
+    ]
+
+    built = open_game_resource(index_file, use_cache=True)
+    assert built.cache
+    assert Path(cache_path(index_file)).exists()
+
+    cached = open_game_resource(index_file, use_cache=True)
+    assert cached.cache
+    assert cached.game.index_schema == scanned.game.index_schema
+
+    for schema in (SCHEMA, narrow_schema(SCHEMA, {'LECF', 'LFLF', 'ROOM'})):
+        expected = flatten(scanned.read_resources(schema=schema))
+        assert expected
+        assert flatten(cached.read_resources(schema=schema)) == expected
+
+
+def test_index_cache_invalidated(game_dir: Path) -> None:
+    index_file = game_dir / 'GAME.000'
+    assert open_game_resource(index_file, use_cache=True).cache
+    assert load_index_cache(index_file)
+    disk = game_dir / 'GAME.002'
+    disk.write_bytes(disk.read_bytes() + b'\x69' * 8)
+    assert load_index_cache(index_file) is None
+    assert open_game_resource(index_file, use_cache=True).cache
+    assert load_index_cache(index_file)
+    Path(cache_path(index_file)).write_bytes(b'PK\x03\x04broken')
+    assert load_index_cache(index_file) is None
+
+
+def test_index_schema_per_game(
+    game_dir: Path, tmp_path_factory: pytest.TempPathFactory
+) -> None:
+    other = tmp_path_factory.mktemp('other')
+    for path in game_dir.glob('GAME.*'):
+        (other / path.name).write_bytes(path.read_bytes())
+    index = other / 'GAME.000'
+    index.write_bytes(index.read_bytes() + xor(mktag('AARY', bytes(2))))
+    assert 'AARY' in open_game_resource(index, use_cache=False).game.index_schema
+    game = open_game_resource(game_dir / 'GAME.000', use_cache=False).game
+    assert 'AARY' not in game.index_schema
+
+
+def test_table_hashes(game_dir: Path) -> None:
+    gameres = open_game_resource(game_dir / 'GAME.000', use_cache=True)
+    expected = [elem.hash for elem in gameres.read_resources(schema=SCHEMA)]
+    assert len(set(expected)) == len(expected)
+    assert [elem.hash for elem in gameres.read_resources(table=True)] == expected
+
+
+def test_element_table(game_dir: Path) -> None:
+    index_file = game_dir / 'GAME.000'
+    for use_cache in (False, True):
+        gameres = open_game_resource(index_file, use_cache=use_cache)
+        for schema in (SCHEMA, narrow_schema(SCHEMA, {'LECF', 'LFLF'})):
+            expected = flatten(gameres.read_resources(schema=schema))
+            assert flatten(gameres.read_resources(schema=schema, table=True)) == (
+                expected
+            )
+
+
+def test_parallel_extract(game_dir: Path) -> None:
+    index_file = game_dir / 'GAME.000'
+    for use_cache in (False, True):
+        gameres = open_game_resource(index_file, use_cache=use_cache)
+        serial, parallel = (
+            game_dir / f'serial{use_cache}',
+            game_dir / f'jobs{use_cache}',
+        )
+        dump_resources(gameres, str(serial))
+        dump_resources(gameres, str(parallel), jobs=2)
+        files = sorted(path.relative_to(serial) for path in serial.rglob('*'))
+        assert files
+        assert (
+            sorted(path.relative_to(parallel) for path in parallel.rglob('*')) == files
+        )
+        for path in files:
+            if (serial / path).is_file():
+                assert (serial / path).read_bytes() == (parallel / path).read_bytes()
+
+
+def test_extract_skips_unchanged(game_dir: Path) -> None:
+    gameres = open_game_resource(game_dir / 'GAME.000', use_cache=True)
+    basedir = game_dir / 'GAME'
+    dump_resources(gameres, str(basedir))
+    files = [path for path in basedir.rglob('*') if path.is_file()]
+    changed = basedir / 'LECF_0001' / 'LFLF_0001' / 'SOUN_0001'
+    expected = changed.read_bytes()
+    changed.write_bytes(b'broken')
+    mtimes = {path: path.stat().st_mtime_ns for path in files}
+
+    dump_resources(gameres, str(basedir))
+    assert changed.read_bytes() == expected
+    touched = {path for path in files if path.stat().st_mtime_ns != mtimes[path]}
+    assert touched == {basedir / 'rpdump.xml', basedir / 'rptree.npz', changed}
+
+
+def test_load_tree(game_dir: Path) -> None:
+    gameres = open_game_resource(game_dir / 'GAME.000', use_cache=False)
+    basedir = game_dir / 'GAME'
+    dump_resources(gameres, str(basedir))
+    table = load_tree(basedir / TREE_FILE)
+    expected = flatten(gameres.read_resources(schema=DUMP_SCHEMA))
+    assert [table.attribs(idx) for idx in range(len(table))] == [
+        attribs for _, attribs, _ in expected
+    ]
+    with io.StringIO() as stream:
+        render_table(table, stream)
+        assert stream.getvalue() == (basedir / 'rpdump.xml').read_text()
+
+
+def test_diff_games(game_dir: Path, tmp_path_factory: pytest.TempPathFactory) -> None:
+    other = tmp_path_factory.mktemp('other')
+    for path in game_dir.glob('GAME.*'):
+        (other / path.name).write_bytes(path.read_bytes())
+    disk = other / 'GAME.002'
+    data = bytearray(disk.read_bytes())
+    data[-1] ^= 0xFF
+    disk.write_bytes(data)
+
+    old = open_game_resource(game_dir / 'GAME.000', use_cache=False)
+    assert not list(
+        diff_games(old, open_game_resource(game_dir / 'GAME.000', use_cache=True))
+    )
+    assert list(
+        diff_games(old, open_game_resource(other / 'GAME.000', use_cache=True))
+    ) == [
+        (Change.MODIFIED, 'LECF_0002/LFLF_0003/SOUN_0003'),
+    ]
+
+
+def test_inject_strings(game_dir: Path) -> None:
+    gameres = open_game_resource(game_dir / 'GAME.000', use_cache=False)
+    # scripts of test game are not valid bytecode, only object names are replaced
+    schema = narrow_schema(SCHEMA, {'LECF', 'LFLF', 'ROOM', 'OBCD'})
+    # names keep their size, containers include them as is
+    expected = [
+        (tag, data.replace(b'obj', b'OBJ'))
+        for tag, _, data in flatten(gameres.read_resources(schema=schema))
+    ]
+    names = [data[:-1] for tag, data in expected if tag == 'OBNA']
+    assert names
+
+    updated = list(
+        update_element_strings(
+            gameres.read_resources(schema=schema),
+            iter(names),
+            get_optable(gameres.game),
+            {},
+        ),
+    )
+    (game_dir / 'out').mkdir()
+    rebuild_resources(gameres, str(game_dir / 'out' / 'GAME'), updated)
+    rebuilt = open_game_resource(game_dir / 'out' / 'GAME.000', use_cache=False)
+    assert [
+        (tag, data) for tag, _, data in flatten(rebuilt.read_resources(schema=schema))
+    ] == expected
+
+
+def test_build_copies_untouched_rooms(game_dir: Path) -> None:
+    basedir = game_dir / 'GAME'
+    dump_resources(
+        open_game_resource(game_dir / 'GAME.000', use_cache=True), str(basedir)
+    )
+    # room grows, so following rooms and index entries move
+    changed = basedir / 'LECF_0001' / 'LFLF_0001' / 'SOUN_0001'
+    changed.write_bytes(b'SOUN' + struct.pack('>I', 8 + 50) + bytes(range(50)))
+    patch = open_patch(basedir)
+    reference = {path.suffix: path.read_bytes() for path in game_dir.glob('GAME.0*')}
+
+    def build(basename: str, origins: dict[str, int] | None) -> dict[str, bytes]:
+        gameres = open_game_resource(game_dir / 'GAME.000', use_cache=False)
+        updated = list(update_element(patch, gameres.read_resources(), origins))
+        rebuild_resources(gameres, str(game_dir / basename), updated, origins)
+        return {
+            path.suffix: path.read_bytes() for path in game_dir.glob(f'{basename}.0*')
+        }
+
+    expected = build('full', None)
+    assert expected.keys() == reference.keys()
+    assert expected['.001'] != reference['.001']
+    assert expected['.002'] == reference['.002']
+
+    origins: dict[str, int] = {}
+    assert build('copied', origins) == expected
+    assert sorted(origins) == ['LECF_0001/LFLF_0002', 'LECF_0002/LFLF_0003']
+    # reference files are replaced only after rooms were copied from them
+    assert build('GAME', {}) == expected
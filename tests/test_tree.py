@@ -0,0 +1,153 @@
+import io
+
+from nutcracker.kernel2.element import write_element
+from nutcracker.kernel2.preset import shell
+from nutcracker.kernel2.query import query_schema
+
+sputm = shell(
+    alignment=1,
+    schema={
+        'ROOM': {'RMHD', 'IM01', 'IM0A'},
+        'RMHD': set(),
+        'IM01': set(),
+        'IM0A': set(),
+    },
+)
+
+
+def test_find_by_tag() -> None:
+    children = [sputm.mktag(tag, b'data') for tag in ('IM01', 'RMHD', 'IM0A')]
+    buffer = bytes(sputm.mktag('ROOM', sputm.write_chunks(children)))
+    room = next(sputm.map_chunks(buffer))
+
+    assert [elem.tag for elem in sputm.findall('IM{:02x}', room)] == ['IM01', 'IM0A']
+    assert [elem.tag for elem in sputm.findall('IM01', room)] == ['IM01']
+    assert sputm.find('OBCD', room) is None
+    assert sputm.findpath('ROOM/RMHD', [room]) is sputm.find('RMHD', room)
+
+    rmhd = next(sputm.map_chunks(bytes(sputm.mktag('RMHD', b'more'))))
+    room.add_child(rmhd)
+    assert list(sputm.findall('RMHD', room))[-1] is rmhd
+
+
+def test_query() -> None:
+    cfg = shell(
+        alignment=1,
+        schema={
+            'LECF': {'LFLF'},
+            'LFLF': {'ROOM', 'SCRP'},
+            'ROOM': {'OBCD', 'RMHD'},
+            'OBCD': {'VERB'},
+            'RMHD': set(),
+            'SCRP': set(),
+            'VERB': set(),
+        },
+        extra=lambda _parent, _chunk, offset: {'gid': offset},
+    )
+    obcd = cfg.mktag('OBCD', bytes(cfg.mktag('VERB', b'verb')))
+    room = cfg.mktag('ROOM', cfg.write_chunks([cfg.mktag('RMHD', b'hd'), obcd]))
+    first = cfg.write_chunks([cfg.mktag('SCRP', b'scrp'), room])
+    lflf = [cfg.mktag('LFLF', first), cfg.mktag('LFLF', bytes(room))]
+    disk = next(cfg.map_chunks(bytes(cfg.mktag('LECF', cfg.write_chunks(lflf)))))
+
+    query = f'LECF/LFLF[gid={len(first) + 8}]/ROOM/OBCD/VERB'
+    assert [elem.attribs['gid'] for elem in cfg.select(query, [disk])] == [0]
+    assert [elem.tag for elem in cfg.select('LFLF/*', disk)] == [
+        'SCRP',
+        'ROOM',
+        'ROOM',
+    ]
+    assert [
+        (qidx, elem.tag)
+        for qidx, elem in cfg.select_many(('**/VERB|SCRP', 'LFLF/ROOM'), disk)
+    ] == [(0, 'SCRP'), (1, 'ROOM'), (0, 'VERB'), (1, 'ROOM'), (0, 'VERB')]
+
+    assert query_schema(cfg.schema, ['LECF/LFLF/ROOM']) == cfg.schema
+    narrowed = query_schema(cfg.schema, ['LECF/LFLF/SCRP'])
+    assert narrowed == {**cfg.schema, 'ROOM': set(), 'OBCD': set()}
+    narrowed = query_schema(cfg.schema, ['LECF/LFLF/SCRP', 'ROOM/RMHD'])
+    assert narrowed == {**cfg.schema, 'OBCD': set()}
+
+
+def test_write_element() -> None:
+    cfg = shell(
+        alignment=2,
+        schema={'ROOM': {'RMHD', 'IM01'}, 'RMHD': set(), 'IM01': set()},
+    )
+    children = [cfg.mktag('RMHD', b'odd'), cfg.mktag('IM01', b'data')]
+    buffer = bytes(cfg.mktag('ROOM', cfg.write_chunks(children)))
+    room = next(cfg.map_chunks(buffer))
+
+    stream = io.BytesIO()
+    assert write_element(cfg, stream.write, room) == len(buffer)
+    assert stream.getvalue() == buffer
+
+    rmhd, im01 = room.children()
+    rmhd.update_raw(b'longer')
+    room.set_children([im01, rmhd])
+    updated = [cfg.mktag(elem.tag, elem.data) for elem in (im01, rmhd)]
+    expected = bytes(cfg.mktag('ROOM', cfg.write_chunks(updated)))
+    assert room.size == len(expected) - 8
+    stream = io.BytesIO()
+    assert write_element(cfg, stream.write, room) == len(expected)
+    assert stream.getvalue() == expected
+    assert bytes(room.data) == expected[8:]
+
+
+def test_update_marks_ancestors() -> None:
+    cfg = shell(
+        alignment=1,
+        schema={
+            'LFLF': {'ROOM'},
+            'ROOM': {'RMHD', 'IM01'},
+            'RMHD': set(),
+            'IM01': set(),
+        },
+    )
+    room = cfg.mktag(
+        'ROOM',
+        cfg.write_chunks([cfg.mktag('RMHD', b'odd'), cfg.mktag('IM01', b'data')]),
+    )
+    lflf = next(cfg.map_chunks(bytes(cfg.mktag('LFLF', bytes(room)))))
+    (room,) = lflf.children()
+    rmhd, im01 = room.children()
+    assert not lflf.dirty
+
+    rmhd.update_raw(b'longer')
+    assert room.dirty
+    assert lflf.dirty
+    assert lflf.size == 8 + 8 + 6 + 8 + 4
+
+    lflf.layout()
+    assert im01.attribs == {'offset': 14, 'size': 4}
+    assert room.attribs['size'] == lflf.size - 8
+
+
+def test_merkle_hash() -> None:
+    cfg = shell(
+        alignment=1,
+        schema={
+            'LFLF': {'ROOM'},
+            'ROOM': {'RMHD', 'IM01'},
+            'RMHD': set(),
+            'IM01': set(),
+        },
+    )
+    room = cfg.mktag(
+        'ROOM',
+        cfg.write_chunks([cfg.mktag('RMHD', b'odd'), cfg.mktag('IM01', b'data')]),
+    )
+    buffer = bytes(cfg.mktag('LFLF', bytes(room)))
+    lflf, other = next(cfg.map_chunks(buffer)), next(cfg.map_chunks(buffer))
+    assert lflf.hash == other.hash
+
+    (room,) = lflf.children()
+    rmhd, im01 = room.children()
+    hashes = lflf.hash, room.hash, rmhd.hash, im01.hash
+    rmhd.update_raw(b'even')
+    assert lflf.hash != hashes[0]
+    assert room.hash != hashes[1]
+    assert rmhd.hash != hashes[2]
+    assert im01.hash == hashes[3]
+    rmhd.update_raw(b'odd')
+    assert (lflf.hash, room.hash, rmhd.hash, im01.hash) == hashes
@@ -0,0 +1,36 @@
+import io
+
+from nutcracker.chiper import xor
+from nutcracker.utils import copyio
+
+
+def test_xor_blocks() -> None:
+    data = bytes(range(256)) * 40
+    stream = io.BytesIO()
+    assert xor.write(stream, data, block_size=1000) == len(data)
+    assert stream.getvalue() == bytes(b ^ xor.CHIPER_KEY for b in data)
+    stream.seek(0)
+    assert b''.join(copyio.buffered(lambda size: xor.read(stream, size), 999)) == data
+
+
+class ShortWriter(io.RawIOBase):
+    """Unbuffered stream taking at most few bytes per write."""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        chunk = bytes(data[:7])
+        self.data += chunk
+        return len(chunk)
+
+
+def test_xor_short_writes() -> None:
+    data = bytes(range(256)) * 4
+    for key in (xor.CHIPER_KEY, 0):
+        stream = ShortWriter()
+        assert xor.write(stream, data, key=key, block_size=100) == len(data)
+        assert bytes(stream.data) == bytes(b ^ key for b in data)